@@ -0,0 +1,248 @@
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backends import date_key
+
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+class RoomAnalytics:
+    """
+    In-process columnar copy of the loaded rooms and students that answers the room
+    queries without a round trip to the database.
+
+    Students are kept as NumPy arrays (student ID, room ID, birth date key, sex as
+    uint8) and the statistics behind all four room queries are computed in one
+    vectorized group-by pass, which is cached until more rows are added. Ages are the
+    exact completed years of the SQL queries, computed from the yyyymmdd keys.
+
+    Rows are fed through `track_rooms`/`track_students` while DataLoader.load_data
+    inserts them, so the engine reflects the data loaded by this process; the rows of a
+    load that is rolled back are discarded again (see `savepoint`). Like in the
+    database, students repeating an already tracked ID are ignored, unless they are
+    tracked by an upsert load, in which case the last upserted row wins.
+    """
+
+    def __init__(self, flush_size: int = 10000):
+        if np is None:
+            raise ImportError(
+                "RoomAnalytics requires NumPy, install it with 'pip install numpy'."
+            )
+
+        self.flush_size = flush_size
+
+        self._room_ids: List[int] = []
+        self._student_columns: List[Tuple[Any, ...]] = []
+        self._pending: List[Tuple[Any, ...]] = []
+        self._room_statistics: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether any room has been tracked."""
+
+        return bool(self._room_ids)
+
+    def savepoint(self) -> Tuple[int, int]:
+        """
+        Marks the tracked rows, so that the rows tracked after can be discarded.
+
+        Returns:
+            Tuple[int, int]: The savepoint to pass to `roll_back`.
+        """
+
+        self._flush()
+
+        return len(self._room_ids), len(self._student_columns)
+
+    def roll_back(self, savepoint: Tuple[int, int]) -> None:
+        """
+        Discards the rows tracked since a savepoint, e.g. those of a load that was
+        rolled back.
+
+        Args:
+            savepoint (Tuple[int, int]): The value returned by `savepoint`.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        rooms, student_columns = savepoint
+
+        del self._room_ids[rooms:]
+        del self._student_columns[student_columns:]
+        self._pending = []
+        self._room_statistics = None
+
+    def track_rooms(
+        self, rows: Iterable[Tuple[int, str]]
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Passes (RoomID, RoomName) rows through while recording their IDs.
+
+        Args:
+            rows (Iterable[Tuple[int, str]]): The room rows.
+
+        Yields:
+            Tuple[int, str]: The same rows, unchanged.
+        """
+
+        for row in rows:
+            self._room_ids.append(row[0])
+            self._room_statistics = None
+            yield row
+
+    def track_students(
+        self,
+        rows: Iterable[Tuple[str, int, str, int, str, int]],
+        upsert: bool = False,
+    ) -> Iterator[Tuple[str, int, str, int, str, int]]:
+        """
+        Passes (Birthday, StudentID, Name, RoomID, Sex, BirthDateKey) rows through while
+        recording their columns; rows are converted to arrays every `flush_size` rows.
+
+        Args:
+            rows (Iterable[Tuple[str, int, str, int, str, int]]): The student rows.
+            upsert (bool, optional): Whether the rows replace the tracked students with
+                the same IDs. Defaults to False.
+
+        Yields:
+            Tuple[str, int, str, int, str, int]: The same rows, unchanged.
+        """
+
+        try:
+            for row in rows:
+                self._pending.append(row)
+                if len(self._pending) >= self.flush_size:
+                    self._flush(upsert)
+                yield row
+        finally:
+            self._flush(upsert)
+
+    def _flush(self, upsert: bool = False) -> None:
+        if not self._pending:
+            return
+
+        _, student_ids, _, room_ids, sexes, birth_date_keys = zip(
+            *self._pending
+        )
+        self._pending = []
+
+        self._student_columns.append(
+            (
+                np.array(student_ids, dtype=np.int64),
+                np.array(room_ids, dtype=np.int64),
+                np.array(birth_date_keys, dtype=np.int64),
+                np.array(sexes, dtype="U1").view(np.uint32).astype(np.uint8),
+                np.full(len(student_ids), upsert),
+            )
+        )
+        self._room_statistics = None
+
+    def query_room_statistics(self) -> List[Dict[str, Any]]:
+        """
+        Computes the statistics of every room in one pass over the student arrays.
+
+        Returns:
+            List[Dict[str, Any]]: A list of dictionaries, one per room, with 'RoomID',
+            'StudentsCount', 'AvgAge', 'MinAge', 'MaxAge', 'AgeDifference' and 'MixedSex',
+            like DataLoader.query_room_statistics.
+        """
+
+        if self._room_statistics is not None:
+            return self._room_statistics
+
+        self._flush()
+
+        rooms = np.unique(np.array(self._room_ids, dtype=np.int64))
+
+        if self._student_columns:
+            student_ids, room_ids, birth_date_keys, sexes, upserted = (
+                np.concatenate(column)
+                for column in zip(*self._student_columns)
+            )
+        else:
+            student_ids = room_ids = np.empty(0, dtype=np.int64)
+            birth_date_keys = np.empty(0, dtype=np.int64)
+            sexes = np.empty(0, dtype=np.uint8)
+            upserted = np.empty(0, dtype=bool)
+
+        # The last upserted occurrence of a student ID wins, otherwise the first one
+        # does; students of unknown rooms are rejected by the foreign key
+        positions = np.arange(len(student_ids))
+        priorities = np.where(
+            upserted,
+            len(student_ids) + positions,
+            len(student_ids) - 1 - positions,
+        )
+        order = np.lexsort((-priorities, student_ids))
+        first_of_id = np.ones(len(order), dtype=bool)
+        first_of_id[1:] = student_ids[order][1:] != student_ids[order][:-1]
+        keep = np.zeros(len(student_ids), dtype=bool)
+        keep[order[first_of_id]] = True
+        room_positions = np.searchsorted(rooms, room_ids)
+        known_room = room_positions < len(rooms)
+        known_room[known_room] = (
+            rooms[room_positions[known_room]] == room_ids[known_room]
+        )
+        keep &= known_room
+
+        room_positions = room_positions[keep]
+        # Integer division truncating towards zero, like the SQL queries
+        key_differences = date_key(date.today()) - birth_date_keys[keep]
+        ages = np.sign(key_differences) * (np.abs(key_differences) // 10000)
+        sexes = sexes[keep]
+
+        counts = np.bincount(room_positions, minlength=len(rooms))
+        age_sums = np.bincount(
+            room_positions, weights=ages, minlength=len(rooms)
+        )
+
+        # Sorting by room makes every room a contiguous segment for reduceat
+        order = np.argsort(room_positions, kind="stable")
+        occupied = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[occupied]
+
+        min_ages = np.zeros(len(rooms), dtype=np.int64)
+        max_ages = np.zeros(len(rooms), dtype=np.int64)
+        mixed_sex = np.zeros(len(rooms), dtype=bool)
+
+        if len(order):
+            sorted_ages = ages[order]
+            sorted_sexes = sexes[order]
+            min_ages[occupied] = np.minimum.reduceat(sorted_ages, starts)
+            max_ages[occupied] = np.maximum.reduceat(sorted_ages, starts)
+            mixed_sex[occupied] = np.maximum.reduceat(
+                sorted_sexes, starts
+            ) != np.minimum.reduceat(sorted_sexes, starts)
+
+        # AVG over integers truncates towards zero
+        age_sums = age_sums.astype(np.int64)
+        average_ages = np.sign(age_sums) * (
+            np.abs(age_sums) // np.maximum(counts, 1)
+        )
+
+        self._room_statistics = [
+            dict(
+                RoomID=room_id,
+                StudentsCount=students_count,
+                AvgAge=avg_age if students_count else None,
+                MinAge=min_age if students_count else None,
+                MaxAge=max_age if students_count else None,
+                AgeDifference=max_age - min_age if students_count else None,
+                MixedSex=room_mixed_sex,
+            )
+            for room_id, students_count, avg_age, min_age, max_age, room_mixed_sex in zip(
+                rooms.tolist(),
+                counts.tolist(),
+                average_ages.tolist(),
+                min_ages.tolist(),
+                max_ages.tolist(),
+                mixed_sex.tolist(),
+            )
+        ]
+
+        return self._room_statistics
@@ -0,0 +1,304 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+from backends import Backend, SqlServerBackend
+from connection_pool import ConnectionPool
+from main import DataLoader
+from query_cache import shared_query_cache
+
+
+_END = object()
+
+Records = Union[str, Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+
+class AsyncDataLoader:
+    """
+    The DataLoader methods as coroutines, so that an asyncio service does not block its
+    event loop for the database round trips.
+
+    Calls run on a bounded pool of `workers` threads, each holding a DataLoader with a
+    connection of its own, so up to `workers` calls, e.g. the four room queries under
+    `asyncio.gather`, run concurrently. The loaders share one query cache.
+    """
+
+    def __init__(
+        self,
+        connection_string: Optional[str] = None,
+        backend: Union[str, Backend] = SqlServerBackend.name,
+        workers: int = 4,
+        cache_size: int = 128,
+        cache_ttl: Optional[float] = None,
+        pool: Optional[ConnectionPool] = None,
+    ):
+        if pool is None and connection_string is None:
+            raise ValueError("Either connection_string or pool is required.")
+        if workers < 1:
+            raise ValueError("workers must be a positive integer.")
+
+        self.pool = pool or ConnectionPool(
+            connection_string, backend, max_size=workers
+        )
+        self._owns_pool = pool is None
+        self.query_cache = shared_query_cache(self.pool, cache_size, cache_ttl)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="AsyncDataLoader"
+        )
+        self._local = threading.local()
+        self._loaders: List[DataLoader] = []
+        self._loaders_lock = threading.Lock()
+
+    async def __aenter__(self) -> "AsyncDataLoader":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def _loader(self) -> DataLoader:
+        # Called on a worker thread: every worker keeps its own loader and connection
+        data_loader = getattr(self._local, "data_loader", None)
+
+        if data_loader is None:
+            # The loaders of the pool share its query cache
+            data_loader = DataLoader(pool=self.pool)
+            self._local.data_loader = data_loader
+            with self._loaders_lock:
+                self._loaders.append(data_loader)
+
+        return data_loader
+
+    async def _run(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            lambda: getattr(self._loader(), method)(*args, **kwargs),
+        )
+
+    async def create_database(self) -> None:
+        """Coroutine version of DataLoader.create_database."""
+
+        await self._run("create_database")
+
+    async def create_tables(self) -> None:
+        """Coroutine version of DataLoader.create_tables."""
+
+        await self._run("create_tables")
+
+    async def load_data(
+        self,
+        students: Records,
+        rooms: Records,
+        batch_size: int = 1000,
+        watermark: Optional[str] = None,
+        upsert: bool = False,
+        validate: bool = True,
+        reject_file: Optional[str] = None,
+        snapshot_dir: Optional[str] = None,
+        drop_indexes: Optional[bool] = None,
+        parse_processes: int = 1,
+        chunk_size: Optional[int] = None,
+        checkpoint: Optional[str] = None,
+        retries: int = 3,
+        retry_delay: float = 0.5,
+        max_pending_batches: int = 2,
+    ) -> Dict[str, int]:
+        """
+        Coroutine version of DataLoader.load_data that also accepts async iterables of
+        records, e.g. records received from the network.
+
+        An async iterable is read by a task of the event loop into a queue of at most
+        `max_pending_batches` batches of `batch_size` records, which the worker drains
+        as it inserts them; a producer that is faster than the database waits for room
+        in the queue instead of buffering the whole input.
+
+        Args:
+            students (Records): A JSON file path, or an iterable or async iterable of
+            student records.
+            rooms (Records): A JSON file path, or an iterable or async iterable of room
+            records.
+            batch_size (int, optional): The number of rows sent per round trip.
+            Defaults to 1000.
+            watermark (Optional[str], optional): The file path of the delta-load
+            watermark. Defaults to None.
+            upsert (bool, optional): Whether to update changed existing rows. Defaults
+            to False.
+            validate (bool, optional): Whether to reject invalid records. Defaults to
+            True.
+            reject_file (Optional[str], optional): The file path receiving the rejected
+            records. Defaults to None.
+            snapshot_dir (Optional[str], optional): The directory of the parsed file
+            snapshots. Defaults to None.
+            drop_indexes (Optional[bool], optional): Whether to drop the indexes during
+            the load. Defaults to None, which drops them when 'Students' is empty.
+            parse_processes (int, optional): The number of processes parsing the files.
+            Defaults to 1.
+            chunk_size (Optional[int], optional): The number of rows per committed
+            chunk. Defaults to None.
+            checkpoint (Optional[str], optional): The file path of the checkpoint that
+            a chunked load resumes from. Defaults to None.
+            retries (int, optional): The number of times a chunk is sent again after a
+            transient error. Defaults to 3.
+            retry_delay (float, optional): The seconds before the first retry of a
+            chunk. Defaults to 0.5.
+            max_pending_batches (int, optional): The number of batches read ahead of the
+            inserts. Defaults to 2.
+
+        Returns:
+            Dict[str, int]: The load report of DataLoader.load_data.
+        """
+
+        loop = asyncio.get_running_loop()
+        producers: List["asyncio.Task[None]"] = []
+
+        def bridge(source: Records) -> Union[str, Iterable[Dict[str, Any]]]:
+            if not isinstance(source, AsyncIterable):
+                return source
+
+            queue: "asyncio.Queue[Any]" = asyncio.Queue(max_pending_batches)
+            producers.append(
+                loop.create_task(_produce(source, queue, batch_size))
+            )
+
+            return _drain(queue, loop)
+
+        try:
+            return await self._run(
+                "load_data",
+                bridge(students),
+                bridge(rooms),
+                batch_size=batch_size,
+                watermark=watermark,
+                upsert=upsert,
+                validate=validate,
+                reject_file=reject_file,
+                snapshot_dir=snapshot_dir,
+                drop_indexes=drop_indexes,
+                parse_processes=parse_processes,
+                chunk_size=chunk_size,
+                checkpoint=checkpoint,
+                retries=retries,
+                retry_delay=retry_delay,
+            )
+        finally:
+            # A failed load stops draining, the producers must not wait forever
+            for producer in producers:
+                producer.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+
+    async def query_room_statistics(self) -> List[Dict[str, Any]]:
+        """Coroutine version of DataLoader.query_room_statistics."""
+
+        return await self._run("query_room_statistics")
+
+    async def query_rooms_and_students_count(self) -> List[Dict[str, Any]]:
+        """Coroutine version of DataLoader.query_rooms_and_students_count."""
+
+        return await self._run("query_rooms_and_students_count")
+
+    async def query_min_avg_age_rooms(
+        self, limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Coroutine version of DataLoader.query_min_avg_age_rooms."""
+
+        return await self._run("query_min_avg_age_rooms", limit)
+
+    async def query_max_age_difference_rooms(
+        self, limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Coroutine version of DataLoader.query_max_age_difference_rooms."""
+
+        return await self._run("query_max_age_difference_rooms", limit)
+
+    async def query_gender_mismatch_rooms(self) -> List[Dict[str, Any]]:
+        """Coroutine version of DataLoader.query_gender_mismatch_rooms."""
+
+        return await self._run("query_gender_mismatch_rooms")
+
+    async def optimize_queries(self, advise: bool = False) -> List[str]:
+        """Coroutine version of DataLoader.optimize_queries."""
+
+        return await self._run("optimize_queries", advise)
+
+    async def rebuild_room_stats(self) -> int:
+        """Coroutine version of DataLoader.rebuild_room_stats."""
+
+        return await self._run("rebuild_room_stats")
+
+    async def check_room_stats(self) -> Optional[List[Dict[str, Any]]]:
+        """Coroutine version of DataLoader.check_room_stats."""
+
+        return await self._run("check_room_stats")
+
+    async def close(self) -> None:
+        """
+        Waits for the running calls, then returns the worker connections and closes the
+        pool if the loader created it.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        await asyncio.get_running_loop().run_in_executor(None, self._shutdown)
+
+    def _shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+        for data_loader in self._loaders:
+            data_loader.close_connection()
+        self._loaders = []
+
+        if self._owns_pool:
+            self.pool.close()
+
+
+async def _produce(
+    records: AsyncIterable[Dict[str, Any]],
+    queue: "asyncio.Queue[Any]",
+    batch_size: int,
+) -> None:
+    """
+    Reads an async iterable into a bounded queue in lists of `batch_size` records,
+    followed by an end marker; an error is passed on through the queue.
+    """
+
+    try:
+        batch = []
+        async for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                await queue.put(batch)
+                batch = []
+        if batch:
+            await queue.put(batch)
+        await queue.put(_END)
+    except Exception as e:
+        await queue.put(e)
+
+
+def _drain(
+    queue: "asyncio.Queue[Any]", loop: asyncio.AbstractEventLoop
+) -> Iterator[Dict[str, Any]]:
+    """
+    Iterates, on a worker thread, over the records that `_produce` puts in the queue.
+    """
+
+    while True:
+        batch = asyncio.run_coroutine_threadsafe(queue.get(), loop).result()
+
+        if batch is _END:
+            return
+        if isinstance(batch, Exception):
+            raise batch
+
+        yield from batch
@@ -0,0 +1,839 @@
+import re
+import sqlite3
+from datetime import date
+from typing import Any, Dict, List, Sequence, Tuple, Type, Union
+
+from room_queries import CompiledQuery, RoomQuery
+
+
+# The named parameters of the statement templates, bound as positional '?' markers
+_PARAMETER = re.compile(r":(\w+)")
+
+
+class Backend:
+    """
+    A storage engine used by DataLoader: how to open a connection and the SQL dialect
+    of every statement the loader runs.
+
+    Subclasses override the connection factory and the statements whose syntax differs
+    between engines.
+    """
+
+    name = ""
+
+    create_database_queries: List[str] = []
+    create_tables_queries: List[str] = []
+
+    # The aggregates of every room that the RoomStats table stores: the students
+    # count, the sum of their ages, the earliest and latest birthdays and the count of
+    # each sex. Ages are exact and computed from integers: with dates as yyyymmdd keys,
+    # the completed years are (today - BirthDateKey) / 10000 in integer division.
+    room_statistics_template = """
+        SELECT r.RoomID, COUNT(s.StudentID) as StudentsCount,
+        COALESCE(SUM(({today} - s.BirthDateKey) / 10000), 0) as AgeSum,
+        MIN(s.BirthDateKey) as MinBirthDateKey, MAX(s.BirthDateKey) as MaxBirthDateKey,
+        COUNT(CASE WHEN s.Sex = 'M' THEN 1 END) as MaleCount,
+        COUNT(CASE WHEN s.Sex = 'F' THEN 1 END) as FemaleCount
+        FROM Rooms r
+        LEFT JOIN Students s ON r.RoomID = s.RoomID
+        GROUP BY r.RoomID
+    """
+    room_stats_columns = (
+        "RoomID",
+        "StudentsCount",
+        "AgeSum",
+        "MinBirthDateKey",
+        "MaxBirthDateKey",
+        "MaleCount",
+        "FemaleCount",
+    )
+    # The stored aggregates with the date their ages were computed at
+    room_stats_query = f"SELECT {', '.join(room_stats_columns)}, AgeDateKey FROM RoomStats ORDER BY RoomID;"
+
+    # The SQL expressions of the RoomQuery measures on the RoomStats table, where the
+    # ':today' parameter is the date key the age sums were computed at
+    room_measures: Dict[str, str] = {
+        "RoomID": "RoomID",
+        "StudentsCount": "StudentsCount",
+        "AvgAge": "CASE WHEN StudentsCount > 0 THEN AgeSum / StudentsCount END",
+        "MinAge": "(:today - MaxBirthDateKey) / 10000",
+        "MaxAge": "(:today - MinBirthDateKey) / 10000",
+        "AgeDifference": "(:today - MinBirthDateKey) / 10000 - (:today - MaxBirthDateKey) / 10000",
+        "MixedSex": "CASE WHEN MaleCount > 0 AND FemaleCount > 0 THEN 1 ELSE 0 END",
+    }
+
+    # The IDs that students may reference
+    room_ids_query = "SELECT RoomID FROM Rooms;"
+
+    # A cheap round trip proving that a pooled connection is still usable
+    ping_query = "SELECT 1;"
+
+    # Marks every RoomStats row stale, so that the refresh statement recomputes all
+    mark_all_room_stats_query = "UPDATE RoomStats SET Stale = 1;"
+
+    # The indexes IndexAdvisor chooses from, by name: the table and the columns. The
+    # last one covers the room statistics query and makes the others redundant.
+    index_candidates: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+        "idx_Students_RoomID": ("Students", ("RoomID",)),
+        "idx_Students_RoomID_Birthday": ("Students", ("RoomID", "Birthday")),
+        "idx_Students_RoomID_Birthday_Sex": (
+            "Students",
+            ("RoomID", "Birthday", "Sex"),
+        ),
+        "idx_Students_RoomID_BirthDateKey_Sex": (
+            "Students",
+            ("RoomID", "BirthDateKey", "Sex"),
+        ),
+    }
+    # The indexes created by DataLoader.optimize_queries without a workload evaluation
+    default_indexes: Tuple[str, ...] = (
+        "idx_Students_RoomID_BirthDateKey_Sex",
+    )
+
+    def room_statistics_query(self, today: date) -> str:
+        """
+        Returns the query aggregating the 'Students' table into the RoomStats columns,
+        with the ages at a given date.
+
+        Args:
+            today (date): The date the ages are computed at.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        return self.room_statistics_template.format(today=date_key(today))
+
+    def rebuild_room_stats_queries(self, today: date) -> List[str]:
+        """
+        Returns the statements recomputing the RoomStats table from scratch.
+
+        Args:
+            today (date): The date the ages are computed at.
+
+        Returns:
+            List[str]: The statements to execute, in order.
+        """
+
+        return [
+            "DELETE FROM RoomStats;",
+            f"""
+            INSERT INTO RoomStats ({", ".join(self.room_stats_columns)}, AgeDateKey, Stale)
+            SELECT a.*, {date_key(today)}, 0 FROM ({self.room_statistics_query(today)}) a;
+        """,
+        ]
+
+    def add_room_stats_query(self) -> str:
+        """
+        Returns the statement adding empty RoomStats rows for the staged rooms that
+        have none.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        return f"""
+            INSERT INTO RoomStats ({", ".join(self.room_stats_columns)}, Stale)
+            SELECT st.RoomID, 0, 0, NULL, NULL, 0, 0, 0
+            FROM {self.staging_table("Rooms")} st
+            LEFT JOIN RoomStats rs ON rs.RoomID = st.RoomID
+            WHERE rs.RoomID IS NULL
+        """
+
+    def mark_room_stats_query(self, moved: bool) -> str:
+        """
+        Returns the statement marking the RoomStats rows of the staged students' rooms
+        as stale, before the students are inserted or updated.
+
+        Args:
+            moved (bool): Whether the students may move, so that the rooms they live in
+            before the update are marked too.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        staging = self.staging_table("Students")
+        query = f"""
+            UPDATE RoomStats SET Stale = 1
+            WHERE RoomID IN (SELECT RoomID FROM {staging})
+        """
+
+        if moved:
+            query += f"""
+            OR RoomID IN (
+                SELECT s.RoomID FROM Students s
+                JOIN {staging} st ON s.StudentID = st.StudentID
+            )
+        """
+
+        return query
+
+    def refresh_room_stats_query(self) -> CompiledQuery:
+        """
+        Returns the statement recomputing the RoomStats rows marked as stale from the
+        'Students' table, one index seek per aggregate and room. The date the ages are
+        computed at is its ':today' parameter, so its text never changes.
+
+        Returns:
+            CompiledQuery: The statement, with '?' markers, and its parameter names.
+        """
+
+        def aggregate(expression: str, condition: str = "") -> str:
+            return (
+                f"(SELECT {expression} FROM Students s"
+                f" WHERE s.RoomID = RoomStats.RoomID{condition})"
+            )
+
+        statement = f"""
+            UPDATE RoomStats SET
+            StudentsCount = {aggregate("COUNT(*)")},
+            AgeSum = {aggregate("COALESCE(SUM((:today - s.BirthDateKey) / 10000), 0)")},
+            MinBirthDateKey = {aggregate("MIN(s.BirthDateKey)")},
+            MaxBirthDateKey = {aggregate("MAX(s.BirthDateKey)")},
+            MaleCount = {aggregate("COUNT(*)", " AND s.Sex = 'M'")},
+            FemaleCount = {aggregate("COUNT(*)", " AND s.Sex = 'F'")},
+            AgeDateKey = :today,
+            Stale = 0
+            WHERE Stale = 1
+        """
+
+        return CompiledQuery(
+            _PARAMETER.sub("?", statement),
+            tuple(_PARAMETER.findall(statement)),
+        )
+
+    def upgrade_tables(self, cursor: Any) -> None:
+        """
+        Adds the columns of newer versions to tables created by older ones, and fills
+        them in.
+
+        Args:
+            cursor (Any): The cursor to run the statements with.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+    def connect(self, connection_string: str) -> Any:
+        """
+        Opens a DB-API connection to the database.
+
+        Args:
+            connection_string (str): The engine-specific connection string.
+
+        Returns:
+            Any: The opened DB-API connection.
+        """
+
+        raise NotImplementedError
+
+    def prepare_bulk_cursor(self, cursor: Any) -> None:
+        """
+        Tunes a cursor for `executemany` batches.
+
+        Args:
+            cursor (Any): The cursor used for bulk inserts.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+    def staging_table(self, table: str) -> str:
+        """
+        Returns the name of the session-local staging table of a table.
+
+        Args:
+            table (str): The target table name.
+
+        Returns:
+            str: The staging table name.
+        """
+
+        raise NotImplementedError
+
+    def create_staging_queries(
+        self, table: str, columns: Sequence[str]
+    ) -> List[str]:
+        """
+        Returns the statements creating an empty staging copy of the given columns.
+
+        Args:
+            table (str): The target table name.
+            columns (Sequence[str]): The columns of the staging table.
+
+        Returns:
+            List[str]: The statements to execute, in order.
+        """
+
+        raise NotImplementedError
+
+    def truncate_staging_query(self, table: str) -> str:
+        """
+        Returns the statement emptying the staging table between batches.
+
+        Args:
+            table (str): The target table name.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        raise NotImplementedError
+
+    def drop_staging_query(self, table: str) -> str:
+        """
+        Returns the statement dropping the staging table.
+
+        Args:
+            table (str): The target table name.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        return f"DROP TABLE {self.staging_table(table)};"
+
+    def update_from_staging_query(
+        self, table: str, key: str, columns: Sequence[str]
+    ) -> str:
+        """
+        Returns the statement updating the rows of the table whose staged copy has
+        different values in the given columns.
+
+        Args:
+            table (str): The target table name.
+            key (str): The primary key column joining the staging table.
+            columns (Sequence[str]): The columns to compare and update.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        raise NotImplementedError
+
+    def create_index_query(
+        self, name: str, table: str, columns: Sequence[str]
+    ) -> str:
+        """
+        Returns the statement creating an index unless it already exists.
+
+        Args:
+            name (str): The index name.
+            table (str): The indexed table name.
+            columns (Sequence[str]): The indexed columns.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        raise NotImplementedError
+
+    def drop_index_query(self, name: str, table: str) -> str:
+        """
+        Returns the statement dropping an index if it exists.
+
+        Args:
+            name (str): The index name.
+            table (str): The indexed table name.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        raise NotImplementedError
+
+    def index_names_query(self, table: str) -> str:
+        """
+        Returns the statement selecting the names of the indexes of a table.
+
+        Args:
+            table (str): The table name.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        raise NotImplementedError
+
+    def any_row_query(self, table: str, condition: str = "") -> str:
+        """
+        Returns the statement selecting at most one row of a table, to tell whether it
+        is empty or has a row matching a condition.
+
+        Args:
+            table (str): The table name.
+            condition (str, optional): The WHERE condition. Defaults to '', which
+            matches every row.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        return f"SELECT 1 FROM {table}{_where(condition)} LIMIT 1;"
+
+    def compile_room_query(self, query: RoomQuery) -> CompiledQuery:
+        """
+        Compiles a RoomQuery into one parameterized statement on the RoomStats table.
+        Its text only depends on the query definition, not on the parameter values.
+
+        Args:
+            query (RoomQuery): The query to compile.
+
+        Returns:
+            CompiledQuery: The statement, with '?' markers, and its parameter names (see
+            RoomQuery.values).
+        """
+
+        columns = ", ".join(
+            f"{self.room_measures[column]} AS {column}"
+            for column in query.columns
+        )
+        conditions = " AND ".join(
+            f"{self.room_measures[measure]} {comparison} :filter{index}"
+            for index, (measure, comparison, _) in enumerate(query.filters)
+        )
+        order = ", ".join(
+            f"{self.room_measures[measure]} {direction}"
+            for measure, direction in query.order_by
+        )
+
+        statement = self.top_query(
+            columns, f"RoomStats{_where(conditions)}", order, query.limit
+        )
+
+        return CompiledQuery(
+            _PARAMETER.sub("?", statement),
+            tuple(_PARAMETER.findall(statement)),
+        )
+
+    def top_query(
+        self, columns: str, source: str, order: str, limit: bool
+    ) -> str:
+        """
+        Returns an ordered SELECT statement, capped by the ':limit' parameter.
+
+        Args:
+            columns (str): The select list.
+            source (str): The FROM clause, with its WHERE clause.
+            order (str): The ORDER BY list.
+            limit (bool): Whether to cap the number of rows.
+
+        Returns:
+            str: The statement template, with named parameters.
+        """
+
+        return (
+            f"SELECT {columns} FROM {source} ORDER BY {order}"
+            f"{' LIMIT :limit' if limit else ''};"
+        )
+
+    def room_stats_page_query(self, limit: int, first: bool = False) -> str:
+        """
+        Returns the statement reading the next page of RoomStats rows in RoomID order,
+        those after the RoomID given as its parameter (keyset pagination), in the
+        columns of `room_stats_query`.
+
+        Args:
+            limit (int): The number of rows per page.
+            first (bool, optional): Whether to read the first page, which takes no
+            parameter. Defaults to False.
+
+        Returns:
+            str: The statement to execute.
+        """
+
+        return (
+            f"SELECT {', '.join(self.room_stats_columns)}, AgeDateKey FROM RoomStats"
+            f"{_where('' if first else 'RoomID > ?')} ORDER BY RoomID LIMIT {int(limit)};"
+        )
+
+    def query_plan(
+        self, cursor: Any, query: str, parameters: Sequence[Any] = ()
+    ) -> List[str]:
+        """
+        Returns the estimated execution plan of a query without running it.
+
+        Args:
+            cursor (Any): The cursor to explain the query with.
+            query (str): The query.
+            parameters (Sequence[Any], optional): The values of its '?' markers.
+            Defaults to ().
+
+        Returns:
+            List[str]: The plan steps, as text.
+        """
+
+        raise NotImplementedError
+
+    def is_transient(self, error: BaseException) -> bool:
+        """
+        Checks whether an error may not happen again when the failed work is retried,
+        such as a deadlock, a lock timeout or a dropped connection.
+
+        Args:
+            error (BaseException): The error raised by the driver.
+
+        Returns:
+            bool: Whether the work is worth retrying.
+        """
+
+        return False
+
+
+class SqlServerBackend(Backend):
+    """Microsoft SQL Server through pyodbc."""
+
+    name = "sqlserver"
+
+    # The SQLSTATEs of a deadlock victim, a timeout and a lost connection
+    transient_states = frozenset(("40001", "HYT00", "HYT01", "08S01"))
+
+    create_database_queries = [
+        """
+        IF NOT EXISTS (SELECT name FROM sys.databases WHERE name = 'Dormitory')
+        BEGIN
+            CREATE DATABASE Dormitory;
+        END;
+    """
+    ]
+    create_tables_queries = [
+        """
+        IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'Rooms')
+        BEGIN
+            CREATE TABLE Rooms (
+                RoomID INT PRIMARY KEY,
+                RoomName NVARCHAR(9)
+            );
+        END;
+    """,
+        """
+        IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'Students')
+        BEGIN
+            CREATE TABLE Students (
+                Birthday DATETIMEOFFSET,
+                StudentID INT PRIMARY KEY,
+                Name NVARCHAR(50),
+                RoomID INT,
+                Sex NVARCHAR(1),
+                BirthDateKey INT,
+                FOREIGN KEY (RoomID) REFERENCES Rooms(RoomID)
+            );
+        END;
+    """,
+        """
+        IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'RoomStats')
+        BEGIN
+            CREATE TABLE RoomStats (
+                RoomID INT PRIMARY KEY,
+                StudentsCount INT NOT NULL,
+                AgeSum BIGINT NOT NULL,
+                MinBirthDateKey INT,
+                MaxBirthDateKey INT,
+                MaleCount INT NOT NULL,
+                FemaleCount INT NOT NULL,
+                AgeDateKey INT,
+                Stale BIT NOT NULL,
+                FOREIGN KEY (RoomID) REFERENCES Rooms(RoomID)
+            );
+        END;
+    """,
+    ]
+
+    def upgrade_tables(self, cursor: Any) -> None:
+        # The UPDATE is compiled by EXEC once the column exists
+        cursor.execute(
+            """
+            IF COL_LENGTH('Students', 'BirthDateKey') IS NULL
+            BEGIN
+                ALTER TABLE Students ADD BirthDateKey INT;
+                EXEC('UPDATE Students SET BirthDateKey = CONVERT(INT, CONVERT(CHAR(8), Birthday, 112));');
+            END;
+        """
+        )
+
+    def connect(self, connection_string: str) -> Any:
+        # Imported on use so that the other backends work without an ODBC driver manager
+        import pyodbc
+
+        return pyodbc.connect(connection_string)
+
+    def prepare_bulk_cursor(self, cursor: Any) -> None:
+        cursor.fast_executemany = True
+
+    def is_transient(self, error: BaseException) -> bool:
+        # pyodbc errors carry the SQLSTATE as their first argument
+        return bool(error.args) and error.args[0] in self.transient_states
+
+    def staging_table(self, table: str) -> str:
+        return f"#{table}Staging"
+
+    def create_staging_queries(
+        self, table: str, columns: Sequence[str]
+    ) -> List[str]:
+        staging = self.staging_table(table)
+
+        return [
+            f"""
+            IF OBJECT_ID('tempdb..{staging}') IS NOT NULL DROP TABLE {staging};
+            SELECT TOP(0) {", ".join(columns)} INTO {staging} FROM {table};
+        """
+        ]
+
+    def truncate_staging_query(self, table: str) -> str:
+        return f"TRUNCATE TABLE {self.staging_table(table)};"
+
+    def update_from_staging_query(
+        self, table: str, key: str, columns: Sequence[str]
+    ) -> str:
+        # EXCEPT compares NULLs as equal values
+        return f"""
+            UPDATE t SET {", ".join(f"t.{column} = st.{column}" for column in columns)}
+            FROM {table} t
+            JOIN {self.staging_table(table)} st ON t.{key} = st.{key}
+            WHERE EXISTS (
+                SELECT {", ".join(f"st.{column}" for column in columns)}
+                EXCEPT
+                SELECT {", ".join(f"t.{column}" for column in columns)}
+            )
+        """
+
+    def create_index_query(
+        self, name: str, table: str, columns: Sequence[str]
+    ) -> str:
+        return f"""
+            IF NOT EXISTS (
+                SELECT * FROM sys.indexes WHERE name = '{name}' AND object_id = OBJECT_ID('{table}')
+            )
+            BEGIN
+                CREATE INDEX {name} ON {table}({", ".join(columns)});
+            END;
+        """
+
+    def drop_index_query(self, name: str, table: str) -> str:
+        return f"DROP INDEX IF EXISTS {name} ON {table};"
+
+    def index_names_query(self, table: str) -> str:
+        # The heap of a table without a clustered index is listed without a name
+        return f"SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID('{table}') AND name IS NOT NULL;"
+
+    def any_row_query(self, table: str, condition: str = "") -> str:
+        return f"SELECT TOP(1) 1 FROM {table}{_where(condition)};"
+
+    def top_query(
+        self, columns: str, source: str, order: str, limit: bool
+    ) -> str:
+        return (
+            f"SELECT {'TOP (:limit) ' if limit else ''}{columns} FROM {source}"
+            f" ORDER BY {order};"
+        )
+
+    def room_stats_page_query(self, limit: int, first: bool = False) -> str:
+        return (
+            f"SELECT TOP({int(limit)}) {', '.join(self.room_stats_columns)}, AgeDateKey"
+            f" FROM RoomStats{_where('' if first else 'RoomID > ?')} ORDER BY RoomID;"
+        )
+
+    def query_plan(
+        self, cursor: Any, query: str, parameters: Sequence[Any] = ()
+    ) -> List[str]:
+        # SHOWPLAN_TEXT must be set in a batch of its own; while it is on, statements
+        # return their plan (the statement text, then one row per operator) instead
+        # of running
+        cursor.execute("SET SHOWPLAN_TEXT ON;")
+        try:
+            cursor.execute(query, parameters)
+            plan = [row[0] for row in cursor.fetchall()]
+            while cursor.nextset():
+                plan += [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.execute("SET SHOWPLAN_TEXT OFF;")
+
+        return [step.strip() for step in plan]
+
+
+class SqliteBackend(Backend):
+    """
+    Embedded SQLite, a local fast path for development, tests and benchmarks.
+
+    The connection string is the database file path (or ':memory:'). Connections run
+    in WAL mode with relaxed syncing, which is the usual setup for bulk loads.
+    """
+
+    name = "sqlite"
+
+    pragmas = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -65536",
+        "PRAGMA foreign_keys = ON",
+    )
+
+    create_tables_queries = [
+        """
+        CREATE TABLE IF NOT EXISTS Rooms (
+            RoomID INTEGER PRIMARY KEY,
+            RoomName NVARCHAR(9)
+        );
+    """,
+        """
+        CREATE TABLE IF NOT EXISTS Students (
+            Birthday TEXT,
+            StudentID INTEGER PRIMARY KEY,
+            Name NVARCHAR(50),
+            RoomID INT,
+            Sex NVARCHAR(1),
+            BirthDateKey INT,
+            FOREIGN KEY (RoomID) REFERENCES Rooms(RoomID)
+        );
+    """,
+        """
+        CREATE TABLE IF NOT EXISTS RoomStats (
+            RoomID INTEGER PRIMARY KEY,
+            StudentsCount INT NOT NULL,
+            AgeSum INT NOT NULL,
+            MinBirthDateKey INT,
+            MaxBirthDateKey INT,
+            MaleCount INT NOT NULL,
+            FemaleCount INT NOT NULL,
+            AgeDateKey INT,
+            Stale INT NOT NULL,
+            FOREIGN KEY (RoomID) REFERENCES Rooms(RoomID)
+        );
+    """,
+    ]
+
+    def upgrade_tables(self, cursor: Any) -> None:
+        cursor.execute("PRAGMA table_info(Students);")
+        if "BirthDateKey" in (row[1] for row in cursor.fetchall()):
+            return
+
+        cursor.execute("ALTER TABLE Students ADD COLUMN BirthDateKey INT;")
+        cursor.execute(
+            "UPDATE Students SET BirthDateKey = CAST("
+            "substr(Birthday, 1, 4) || substr(Birthday, 6, 2) || substr(Birthday, 9, 2)"
+            " AS INTEGER);"
+        )
+
+    def connect(self, connection_string: str) -> Any:
+        # Parallel loads share a file between connections: wait for the write lock
+        # instead of failing, and allow a connection to be closed by its owner thread
+        connection = sqlite3.connect(
+            connection_string, timeout=60, check_same_thread=False
+        )
+
+        for pragma in self.pragmas:
+            connection.execute(pragma)
+
+        return connection
+
+    def is_transient(self, error: BaseException) -> bool:
+        # Another connection held the write lock for longer than the busy timeout
+        return isinstance(error, sqlite3.OperationalError) and any(
+            reason in str(error) for reason in ("locked", "busy")
+        )
+
+    def staging_table(self, table: str) -> str:
+        return f"temp.{table}Staging"
+
+    def create_staging_queries(
+        self, table: str, columns: Sequence[str]
+    ) -> List[str]:
+        staging = self.staging_table(table)
+
+        return [
+            f"DROP TABLE IF EXISTS {staging};",
+            f"CREATE TABLE {staging} AS SELECT {', '.join(columns)} FROM {table} WHERE 0;",
+        ]
+
+    def truncate_staging_query(self, table: str) -> str:
+        return f"DELETE FROM {self.staging_table(table)};"
+
+    def update_from_staging_query(
+        self, table: str, key: str, columns: Sequence[str]
+    ) -> str:
+        return f"""
+            UPDATE {table} SET {", ".join(f"{column} = st.{column}" for column in columns)}
+            FROM {self.staging_table(table)} st
+            WHERE {table}.{key} = st.{key}
+            AND ({" OR ".join(f"{table}.{column} IS NOT st.{column}" for column in columns)})
+        """
+
+    def create_index_query(
+        self, name: str, table: str, columns: Sequence[str]
+    ) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)});"
+
+    def drop_index_query(self, name: str, table: str) -> str:
+        return f"DROP INDEX IF EXISTS {name};"
+
+    def index_names_query(self, table: str) -> str:
+        return f"SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = '{table}';"
+
+    def query_plan(
+        self, cursor: Any, query: str, parameters: Sequence[Any] = ()
+    ) -> List[str]:
+        # Rows of (id, parent, unused, detail), e.g. 'SCAN s USING COVERING INDEX ...'
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}", parameters)
+
+        return [row[3] for row in cursor.fetchall()]
+
+
+def _where(condition: str) -> str:
+    return f" WHERE {condition}" if condition else ""
+
+
+def date_key(value: Union[str, date]) -> int:
+    """
+    Converts a date, or a string starting with a YYYY-MM-DD date, to the yyyymmdd
+    integer stored in the BirthDateKey column.
+
+    Args:
+        value (Union[str, date]): The date or date string, e.g. '2004-01-07T00:00:00'.
+
+    Raises:
+        ValueError: If the string does not start with a date.
+
+    Returns:
+        int: The date key, e.g. 20040107.
+    """
+
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+BACKENDS: Dict[str, Type[Backend]] = {
+    SqlServerBackend.name: SqlServerBackend,
+    SqliteBackend.name: SqliteBackend,
+}
+
+
+def get_backend(backend: Union[str, Backend]) -> Backend:
+    """
+    Resolves a backend name or instance to a backend instance.
+
+    Args:
+        backend (Union[str, Backend]): A registered backend name ('sqlserver' or 'sqlite')
+        or a Backend instance.
+
+    Raises:
+        ValueError: If the backend name is not registered.
+
+    Returns:
+        Backend: The backend instance.
+    """
+
+    if isinstance(backend, Backend):
+        return backend
+
+    try:
+        backend_class = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend '{backend}'. Available backends: {', '.join(BACKENDS)}."
+        ) from None
+
+    return backend_class()
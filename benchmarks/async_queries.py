@@ -0,0 +1,113 @@
+"""
+Compares the request throughput of AsyncDataLoader with the sync DataLoader.
+
+    python -m benchmarks.async_queries --requests 200 --workers 4
+
+Every request runs the four room queries. The sync loader serves the requests one after
+the other on one connection; the async loader serves them concurrently under
+asyncio.gather, each request gathering its four queries. The query cache is disabled so
+that every query reaches the database.
+
+The gain comes from overlapping round trips: against a database server the requests
+wait on the network and run in parallel on the server, while the embedded SQLite engine
+runs the queries on the client's CPU cores, so it only gains with several cores.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from async_loader import AsyncDataLoader
+from benchmarks.datasets import write_rooms, write_students
+from main import DataLoader
+
+
+def sync_requests(
+    connection_string: str, backend: str, requests: int
+) -> float:
+    with DataLoader(connection_string, backend, cache_size=0) as data_loader:
+        started = time.perf_counter()
+        for _ in range(requests):
+            data_loader.query_rooms_and_students_count()
+            data_loader.query_min_avg_age_rooms()
+            data_loader.query_max_age_difference_rooms()
+            data_loader.query_gender_mismatch_rooms()
+
+        return time.perf_counter() - started
+
+
+async def async_requests(
+    connection_string: str, backend: str, requests: int, workers: int
+) -> float:
+    async with AsyncDataLoader(
+        connection_string, backend, workers=workers, cache_size=0
+    ) as data_loader:
+
+        async def request() -> None:
+            await asyncio.gather(
+                data_loader.query_rooms_and_students_count(),
+                data_loader.query_min_avg_age_rooms(),
+                data_loader.query_max_age_difference_rooms(),
+                data_loader.query_gender_mismatch_rooms(),
+            )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(requests)))
+
+        return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument(
+        "--backend", choices=["sqlite", "sqlserver"], default="sqlite"
+    )
+    parser.add_argument("--connection-string")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection_string = arguments.connection_string or os.path.join(
+            directory, "dormitory.db"
+        )
+        students = os.path.join(directory, "students.json")
+        rooms = os.path.join(directory, "rooms.json")
+        write_students(students, arguments.students, arguments.rooms)
+        write_rooms(rooms, arguments.rooms)
+
+        with DataLoader(connection_string, arguments.backend) as data_loader:
+            data_loader.create_tables()
+            data_loader.load_data(students, rooms)
+
+        print(
+            f"{'loader':<10} {'workers':>8} {'seconds':>10} {'requests/s':>12}"
+        )
+
+        elapsed = sync_requests(
+            connection_string, arguments.backend, arguments.requests
+        )
+        print(
+            f"{'sync':<10} {1:>8} {elapsed:>10.2f} {arguments.requests / elapsed:>12.1f}"
+        )
+
+        for workers in arguments.workers:
+            elapsed = asyncio.run(
+                async_requests(
+                    connection_string,
+                    arguments.backend,
+                    arguments.requests,
+                    workers,
+                )
+            )
+            print(
+                f"{'async':<10} {workers:>8} {elapsed:>10.2f} {arguments.requests / elapsed:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
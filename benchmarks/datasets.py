@@ -0,0 +1,67 @@
+import json
+import random
+from datetime import date, timedelta
+
+
+FIRST_NAMES = ("Peggy", "Christian", "Juan", "Megan", "Kevin", "Laura")
+LAST_NAMES = ("Ryan", "Bush", "Garcia", "Jones", "Lopez", "Miller")
+
+
+def write_rooms(path: str, count: int) -> None:
+    """
+    Writes a rooms file in the format of data_files/rooms.json.
+
+    Args:
+        path (str): The output file path.
+        count (int): The number of rooms, with IDs 0..count-1.
+
+    Returns:
+        None: This function does not return any value.
+    """
+
+    with open(path, "w") as file:
+        file.write("[\n")
+        for room_id in range(count):
+            if room_id:
+                file.write(",\n")
+            json.dump(
+                {"id": room_id, "name": f"Room #{room_id}"}, file, indent=4
+            )
+        file.write("\n]")
+
+
+def write_students(path: str, count: int, rooms: int, seed: int = 0) -> None:
+    """
+    Writes a students file in the format of data_files/students.json.
+
+    Args:
+        path (str): The output file path.
+        count (int): The number of students, with IDs 0..count-1.
+        rooms (int): The number of rooms the students are spread over.
+        seed (int, optional): The random seed, so that runs are comparable. Defaults to 0.
+
+    Returns:
+        None: This function does not return any value.
+    """
+
+    generator = random.Random(seed)
+    first_day = date(1900, 1, 1)
+
+    with open(path, "w") as file:
+        file.write("[\n")
+        for student_id in range(count):
+            if student_id:
+                file.write(",\n")
+            birthday = first_day + timedelta(days=generator.randrange(45000))
+            json.dump(
+                {
+                    "birthday": f"{birthday.isoformat()}T00:00:00.000000",
+                    "id": student_id,
+                    "name": f"{generator.choice(FIRST_NAMES)} {generator.choice(LAST_NAMES)}",
+                    "room": generator.randrange(rooms),
+                    "sex": generator.choice("MF"),
+                },
+                file,
+                indent=4,
+            )
+        file.write("\n]")
@@ -0,0 +1,106 @@
+"""
+Compares the streaming DocumentWriter exports with the previous in-memory exports.
+
+    python -m benchmarks.export --rows 1000000
+
+The previous path built the whole JSON string with json.dumps(indent=2), and for XML a
+full ElementTree that was serialized, re-parsed with minidom and pretty-printed.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import xml.dom.minidom as minidom
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Dict, Iterator, List
+
+from main import DocumentWriter
+
+
+def records(count: int) -> Iterator[Dict[str, Any]]:
+    for room_id in range(count):
+        yield dict(RoomID=room_id, StudentsCount=room_id % 7)
+
+
+def in_memory_json(export_result: List[Dict[str, Any]], path: str) -> None:
+    json_result = json.dumps(export_result, indent=2)
+
+    with open(path, "w") as json_file:
+        json_file.write(json_result)
+
+
+def in_memory_xml(export_result: List[Dict[str, Any]], path: str) -> None:
+    root = ET.Element("Records")
+
+    for item in export_result:
+        item_element = ET.SubElement(root, "Data")
+        for key, value in item.items():
+            element = ET.SubElement(item_element, key)
+            element.text = str(value)
+
+    xml_string = minidom.parseString(ET.tostring(root)).toprettyxml(
+        indent="  "
+    )
+
+    with open(path, "w", encoding="utf-8") as xml_file:
+        xml_file.write(xml_string)
+
+
+def measure(export: Callable[[], Any]) -> Dict[str, float]:
+    started = time.perf_counter()
+    export()
+    elapsed = time.perf_counter() - started
+
+    # Memory is traced in a second run, tracing slows the export down
+    tracemalloc.start()
+    try:
+        export()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return dict(seconds=elapsed, peak_mib=peak / 2**20)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    arguments = parser.parse_args()
+    rows = arguments.rows
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "result.json")
+        xml_path = os.path.join(directory, "result.xml")
+
+        # The in-memory paths receive the materialized list they were given before
+        cases = {
+            "json in-memory": lambda: in_memory_json(
+                list(records(rows)), json_path
+            ),
+            "json streaming": lambda: DocumentWriter.write_json(
+                records(rows), json_path
+            ),
+            "ndjson streaming": lambda: DocumentWriter.write_json(
+                records(rows), json_path, ndjson=True
+            ),
+            "xml in-memory": lambda: in_memory_xml(
+                list(records(rows)), xml_path
+            ),
+            "xml streaming": lambda: DocumentWriter.write_xml(
+                records(rows), xml_path
+            ),
+        }
+
+        print(f"{'export':<18} {'seconds':>10} {'peak MiB':>10}")
+        for name, export in cases.items():
+            result = measure(export)
+            print(
+                f"{name:<18} {result['seconds']:>10.2f} {result['peak_mib']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
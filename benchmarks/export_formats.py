@@ -0,0 +1,67 @@
+"""
+Compares the write time and file size of every export format of EXPORT_WRITERS.
+
+    python -m benchmarks.export_formats --rows 1000000
+
+The records are RoomStatistics named tuples, as streamed by
+DataLoader.iter_room_statistics. The arrow and parquet formats are skipped when pyarrow
+is not installed.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Iterator
+
+from main import EXPORT_WRITERS, RoomStatistics
+
+
+def records(count: int) -> Iterator[RoomStatistics]:
+    for room_id in range(count):
+        students_count = room_id % 7
+        if not students_count:
+            yield RoomStatistics(room_id, 0, None, None, None, None, False)
+            continue
+
+        min_age = 17 + room_id % 5
+        max_age = min_age + room_id % 4
+        yield RoomStatistics(
+            room_id,
+            students_count,
+            (min_age + max_age) // 2,
+            min_age,
+            max_age,
+            max_age - min_age,
+            students_count > 1 and room_id % 3 == 0,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'format':<10} {'seconds':>10} {'MiB':>10} {'rows/s':>12}")
+
+        for format_type, writer in EXPORT_WRITERS.items():
+            path = os.path.join(directory, f"result.{format_type}")
+
+            started = time.perf_counter()
+            try:
+                writer(records(arguments.rows), path)
+            except ImportError as e:
+                print(f"{format_type:<10} skipped: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+
+            print(
+                f"{format_type:<10} {elapsed:>10.2f} "
+                f"{os.path.getsize(path) / 2**20:>10.1f} "
+                f"{arguments.rows / elapsed:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Measures the import time of main with `python -X importtime` and checks that it stays lazy.
+
+    python -m benchmarks.import_time --max-ms 100
+
+The module is imported in fresh interpreters, after a first run that writes the bytecode
+cache, and the best cumulative time is reported with the slowest imports of that run.
+The exit status is 1 when one of LAZY_MODULES was imported, as they must only be loaded
+by the features using them, or when the import took longer than `--max-ms`.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+# Slow or optional modules that importing main must not load
+LAZY_MODULES = (
+    "numpy",
+    "pyarrow",
+    "pyodbc",
+    "multiprocessing",
+    "urllib.request",
+    "xml.dom",
+    "xml.etree",
+    "xml.sax",
+)
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """
+    Imports a module in a fresh interpreter.
+
+    Args:
+        module (str): The module name.
+
+    Returns:
+        List[Tuple[str, int, int]]: The name, self and cumulative microseconds of every
+        module imported.
+    """
+
+    environment = dict(os.environ)
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=environment,
+        check=True,
+    )
+
+    times = []
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, cumulative, name = line.split(":", 1)[1].split("|")
+        times.append((name.strip(), int(self_time), int(cumulative)))
+
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        help="the import time above which the exit status is 1",
+    )
+    arguments = parser.parse_args()
+
+    # The first run writes the bytecode cache
+    import_times(arguments.module)
+    runs = [import_times(arguments.module) for _ in range(arguments.repeat)]
+    best = min(runs, key=lambda times: times[-1][2])
+    cumulative: Dict[str, int] = {name: total for name, _, total in best}
+    milliseconds = cumulative[arguments.module] / 1000
+
+    print(f"import {arguments.module}: {milliseconds:.1f} ms")
+    print(f"{'module':<40} {'self ms':>10} {'cumulative ms':>14}")
+    for name, self_time, total in sorted(
+        best, key=lambda times: times[1], reverse=True
+    )[: arguments.top]:
+        print(f"{name:<40} {self_time / 1000:>10.1f} {total / 1000:>14.1f}")
+
+    eager = [
+        lazy
+        for lazy in LAZY_MODULES
+        if any(
+            name == lazy or name.startswith(f"{lazy}.") for name in cumulative
+        )
+    ]
+    exit_status = 0
+
+    if eager:
+        print(f"Imported eagerly: {', '.join(eager)}")
+        exit_status = 1
+    if arguments.max_ms is not None and milliseconds > arguments.max_ms:
+        print(f"Slower than {arguments.max_ms:.1f} ms")
+        exit_status = 1
+
+    return exit_status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
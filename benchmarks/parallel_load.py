@@ -0,0 +1,90 @@
+"""
+Compares DataLoader.load_data throughput for 1/2/4/8 worker connections.
+
+    python -m benchmarks.parallel_load --students 200000
+    python -m benchmarks.parallel_load --backend sqlserver --connection-string "DRIVER=..."
+
+With the SQL Server backend the RoomStats, Students and Rooms tables are emptied before
+every run. SQLite serializes writers, so its numbers only show the overhead of the parallel mode.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.datasets import write_rooms, write_students
+from main import DataLoader
+
+
+def run(
+    connection_string: str,
+    backend: str,
+    students: str,
+    rooms: str,
+    workers: int,
+    batch_size: int,
+) -> float:
+    data_loader = DataLoader(connection_string, backend)
+
+    try:
+        data_loader.create_tables()
+        data_loader.cursor.execute("DELETE FROM RoomStats;")
+        data_loader.cursor.execute("DELETE FROM Students;")
+        data_loader.cursor.execute("DELETE FROM Rooms;")
+        data_loader.connection.commit()
+
+        started = time.perf_counter()
+        load_report = data_loader.load_data(
+            students, rooms, batch_size=batch_size, workers=workers
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        data_loader.close_connection()
+
+    if not load_report["StudentsInserted"]:
+        raise RuntimeError(
+            f"The load with {workers} workers inserted nothing."
+        )
+
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument(
+        "--backend", choices=["sqlite", "sqlserver"], default="sqlite"
+    )
+    parser.add_argument("--connection-string")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        students = os.path.join(directory, "students.json")
+        rooms = os.path.join(directory, "rooms.json")
+        write_students(students, arguments.students, arguments.rooms)
+        write_rooms(rooms, arguments.rooms)
+
+        print(f"{'workers':>8} {'seconds':>10} {'rows/s':>12}")
+        for workers in arguments.workers:
+            connection_string = arguments.connection_string or os.path.join(
+                directory, f"workers_{workers}.db"
+            )
+            elapsed = run(
+                connection_string,
+                arguments.backend,
+                students,
+                rooms,
+                workers,
+                arguments.batch_size,
+            )
+            print(
+                f"{workers:>8} {elapsed:>10.2f} {arguments.students / elapsed:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compares the parsing throughput of the students file for 1/2/4/8 processes.
+
+    python -m benchmarks.parallel_parse --students 1000000
+
+One process is the streaming parser of json_stream.iter_json_array; more processes
+parse byte ranges of the file with iter_json_array_parallel.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import deque
+from typing import Any, Iterable
+
+from benchmarks.datasets import write_students
+from json_stream import iter_json_array, iter_json_array_parallel
+
+
+def measure(records: Iterable[Any]) -> float:
+    started = time.perf_counter()
+    deque(records, maxlen=0)
+
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=500000)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument(
+        "--processes", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+    parser.add_argument(
+        "--range-size",
+        type=int,
+        default=8 * 1024 * 1024,
+        help="the bytes per parsed range (default: 8 MiB)",
+    )
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        students = os.path.join(directory, "students.json")
+        write_students(students, arguments.students, arguments.rooms)
+
+        print(f"{'processes':>9} {'seconds':>10} {'records/s':>12}")
+        for processes in arguments.processes:
+            elapsed = measure(
+                iter_json_array_parallel(
+                    students, processes, arguments.range_size
+                )
+                if processes > 1
+                else iter_json_array(students)
+            )
+            print(
+                f"{processes:>9} {elapsed:>10.2f} {arguments.students / elapsed:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compares reading the students file by parsing its JSON with reading its snapshot.
+
+    python -m benchmarks.snapshot --students 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import deque
+from typing import Any, Callable, Iterable
+
+from benchmarks.datasets import write_students
+from json_stream import iter_json_array
+from snapshot import SnapshotCache
+
+
+def measure(read: Callable[[], Iterable[Any]]) -> float:
+    started = time.perf_counter()
+    deque(read(), maxlen=0)
+
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=200000)
+    parser.add_argument("--rooms", type=int, default=1000)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        students = os.path.join(directory, "students.json")
+        write_students(students, arguments.students, arguments.rooms)
+        snapshots = SnapshotCache(os.path.join(directory, "snapshots"))
+
+        cases = {
+            "json parse": lambda: iter_json_array(students),
+            "parse + write snapshot": lambda: snapshots.records(students),
+            "snapshot": lambda: snapshots.records(students),
+        }
+
+        print(f"{'read':<24} {'seconds':>10} {'records/s':>12}")
+        for name, read in cases.items():
+            elapsed = measure(read)
+            print(
+                f"{name:<24} {elapsed:>10.2f} {arguments.students / elapsed:>12.0f}"
+            )
+
+        print(
+            f"file {os.path.getsize(students) / 2**20:.1f} MiB, snapshot "
+            f"{os.path.getsize(snapshots.snapshot_path(students)) / 2**20:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
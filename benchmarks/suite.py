@@ -0,0 +1,275 @@
+"""
+Times ingestion, the room queries and the exports on synthetic datasets, and checks
+the timings against a stored baseline.
+
+    python -m benchmarks.suite --sizes 10k 100k --update-baseline
+    python -m benchmarks.suite --sizes 10k 100k
+
+For every size (students; rooms are a tenth of it) a dataset in the schema of
+data_files/*.json is generated and loaded into a fresh SQLite database, then every
+query_* method and the JSON and XML exports of DocumentWriter.export_result are timed
+with the query cache disabled. The seconds, rows per second and peak RSS of every step
+are written to the results file. With a baseline file, the run fails when a step is
+slower than its baseline by more than the threshold; steps faster than --min-seconds
+in the baseline are too noisy to compare and are skipped.
+
+Peak RSS is reset before every step where the kernel allows it (Linux
+/proc/self/clear_refs); elsewhere it is the peak of the whole process.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.datasets import write_rooms, write_students
+from main import QUERIES, DataLoader, DocumentWriter, run_query
+
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def reset_peak_rss() -> None:
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mib() -> Optional[float]:
+    try:
+        with open("/proc/self/status", "r") as file:
+            match = re.search(r"VmHWM:\s+(\d+) kB", file.read())
+        if match:
+            return int(match.group(1)) / 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(
+    step: Callable[[], Any], rows: int, repeat: int = 1
+) -> Dict[str, Any]:
+    """
+    Runs a step `repeat` times and keeps its fastest run.
+
+    Args:
+        step (Callable[[], Any]): The step to time.
+        rows (int): The number of rows the step processes.
+        repeat (int, optional): The number of runs. Defaults to 1.
+
+    Returns:
+        Dict[str, Any]: The 'Seconds', 'RowsPerSecond' and 'PeakRssMiB' of the step.
+    """
+
+    reset_peak_rss()
+    seconds = float("inf")
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        step()
+        seconds = min(seconds, time.perf_counter() - started)
+
+    return dict(
+        Seconds=seconds,
+        RowsPerSecond=rows / seconds if seconds else None,
+        PeakRssMiB=peak_rss_mib(),
+    )
+
+
+def run_size(students: int, directory: str, repeat: int) -> Dict[str, Any]:
+    """
+    Benchmarks every step on a generated dataset of `students` students.
+
+    Args:
+        students (int): The number of students.
+        directory (str): The directory of the dataset and database files.
+        repeat (int): The number of runs of the repeatable steps.
+
+    Returns:
+        Dict[str, Any]: The measurements of every step by its name.
+    """
+
+    rooms = max(students // 10, 1)
+    students_path = os.path.join(directory, f"students_{students}.json")
+    rooms_path = os.path.join(directory, f"rooms_{students}.json")
+    write_students(students_path, students, rooms)
+    write_rooms(rooms_path, rooms)
+
+    results: Dict[str, Any] = {}
+    loads = 0
+    data_loader: Optional[DataLoader] = None
+
+    def load() -> None:
+        # Every run loads into a new database, the last one is queried
+        nonlocal loads, data_loader
+
+        if data_loader is not None:
+            data_loader.close_connection()
+        loads += 1
+        data_loader = DataLoader(
+            os.path.join(directory, f"dormitory_{students}_{loads}.db"),
+            backend="sqlite",
+            cache_size=0,
+        )
+        data_loader.create_tables()
+        data_loader.load_data(students_path, rooms_path)
+
+    try:
+        results["load_data"] = measure(load, students + rooms, repeat)
+
+        for query, (method, _) in QUERIES.items():
+            results[method] = measure(
+                lambda: run_query(data_loader, query, 5), students, repeat
+            )
+
+        export = data_loader.query_rooms_and_students_count()
+    finally:
+        if data_loader is not None:
+            data_loader.close_connection()
+
+    for format_type in ("json", "xml"):
+        file_path = os.path.join(directory, f"result.{format_type}")
+        results[f"export_result_{format_type}"] = measure(
+            lambda: DocumentWriter.export_result(
+                export, format_type, file_path
+            ),
+            len(export),
+            repeat,
+        )
+
+    for path in (students_path, rooms_path):
+        os.remove(path)
+
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float,
+    min_seconds: float,
+) -> List[str]:
+    """
+    Compares the step timings with a baseline.
+
+    Args:
+        results (Dict[str, Dict[str, Any]]): The measurements by size and step.
+        baseline (Dict[str, Dict[str, Any]]): The baseline measurements by size and step.
+        threshold (float): The accepted slowdown, e.g. 0.25 for 25%.
+        min_seconds (float): The baseline duration below which a step is not compared.
+
+    Returns:
+        List[str]: A description of every regressed step.
+    """
+
+    regressions = []
+
+    for size, steps in results.items():
+        for step, measurement in steps.items():
+            expected = baseline.get(size, {}).get(step)
+            if not expected or expected["Seconds"] < min_seconds:
+                continue
+
+            slowdown = measurement["Seconds"] / expected["Seconds"] - 1
+            if slowdown > threshold:
+                regressions.append(
+                    f"{size} {step}: {measurement['Seconds']:.3f}s, "
+                    f"{slowdown:.0%} slower than {expected['Seconds']:.3f}s"
+                )
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", nargs="+", choices=list(SIZES), default=["10k", "100k"]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--results", default=os.path.join(BENCHMARKS_DIRECTORY, "results.json")
+    )
+    parser.add_argument(
+        "--baseline",
+        default=os.path.join(BENCHMARKS_DIRECTORY, "baseline.json"),
+    )
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-seconds", type=float, default=0.1)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store this run as the baseline instead of comparing with it",
+    )
+    arguments = parser.parse_args(argv)
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in arguments.sizes:
+            results[size] = run_size(SIZES[size], directory, arguments.repeat)
+
+            print(f"{size} students")
+            print(
+                f"  {'step':<32} {'seconds':>10} {'rows/s':>12} {'peak MiB':>10}"
+            )
+            for step, measurement in results[size].items():
+                print(
+                    f"  {step:<32} {measurement['Seconds']:>10.3f} "
+                    f"{measurement['RowsPerSecond'] or 0:>12.0f} "
+                    f"{measurement['PeakRssMiB'] or 0:>10.1f}"
+                )
+
+    report = dict(
+        Python=platform.python_version(),
+        Platform=platform.platform(),
+        Results=results,
+    )
+
+    with open(arguments.results, "w") as file:
+        json.dump(report, file, indent=2)
+
+    if arguments.update_baseline:
+        with open(arguments.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline stored in {arguments.baseline}.")
+        return 0
+
+    if not os.path.exists(arguments.baseline):
+        print(f"No baseline at {arguments.baseline}, nothing to compare.")
+        return 0
+
+    with open(arguments.baseline, "r") as file:
+        baseline = json.load(file)["Results"]
+
+    regressions = find_regressions(
+        results, baseline, arguments.threshold, arguments.min_seconds
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+
+class LoadCheckpoint:
+    """
+    The progress of a chunked load, persisted as JSON after every committed chunk, that
+    lets a load interrupted by a failure or a killed process resume where it stopped.
+
+    For every input (e.g. 'Students') it records the number of rows whose chunks were
+    committed and, for a file input, the file size and modification time, as well as
+    the indexes the load dropped, which a killed load could not rebuild. A resumed
+    load skips that many leading rows of the input without sending them to the
+    database; the rows are still parsed and validated, so the rejected records and the
+    repeated IDs are found as in an uninterrupted load. A file that changed since the
+    checkpoint is loaded in full.
+
+    The checkpoint assumes the load is resumed with the same arguments; it is deleted
+    once the load succeeds.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self.dropped_indexes: List[str] = []
+
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                state = json.load(file)
+            self._entries = state["Inputs"]
+            self.dropped_indexes = state["DroppedIndexes"]
+
+    def committed_rows(
+        self, name: str, source: Union[str, Iterable[Dict[str, Any]]]
+    ) -> int:
+        """
+        Returns the number of leading rows of an input that an earlier attempt committed.
+
+        Args:
+            name (str): The input name, e.g. 'Students'.
+            source (Union[str, Iterable[Dict[str, Any]]]): The file path or the records
+            of the input.
+
+        Returns:
+            int: The number of rows to skip, 0 if the file changed since.
+        """
+
+        entry = self._entries.get(name)
+
+        if not entry or entry.get("File") != _file_state(source):
+            return 0
+
+        return entry["Rows"]
+
+    def record(
+        self,
+        name: str,
+        source: Union[str, Iterable[Dict[str, Any]]],
+        rows: int,
+    ) -> None:
+        """
+        Persists the number of leading rows of an input that are committed; call it only
+        after the commit.
+
+        Args:
+            name (str): The input name.
+            source (Union[str, Iterable[Dict[str, Any]]]): The file path or the records
+            of the input.
+            rows (int): The number of committed rows.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        self._entries[name] = dict(Rows=rows, File=_file_state(source))
+        self.save()
+
+    def save(self) -> None:
+        """
+        Persists the recorded inputs and `dropped_indexes`.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        # Written aside and renamed, so a kill never leaves a truncated checkpoint
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(
+                dict(
+                    Inputs=self._entries, DroppedIndexes=self.dropped_indexes
+                ),
+                file,
+            )
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.path)
+
+    def clear(self) -> None:
+        """
+        Deletes the checkpoint file after a successful load.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        self._entries = {}
+        self.dropped_indexes = []
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _file_state(
+    source: Union[str, Iterable[Dict[str, Any]]]
+) -> Optional[Dict[str, int]]:
+    if not isinstance(source, str):
+        return None
+
+    stat = os.stat(source)
+
+    return dict(Size=stat.st_size, MTime=stat.st_mtime_ns)
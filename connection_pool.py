@@ -0,0 +1,285 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from backends import Backend, SqlServerBackend, get_backend
+
+
+class PooledConnection:
+    """
+    A DB-API connection held by a ConnectionPool, with its general purpose cursor and a
+    cursor per recently executed statement text.
+
+    A cursor that always executes the same text keeps its prepared statement: pyodbc
+    only prepares again when a cursor executes a different text than the last one, so
+    alternating statements on a single cursor would prepare them on every batch.
+    """
+
+    def __init__(self, connection: Any, max_statements: int = 64):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.max_statements = max_statements
+        self.last_used = 0.0
+
+        self._statements: "OrderedDict[str, Any]" = OrderedDict()
+
+    def statement(self, query: str) -> Any:
+        """
+        Returns the cursor dedicated to a statement text, least recently used cursors
+        beyond `max_statements` are closed.
+
+        Args:
+            query (str): The statement text.
+
+        Returns:
+            Any: The cursor executing this text.
+        """
+
+        cursor = self._statements.get(query)
+
+        if cursor is None:
+            cursor = self.connection.cursor()
+            self._statements[query] = cursor
+
+            while len(self._statements) > self.max_statements:
+                _, evicted = self._statements.popitem(last=False)
+                evicted.close()
+        else:
+            self._statements.move_to_end(query)
+
+        return cursor
+
+    def close(self) -> None:
+        """
+        Closes the cursors and the connection.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        try:
+            for cursor in [self.cursor, *self._statements.values()]:
+                cursor.close()
+        finally:
+            self._statements.clear()
+            self.connection.close()
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of at most `max_size` connections to one database.
+
+    Returned connections are rolled back and kept idle for the next borrower; idle
+    connections older than `idle_timeout` seconds are closed, and with `health_check`
+    a connection idle for more than `ping_after` seconds must answer the backend's ping
+    query before it is handed out again. A connection returned more recently was
+    known to work when its rollback succeeded, so short queries borrowing it pay no
+    extra round trip. Borrowers wait up to `timeout` seconds once every connection is
+    in use.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        backend: Union[str, Backend] = SqlServerBackend.name,
+        max_size: int = 5,
+        idle_timeout: Optional[float] = 300.0,
+        health_check: bool = True,
+        ping_after: float = 30.0,
+        timeout: Optional[float] = None,
+        max_statements: int = 64,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be a positive integer.")
+
+        self.connection_string = connection_string
+        self.backend = get_backend(backend)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self.max_statements = max_statements
+        self.clock = clock
+
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+        self._idle: List[PooledConnection] = []
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        Borrows a connection, reusing the most recently returned healthy one.
+
+        Args:
+            timeout (Optional[float], optional): The seconds to wait for a free
+            connection. Defaults to the pool `timeout`.
+
+        Raises:
+            TimeoutError: If no connection became free in time.
+            RuntimeError: If the pool is closed.
+
+        Returns:
+            PooledConnection: The borrowed connection.
+        """
+
+        timeout = self.timeout if timeout is None else timeout
+
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._closed
+                or self._idle
+                or self._in_use < self.max_size,
+                timeout,
+            ):
+                raise TimeoutError(
+                    f"No connection became free within {timeout} seconds."
+                )
+            if self._closed:
+                raise RuntimeError("The connection pool is closed.")
+
+            expired = self._take_expired()
+            pooled = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        for connection in expired:
+            self._discard(connection)
+
+        try:
+            if pooled is not None and not self._healthy(pooled):
+                self._discard(pooled)
+                pooled = None
+
+            if pooled is None:
+                pooled = PooledConnection(
+                    self.backend.connect(self.connection_string),
+                    self.max_statements,
+                )
+                with self._condition:
+                    self.opened += 1
+            else:
+                with self._condition:
+                    self.reused += 1
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        return pooled
+
+    def release(self, pooled: PooledConnection, discard: bool = False) -> None:
+        """
+        Returns a borrowed connection; its open transaction is rolled back.
+
+        Args:
+            pooled (PooledConnection): The borrowed connection.
+            discard (bool, optional): Close the connection instead of keeping it.
+            Defaults to False.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        if not discard:
+            try:
+                pooled.connection.rollback()
+            except Exception as e:
+                logging.warning(
+                    f"A returned connection could not be reset: {e}"
+                )
+                discard = True
+
+        with self._condition:
+            self._in_use -= 1
+            keep = not discard and not self._closed
+            if keep:
+                pooled.last_used = self.clock()
+                self._idle.append(pooled)
+            self._condition.notify()
+
+        if not keep:
+            self._discard(pooled)
+
+    def close(self) -> None:
+        """
+        Closes the idle connections; borrowed ones are closed when they are returned.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the pool counters.
+
+        Returns:
+            Dict[str, int]: The 'Opened', 'Reused' and 'Discarded' connection counts and
+            the current 'Idle' and 'InUse' counts.
+        """
+
+        with self._condition:
+            return dict(
+                Opened=self.opened,
+                Reused=self.reused,
+                Discarded=self.discarded,
+                Idle=len(self._idle),
+                InUse=self._in_use,
+            )
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _take_expired(self) -> List[PooledConnection]:
+        if self.idle_timeout is None:
+            return []
+
+        deadline = self.clock() - self.idle_timeout
+        expired = [c for c in self._idle if c.last_used <= deadline]
+        self._idle = [c for c in self._idle if c.last_used > deadline]
+
+        return expired
+
+    def _healthy(self, pooled: PooledConnection) -> bool:
+        if (
+            not self.health_check
+            or self.clock() - pooled.last_used <= self.ping_after
+        ):
+            return True
+
+        try:
+            pooled.cursor.execute(self.backend.ping_query)
+            pooled.cursor.fetchall()
+            return True
+        except Exception as e:
+            logging.warning(
+                f"A pooled connection failed its health check: {e}"
+            )
+            return False
+
+    def _discard(self, pooled: PooledConnection) -> None:
+        with self._condition:
+            self.discarded += 1
+
+        try:
+            pooled.close()
+        except Exception:
+            pass
@@ -0,0 +1,443 @@
+import csv
+import json
+import logging
+import os
+from functools import partial
+from itertools import chain, islice
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from metrics import REGISTRY, MetricsRegistry
+
+
+# A record of an export: a dictionary or a named tuple such as RoomStatistics
+ExportRecord = Union[Dict[str, Any], Tuple[Any, ...]]
+
+
+def _as_dict(record: ExportRecord) -> Dict[str, Any]:
+    # Named tuples know their field names
+    return record._asdict() if isinstance(record, tuple) else record
+
+
+def _column_batches(
+    records: Iterable[ExportRecord], batch_size: int
+) -> Iterator[Tuple[ExportRecord, List[str], List[Sequence[Any]]]]:
+    """
+    Splits records into batches of columns, without a dictionary per named tuple.
+
+    Args:
+        records (Iterable[ExportRecord]): The records, all with the same keys or fields.
+        batch_size (int): The maximum number of records per batch.
+
+    Yields:
+        Tuple[ExportRecord, List[str], List[Sequence[Any]]]: The first record of the
+        batch, the column names and the values of every column.
+    """
+
+    records_iterator = iter(records)
+
+    while True:
+        batch = list(islice(records_iterator, batch_size))
+        if not batch:
+            return
+
+        first = batch[0]
+
+        if isinstance(first, tuple):
+            # Transposing the tuples is one C-level pass
+            yield first, list(first._fields), list(zip(*batch))
+        else:
+            names = list(first)
+            yield first, names, [
+                [record[name] for record in batch] for name in names
+            ]
+
+
+def _pyarrow() -> Any:
+    # Imported on use, it is an optional dependency of the arrow and parquet formats
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(
+            "The arrow and parquet formats require pyarrow, install it with "
+            "'pip install pyarrow'."
+        ) from None
+
+    return pyarrow
+
+
+def _record_batches(
+    records: Iterable[ExportRecord], batch_size: int = 65536
+) -> Tuple[Any, Iterator[Any]]:
+    """
+    Converts records into Arrow record batches of one schema.
+
+    The column types of named tuples come from their annotations, such as the Optional[int]
+    AvgAge of RoomStatistics; the other columns have the type Arrow infers from the
+    first batch.
+
+    Args:
+        records (Iterable[ExportRecord]): The records, all with the same keys or fields.
+        batch_size (int, optional): The number of rows per record batch. Defaults to 65536.
+
+    Returns:
+        Tuple[Any, Iterator[Any]]: The pyarrow schema and an iterator of the record
+        batches.
+    """
+
+    pa = _pyarrow()
+    column_batches = _column_batches(records, batch_size)
+    first_batch = next(column_batches, None)
+
+    if first_batch is None:
+        return pa.schema([]), iter(())
+
+    first, names, columns = first_batch
+    arrow_types = {
+        bool: pa.bool_(),
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+    }
+    annotations = getattr(type(first), "__annotations__", {})
+    fields = []
+
+    for name, column in zip(names, columns):
+        annotation = annotations.get(name)
+        if get_origin(annotation) is Union:
+            # Optional[X] is Union[X, None], None is a null value of X
+            annotation = next(
+                (arg for arg in get_args(annotation) if arg is not type(None)),
+                None,
+            )
+        arrow_type = arrow_types.get(annotation)
+        fields.append(
+            pa.field(
+                name,
+                arrow_type
+                if arrow_type is not None
+                else pa.array(column).type,
+            )
+        )
+
+    schema = pa.schema(fields)
+
+    def record_batches() -> Iterator[Any]:
+        for _, _, batch_columns in chain([first_batch], column_batches):
+            yield pa.record_batch(
+                [
+                    pa.array(column, type=field.type)
+                    for column, field in zip(batch_columns, schema)
+                ],
+                schema=schema,
+            )
+
+    return schema, record_batches()
+
+
+class DocumentWriter:
+    @staticmethod
+    def write_json(
+        records: Iterable[ExportRecord], file_path: str, ndjson: bool = False
+    ) -> int:
+        """
+        Writes records to a JSON file one at a time, without building the whole document.
+
+        The output is the same as `json.dumps(list(records), indent=2)`, or one compact
+        JSON object per line with `ndjson`; named tuples are written as objects.
+
+        Args:
+            records (Iterable[ExportRecord]): The records to write, e.g. a generator.
+            file_path (str): The output file path.
+            ndjson (bool, optional): Whether to write newline-delimited JSON. Defaults to False.
+
+        Returns:
+            int: The number of records written.
+        """
+
+        count = 0
+
+        with open(file_path, "w", encoding="utf-8") as json_file:
+            if not ndjson:
+                json_file.write("[")
+
+            records_iterator = iter(records)
+
+            # Encoding a bounded batch per call keeps the per-record overhead low
+            while True:
+                batch = [
+                    _as_dict(item) for item in islice(records_iterator, 1000)
+                ]
+                if not batch:
+                    break
+                if ndjson:
+                    json_file.writelines(
+                        f"{json.dumps(item)}\n" for item in batch
+                    )
+                else:
+                    if count:
+                        json_file.write(",")
+                    # Without its enclosing brackets, the indented batch continues the array
+                    json_file.write(json.dumps(batch, indent=2)[1:-2])
+                count += len(batch)
+
+            if not ndjson:
+                json_file.write("\n]" if count else "]")
+
+        return count
+
+    @staticmethod
+    def write_xml(
+        records: Iterable[ExportRecord],
+        file_path: str,
+        root_element_name: str = "Records",
+        item_element_name: str = "Data",
+    ) -> int:
+        """
+        Writes records to an indented XML file one at a time, without building a tree.
+
+        Every record becomes an `item_element_name` element with one child element per
+        key or named tuple field, inside a single `root_element_name` element.
+
+        Args:
+            records (Iterable[ExportRecord]): The records to write, e.g. a generator.
+            file_path (str): The output file path.
+            root_element_name (str, optional): The document element name. Defaults to 'Records'.
+            item_element_name (str, optional): The record element name. Defaults to 'Data'.
+
+        Returns:
+            int: The number of records written.
+        """
+
+        # Imported on use, xml.sax.saxutils pulls in urllib and the email package
+        from xml.sax.saxutils import XMLGenerator
+
+        count = 0
+
+        with open(file_path, "w", encoding="utf-8") as xml_file:
+            xml_generator = XMLGenerator(xml_file, encoding="utf-8")
+            xml_generator.startDocument()
+            xml_generator.startElement(root_element_name, {})
+            xml_generator.ignorableWhitespace("\n")
+
+            for item in records:
+                xml_generator.ignorableWhitespace("  ")
+                xml_generator.startElement(item_element_name, {})
+                xml_generator.ignorableWhitespace("\n")
+
+                for key, value in _as_dict(item).items():
+                    xml_generator.ignorableWhitespace("    ")
+                    xml_generator.startElement(key, {})
+                    xml_generator.characters(str(value))
+                    xml_generator.endElement(key)
+                    xml_generator.ignorableWhitespace("\n")
+
+                xml_generator.ignorableWhitespace("  ")
+                xml_generator.endElement(item_element_name)
+                xml_generator.ignorableWhitespace("\n")
+                count += 1
+
+            xml_generator.endElement(root_element_name)
+            xml_generator.ignorableWhitespace("\n")
+            xml_generator.endDocument()
+
+        return count
+
+    @staticmethod
+    def write_csv(records: Iterable[ExportRecord], file_path: str) -> int:
+        """
+        Writes records to a CSV file, a header row of the keys or named tuple fields
+        followed by a row per record; None is written as an empty field.
+
+        Args:
+            records (Iterable[ExportRecord]): The records to write, e.g. a generator.
+            file_path (str): The output file path.
+
+        Returns:
+            int: The number of records written.
+        """
+
+        count = 0
+
+        with open(file_path, "w", encoding="utf-8", newline="") as csv_file:
+            csv_writer = csv.writer(csv_file)
+
+            for _, names, columns in _column_batches(records, 1000):
+                if not count:
+                    csv_writer.writerow(names)
+                csv_writer.writerows(zip(*columns))
+                count += len(columns[0])
+
+        return count
+
+    @staticmethod
+    def write_arrow(records: Iterable[ExportRecord], file_path: str) -> int:
+        """
+        Writes records to an Arrow IPC file, in record batches of up to 65536 rows that
+        are read back without parsing. Requires pyarrow.
+
+        Args:
+            records (Iterable[ExportRecord]): The records to write, e.g. a generator.
+            file_path (str): The output file path.
+
+        Returns:
+            int: The number of records written.
+        """
+
+        pa = _pyarrow()
+        schema, record_batches = _record_batches(records)
+        count = 0
+
+        with pa.OSFile(file_path, "wb") as sink, pa.ipc.new_file(
+            sink, schema
+        ) as arrow_writer:
+            for record_batch in record_batches:
+                arrow_writer.write_batch(record_batch)
+                count += record_batch.num_rows
+
+        return count
+
+    @staticmethod
+    def write_parquet(records: Iterable[ExportRecord], file_path: str) -> int:
+        """
+        Writes records to a Parquet file, a row group per 65536 records. Requires
+        pyarrow.
+
+        Args:
+            records (Iterable[ExportRecord]): The records to write, e.g. a generator.
+            file_path (str): The output file path.
+
+        Returns:
+            int: The number of records written.
+        """
+
+        pa = _pyarrow()
+        import pyarrow.parquet as pq
+
+        schema, record_batches = _record_batches(records)
+        count = 0
+
+        with pq.ParquetWriter(file_path, schema) as parquet_writer:
+            for record_batch in record_batches:
+                parquet_writer.write_table(
+                    pa.Table.from_batches([record_batch])
+                )
+                count += record_batch.num_rows
+
+        return count
+
+    @staticmethod
+    def export_result(
+        export_result: Iterable[ExportRecord],
+        format_type: str = "json",
+        file_path: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> Optional[str]:
+        """
+        Exports the query result to a file in one of the formats of EXPORT_WRITERS:
+        JSON, NDJSON, XML, CSV, Arrow IPC or Parquet.
+
+        The records are written as they are read from `export_result`, so an iterator
+        of any length, such as DataLoader.iter_room_statistics, is exported in constant
+        memory.
+
+        Args:
+            export_result (Iterable[ExportRecord]): The result to be exported.
+            format_type (str, optional): A key of EXPORT_WRITERS, e.g. 'json', 'csv' or
+            'parquet'. Defaults to 'json'.
+            file_path (Optional[str], optional): The output file path. Defaults to
+            'result.<format>' in the working directory.
+            metrics (Optional[MetricsRegistry], optional): The registry recording the
+            export. Defaults to the global registry.
+
+        Returns:
+            Optional[str]: The path of the written file, or None if the export failed.
+
+        Raises:
+            Exception: If an error occurs during the export process.
+        """
+
+        metrics = metrics or REGISTRY
+
+        try:
+            format_type = format_type.lower()
+
+            if format_type not in EXPORT_WRITERS:
+                raise ValueError(
+                    f"Unsupported format '{format_type}'. Supported formats: "
+                    f"{', '.join(EXPORT_WRITERS)}."
+                )
+
+            file_path = file_path or f"result.{format_type}"
+
+            with metrics.operation("export_result", format=format_type):
+                rows = EXPORT_WRITERS[format_type](export_result, file_path)
+
+            metrics.increment(
+                "loaddata_rows_total",
+                rows,
+                operation="export_result",
+                format=format_type,
+            )
+            metrics.increment(
+                "loaddata_bytes_written_total",
+                os.path.getsize(file_path),
+                format=format_type,
+            )
+
+            logging.info(
+                f"Writing data to the file {file_path} was successful."
+            )
+
+            return file_path
+
+        except Exception as e:
+            logging.error(
+                f"An error occurred while writing data to the file: {e}",
+                exc_info=True,
+            )
+            return None
+
+
+# The writer of every export format: a function writing records to a file path and
+# returning the number of records written (see register_writer)
+EXPORT_WRITERS: Dict[str, Callable[[Iterable[ExportRecord], str], int]] = {
+    "json": DocumentWriter.write_json,
+    "ndjson": partial(DocumentWriter.write_json, ndjson=True),
+    "xml": DocumentWriter.write_xml,
+    "csv": DocumentWriter.write_csv,
+    "arrow": DocumentWriter.write_arrow,
+    "parquet": DocumentWriter.write_parquet,
+}
+
+
+def register_writer(
+    format_type: str,
+    writer: Callable[[Iterable[ExportRecord], str], int],
+) -> None:
+    """
+    Adds an export format, or replaces the writer of one, for export_result and the
+    --format option.
+
+    Args:
+        format_type (str): The format name, also the default file extension.
+        writer (Callable[[Iterable[ExportRecord], str], int]): Writes records to a file
+        path and returns the number of records written.
+
+    Returns:
+        None: This method does not return any value.
+    """
+
+    EXPORT_WRITERS[format_type.lower()] = writer
@@ -0,0 +1,270 @@
+import logging
+import re
+import time
+from datetime import date
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+
+if TYPE_CHECKING:
+    from main import DataLoader
+
+
+class IndexAdvisor:
+    """
+    Chooses the indexes of a DataLoader database from the queries the loader ran.
+
+    Every candidate index of the backend (`Backend.index_candidates`) is created in
+    turn, and the workload (`DataLoader.query_log` and the room aggregates) is
+    explained and timed, best of `repeat` runs, with it and without any candidate.
+    Every run is rolled back, so the statements of the workload that write, such as
+    the RoomStats refresh of a load, which is timed with every room stale, leave the
+    data unchanged. A candidate benefits a query when the plan uses it and the query
+    is at least `min_improvement` faster. The recommendation is the smallest set of
+    candidates, picked greedily, that covers every query some candidate benefits;
+    `apply` creates it and drops the other candidates.
+    """
+
+    def __init__(
+        self,
+        data_loader: "DataLoader",
+        repeat: int = 3,
+        min_improvement: float = 0.1,
+    ):
+        self.data_loader = data_loader
+        self.backend = data_loader.backend
+        self.repeat = repeat
+        self.min_improvement = min_improvement
+
+    def workload(self) -> List[Tuple[str, Tuple[Any, ...]]]:
+        """
+        Returns the statements to optimize for, with their parameters: the recorded
+        ones, the most executed first, with the parameters of their most frequent
+        execution, and the room aggregates that RoomStats is rebuilt from.
+
+        Returns:
+            List[Tuple[str, Tuple[Any, ...]]]: The statements and their parameters.
+        """
+
+        queries: Dict[str, Tuple[Any, ...]] = {}
+
+        for (query, parameters), _ in self.data_loader.query_log.most_common():
+            queries.setdefault(query, tuple(parameters))
+        queries.setdefault(
+            self.backend.room_statistics_query(date.today()), ()
+        )
+
+        return list(queries.items())
+
+    def existing_indexes(self) -> List[str]:
+        """
+        Returns the candidate indexes that exist in the database.
+
+        Returns:
+            List[str]: The index names.
+        """
+
+        cursor = self.data_loader.cursor
+        names: Set[str] = set()
+
+        for table in {
+            table for table, _ in self.backend.index_candidates.values()
+        }:
+            cursor.execute(self.backend.index_names_query(table))
+            names.update(row[0] for row in cursor.fetchall())
+
+        return [
+            name for name in self.backend.index_candidates if name in names
+        ]
+
+    def create_indexes(self, names: Iterable[str]) -> None:
+        """
+        Creates candidate indexes unless they exist, and commits.
+
+        Args:
+            names (Iterable[str]): The index names.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        for name in names:
+            table, columns = self.backend.index_candidates[name]
+            self.data_loader.cursor.execute(
+                self.backend.create_index_query(name, table, columns)
+            )
+
+        self.data_loader.connection.commit()
+
+    def drop_indexes(self, names: Iterable[str]) -> None:
+        """
+        Drops candidate indexes if they exist, and commits.
+
+        Args:
+            names (Iterable[str]): The index names.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        for name in names:
+            table, _ = self.backend.index_candidates[name]
+            self.data_loader.cursor.execute(
+                self.backend.drop_index_query(name, table)
+            )
+
+        self.data_loader.connection.commit()
+
+    def evaluate(self) -> List[Dict[str, Any]]:
+        """
+        Explains and times the workload without any candidate index and with every
+        candidate alone. The existing candidate indexes are restored afterwards.
+
+        Returns:
+            List[Dict[str, Any]]: One dictionary per query and index with the 'Query',
+            its 'Parameters', the 'Index' (None for the run without candidates), the
+            best 'Seconds' and the 'Plan' steps.
+        """
+
+        workload = self.workload()
+        existing = self.existing_indexes()
+        report = []
+
+        self.drop_indexes(existing)
+        try:
+            for index in [None, *self.backend.index_candidates]:
+                if index is not None:
+                    self.create_indexes([index])
+                try:
+                    for query, parameters in workload:
+                        report.append(
+                            dict(
+                                Query=query,
+                                Parameters=parameters,
+                                Index=index,
+                                Seconds=self._time(query, parameters),
+                                Plan=self.backend.query_plan(
+                                    self.data_loader.cursor, query, parameters
+                                ),
+                            )
+                        )
+                finally:
+                    if index is not None:
+                        self.drop_indexes([index])
+        finally:
+            self.create_indexes(existing)
+
+        return report
+
+    def recommend(
+        self, report: Optional[List[Dict[str, Any]]] = None
+    ) -> List[str]:
+        """
+        Returns the smallest set of candidate indexes that speeds up the workload.
+
+        Args:
+            report (Optional[List[Dict[str, Any]]], optional): The result of `evaluate`.
+            Defaults to None, which evaluates the workload.
+
+        Returns:
+            List[str]: The recommended index names, the most useful first.
+        """
+
+        if report is None:
+            report = self.evaluate()
+
+        baseline = {
+            row["Query"]: row["Seconds"]
+            for row in report
+            if row["Index"] is None
+        }
+        benefits: Dict[str, Set[str]] = {}
+        seconds: Dict[str, float] = {}
+
+        for row in report:
+            index = row["Index"]
+            if index is None:
+                continue
+
+            seconds[index] = seconds.get(index, 0.0) + row["Seconds"]
+            if _uses_index(row["Plan"], index) and row["Seconds"] <= baseline[
+                row["Query"]
+            ] * (1 - self.min_improvement):
+                benefits.setdefault(index, set()).add(row["Query"])
+
+        uncovered = set().union(*benefits.values())
+        recommended = []
+
+        while uncovered:
+            # The candidate benefiting the most remaining queries, then the fastest
+            index = max(
+                benefits,
+                key=lambda name: (
+                    len(benefits[name] & uncovered),
+                    -seconds[name],
+                ),
+            )
+            recommended.append(index)
+            uncovered -= benefits[index]
+
+        return recommended
+
+    def apply(self, names: Iterable[str]) -> None:
+        """
+        Creates the given candidate indexes and drops the other ones.
+
+        Args:
+            names (Iterable[str]): The index names to keep.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        names = list(names)
+
+        self.drop_indexes(
+            name for name in self.existing_indexes() if name not in names
+        )
+        self.create_indexes(names)
+
+        logging.info(
+            f"Indexes applied: {', '.join(names) if names else 'none'}."
+        )
+
+    def _time(self, query: str, parameters: Sequence[Any] = ()) -> float:
+        cursor = self.data_loader.cursor
+        connection = self.data_loader.connection
+        # A refresh of a load recomputes the rooms it touched, time it on all of them
+        refresh = query == self.backend.refresh_room_stats_query().sql
+        seconds = float("inf")
+
+        for _ in range(self.repeat):
+            try:
+                if refresh:
+                    cursor.execute(self.backend.mark_all_room_stats_query)
+
+                started = time.perf_counter()
+                cursor.execute(query, parameters)
+                if cursor.description is not None:
+                    cursor.fetchall()
+                seconds = min(seconds, time.perf_counter() - started)
+            finally:
+                connection.rollback()
+
+        return seconds
+
+
+def _uses_index(plan: List[str], index: str) -> bool:
+    # Whole names only: idx_Students_RoomID must not match idx_Students_RoomID_Birthday
+    pattern = re.compile(rf"(?<!\w){re.escape(index)}(?!\w)")
+
+    return any(pattern.search(step) for step in plan)
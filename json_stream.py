@@ -0,0 +1,324 @@
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Iterator, List, Optional, Tuple
+
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+
+# The end of an object element and its separator; '}' and ',' never occur inside
+# multi-byte UTF-8 sequences, so the file can be searched as bytes from any offset
+_BOUNDARY = re.compile(rb"\}\s*,")
+_BOUNDARY_WINDOW = 64 * 1024
+
+
+def iter_json_array(path: str, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Yields the elements of the top-level JSON array stored in a file one at a time.
+
+    The file is read in chunks of `chunk_size` characters and only the text of the
+    element being decoded is kept in memory, so the peak memory does not depend
+    on the file size.
+
+    Args:
+        path (str): The file path to the JSON file containing a top-level array.
+        chunk_size (int, optional): The number of characters read per call. Defaults to 64 KiB.
+
+    Raises:
+        ValueError: If the file does not contain a well-formed top-level JSON array.
+
+    Yields:
+        Any: The decoded array elements, in file order.
+    """
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer.")
+
+    decoder = json.JSONDecoder()
+
+    with open(path, "r", encoding="utf-8") as file:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, position, eof
+
+            if eof:
+                return False
+
+            chunk = file.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+
+        def next_token() -> str:
+            nonlocal position
+
+            while True:
+                while (
+                    position < len(buffer) and buffer[position] in _WHITESPACE
+                ):
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                if not fill():
+                    return ""
+
+        if next_token() != "[":
+            raise ValueError(f"{path}: expected a top-level JSON array.")
+        position += 1
+
+        if next_token() == "]":
+            position += 1
+        else:
+            while True:
+                if not next_token():
+                    raise ValueError(f"{path}: unterminated JSON array.")
+
+                while True:
+                    try:
+                        element, end = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        if fill():
+                            continue
+                        raise
+
+                    # A number cut by the chunk boundary decodes as a shorter number
+                    if (
+                        isinstance(element, (int, float))
+                        and (
+                            end == len(buffer)
+                            or buffer[end] not in _DELIMITERS
+                        )
+                        and fill()
+                    ):
+                        continue
+                    break
+
+                position = end
+                yield element
+
+                separator = next_token()
+                position += 1
+
+                if separator == "]":
+                    break
+                if separator != ",":
+                    raise ValueError(
+                        f"{path}: expected ',' or ']' after an array element."
+                    )
+
+        if next_token():
+            raise ValueError(f"{path}: unexpected data after the JSON array.")
+
+
+def json_array_ranges(
+    path: str, range_size: int = 8 * 1024 * 1024
+) -> List[Tuple[int, int]]:
+    """
+    Splits a file holding a top-level JSON array of objects into contiguous byte ranges
+    of about `range_size` bytes, each ending after the ',' that follows an object.
+
+    A boundary is only searched for, not verified: it may lie inside a string value that
+    contains '},'. iter_json_array_parallel detects and repairs such boundaries.
+
+    Args:
+        path (str): The file path to the JSON file containing a top-level array.
+        range_size (int, optional): The approximate number of bytes per range. Defaults
+        to 8 MiB.
+
+    Raises:
+        ValueError: If `range_size` is not positive.
+
+    Returns:
+        List[Tuple[int, int]]: The start and end offset of every range, covering the
+        whole file.
+    """
+
+    if range_size < 1:
+        raise ValueError("range_size must be a positive integer.")
+
+    size = os.path.getsize(path)
+    boundaries = [0]
+
+    with open(path, "rb") as file:
+        while boundaries[-1] + range_size < size:
+            file.seek(boundaries[-1] + range_size)
+            boundary = _next_boundary(file)
+            if boundary is None:
+                break
+            boundaries.append(boundary)
+
+    boundaries.append(size)
+
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def iter_json_array_parallel(
+    path: str,
+    processes: Optional[int] = None,
+    range_size: int = 8 * 1024 * 1024,
+) -> Iterator[Any]:
+    """
+    Yields the elements of the top-level JSON array stored in a file, parsed by a pool
+    of processes one byte range at a time (see json_array_ranges).
+
+    Every process decodes a whole range with the C decoder and sends back a compact
+    batch: the keys once and one tuple of values per object when the objects of the
+    range share their keys. The batches are yielded in file order; at most
+    2 * `processes` ranges are parsed ahead of the consumer, so a slow consumer bounds
+    the memory. A range that does not parse because its end boundary lies inside a
+    string is parsed again together with the next range.
+
+    Args:
+        path (str): The file path to the JSON file containing a top-level array.
+        processes (Optional[int], optional): The number of parsing processes. Defaults
+        to None, which uses one per CPU.
+        range_size (int, optional): The approximate number of bytes per range. Defaults
+        to 8 MiB.
+
+    Raises:
+        ValueError: If the file does not contain a well-formed top-level JSON array.
+
+    Yields:
+        Any: The decoded array elements, in file order.
+    """
+
+    ranges = json_array_ranges(path, range_size)
+    last = len(ranges) - 1
+
+    def parse_arguments(first: int, end: int) -> Tuple[Any, ...]:
+        return (
+            path,
+            ranges[first][0],
+            ranges[end][1],
+            first == 0,
+            end == last,
+        )
+
+    if last == 0:
+        yield from _expand(_parse_range(*parse_arguments(0, 0)))
+        return
+
+    processes = processes or os.cpu_count() or 1
+    # Imported on use, the process pool pulls in multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    executor = ProcessPoolExecutor(max_workers=processes)
+    pending: Deque[Future] = deque()
+    submitted = index = 0
+
+    try:
+        while index <= last:
+            while submitted <= last and len(pending) < 2 * processes:
+                pending.append(
+                    executor.submit(
+                        _parse_range, *parse_arguments(submitted, submitted)
+                    )
+                )
+                submitted += 1
+
+            try:
+                batch = pending.popleft().result()
+            except ValueError:
+                if index == last:
+                    raise
+                # The end boundary lies inside a string: widen the range until it
+                # ends on a real one, the last attempt reporting a malformed file
+                for end in range(index + 1, last + 1):
+                    if pending:
+                        pending.popleft().cancel()
+                    else:
+                        submitted += 1
+                    try:
+                        batch = _parse_range(*parse_arguments(index, end))
+                        break
+                    except ValueError:
+                        if end == last:
+                            raise
+                index = end
+
+            yield from _expand(batch)
+            index += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _next_boundary(file: Any) -> Optional[int]:
+    offset = file.tell()
+    window = b""
+
+    while True:
+        chunk = file.read(_BOUNDARY_WINDOW)
+        if not chunk:
+            return None
+
+        window += chunk
+        match = _BOUNDARY.search(window)
+        if match:
+            return offset + match.end()
+
+        # Keep a trailing '}' whose separator may be in the next chunk
+        keep = window.rfind(b"}")
+        if keep < 0:
+            keep = len(window)
+        offset += keep
+        window = window[keep:]
+
+
+def _parse_range(
+    path: str, start: int, end: int, first: bool, last: bool
+) -> Tuple[Optional[Tuple[str, ...]], List[Any]]:
+    """
+    Decodes the elements of a byte range of a JSON array file, as the keys shared by
+    every object and their value tuples, or as (None, elements) otherwise.
+    """
+
+    with open(path, "rb") as file:
+        file.seek(start)
+        text = file.read(end - start).decode("utf-8").strip()
+
+    if first:
+        if not text.startswith("["):
+            raise ValueError(f"{path}: expected a top-level JSON array.")
+        text = text[1:]
+    if last:
+        if not text.endswith("]"):
+            raise ValueError(f"{path}: unterminated JSON array.")
+        text = text[:-1]
+    elif text.endswith(","):
+        text = text[:-1]
+
+    try:
+        elements = json.loads(f"[{text}]")
+    except json.JSONDecodeError as e:
+        # Not chained: the error holds the whole text of the range
+        raise ValueError(
+            f"{path}: {e.msg} in the bytes {start}-{end} of the JSON array."
+        ) from None
+
+    if elements and all(isinstance(element, dict) for element in elements):
+        keys = tuple(elements[0])
+        if all(tuple(element) == keys for element in elements):
+            return keys, [tuple(element.values()) for element in elements]
+
+    return None, elements
+
+
+def _expand(
+    batch: Tuple[Optional[Tuple[str, ...]], List[Any]]
+) -> Iterator[Any]:
+    keys, elements = batch
+
+    if keys is None:
+        return iter(elements)
+
+    return (dict(zip(keys, values)) for values in elements)
@@ -1,20 +1,141 @@
-import json
+import argparse
 import logging
-import xml.dom.minidom as minidom
-import xml.etree.ElementTree as ET
-from typing import Any, Dict, List
-
-import pyodbc
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from datetime import date
+from functools import partial
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from backends import BACKENDS, Backend, SqlServerBackend, date_key
+from checkpoint import LoadCheckpoint
 from config import database, server
+from connection_pool import ConnectionPool, PooledConnection
+from exporters import register_writer  # noqa: F401 - re-exported by main
+from exporters import EXPORT_WRITERS, DocumentWriter, ExportRecord
+from index_advisor import IndexAdvisor
+from json_stream import iter_json_array, iter_json_array_parallel
+from metrics import REGISTRY, MetricsRegistry, timed_operation
+from query_cache import cached_query, shared_query_cache
+from room_queries import (
+    GENDER_MISMATCH_ROOMS,
+    MAX_AGE_DIFFERENCE_ROOMS,
+    MIN_AVG_AGE_ROOMS,
+    ROOMS_AND_STUDENTS_COUNT,
+    RoomQuery,
+)
+from snapshot import SnapshotCache
+from validation import RecordValidator
+from watermark import LoadWatermark
+
+
+if TYPE_CHECKING:
+    from analytics import RoomAnalytics
+
+
+class RoomStatistics(NamedTuple):
+    """The statistics of a room, as streamed by DataLoader.iter_room_statistics."""
+
+    RoomID: int
+    StudentsCount: int
+    AvgAge: Optional[int]
+    MinAge: Optional[int]
+    MaxAge: Optional[int]
+    AgeDifference: Optional[int]
+    MixedSex: bool
+
+
+class RoomStudentsCount(NamedTuple):
+    """A room and its number of students."""
+
+    RoomID: int
+    StudentsCount: int
+
+
+class MixedSexRoom(NamedTuple):
+    """A room where students of both sexes live."""
+
+    RoomID: int
 
 
 class DataLoader:
-    def __init__(self, connection_string: str):
-        self.connection = pyodbc.connect(connection_string)
-        self.cursor = self.connection.cursor()
+    def __init__(
+        self,
+        connection_string: Optional[str] = None,
+        backend: Union[str, Backend] = SqlServerBackend.name,
+        analytics: bool = False,
+        cache_size: int = 128,
+        cache_ttl: Optional[float] = None,
+        pool: Optional[ConnectionPool] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        if pool is None and connection_string is None:
+            raise ValueError("Either connection_string or pool is required.")
+
+        # Without a shared pool the loader owns a private pool of one connection
+        self.pool = pool or ConnectionPool(
+            connection_string, backend, max_size=1
+        )
+        self._owns_pool = pool is None
+        self.connection_string = self.pool.connection_string
+        self.backend = self.pool.backend
+
+        self._pooled: Optional[PooledConnection] = self.pool.acquire()
+        self.connection = self._pooled.connection
+        self.cursor = self._pooled.cursor
+
+        # Optional in-process engine answering the room queries from loaded data,
+        # imported on use with NumPy
+        self.analytics: Optional["RoomAnalytics"] = None
+        if analytics:
+            import analytics as analytics_engine
+
+            self.analytics = analytics_engine.RoomAnalytics()
+
+        # Query results are served from memory until load_data changes the data; the
+        # loaders of a pool share them, so a load through any loader invalidates them
+        self.query_cache = shared_query_cache(self.pool, cache_size, cache_ttl)
+
+        # Timings and counters of the load, query and export operations
+        self.metrics = metrics or REGISTRY
+
+        # The executions of every statement with its parameters, the workload of
+        # IndexAdvisor
+        self.query_log: Counter = Counter()
+
+        # The date key at which the RoomStats age sums were last found up to date
+        self._room_ages_key: Optional[int] = None
 
         logging.info("The database connection was opened.")
 
+    def __enter__(self) -> "DataLoader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close_connection()
+
     def create_database(self) -> None:
         """
         Creates a database named 'Dormitory' if it does not already exist.
@@ -27,14 +148,8 @@ class DataLoader:
         """
 
         try:
-            self.cursor.execute(
-                """
-                IF NOT EXISTS (SELECT name FROM sys.databases WHERE name = 'Dormitory')
-                BEGIN
-                    CREATE DATABASE Dormitory;
-                END;
-            """
-            )
+            for query in self.backend.create_database_queries:
+                self.cursor.execute(query)
 
             logging.info("The database has been successfully created.")
 
@@ -49,7 +164,11 @@ class DataLoader:
         Creates the 'Rooms' and 'Students' tables in the database if they do not already exist.
         The 'Rooms' table has columns 'RoomID' (INT, PRIMARY KEY) and 'RoomName' (NVARCHAR(9)).
         The 'Students' table has columns 'Birthday' (DATETIMEOFFSET), 'StudentID' (INT, PRIMARY KEY),
-        'Name' (NVARCHAR(50)), 'RoomID' (INT, FOREIGN KEY REFERENCES Rooms(RoomID)), and 'Sex' (NVARCHAR(1)).
+        'Name' (NVARCHAR(50)), 'RoomID' (INT, FOREIGN KEY REFERENCES Rooms(RoomID)), 'Sex' (NVARCHAR(1))
+        and 'BirthDateKey' (INT), the birthday as a yyyymmdd integer that the loader computes
+        and the age queries aggregate. The column is added to tables of earlier versions.
+        The 'RoomStats' table holds the aggregates of every room that the queries read; it
+        is filled in from the existing students when it is created.
 
         Raises:
             Exception: If an error occurs during the table creation.
@@ -59,33 +178,12 @@ class DataLoader:
         """
 
         try:
-            self.cursor.execute(
-                """
-                IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'Rooms')
-                BEGIN
-                    CREATE TABLE Rooms (
-                        RoomID INT PRIMARY KEY,
-                        RoomName NVARCHAR(9)
-                    );
-                END;
-            """
-            )
+            for query in self.backend.create_tables_queries:
+                self.cursor.execute(query)
+            self.backend.upgrade_tables(self.cursor)
 
-            self.cursor.execute(
-                """
-                IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'Rooms')
-                BEGIN
-                    CREATE TABLE Students (
-                        Birthday DATETIMEOFFSET,
-                        StudentID INT PRIMARY KEY,
-                        Name NVARCHAR(50),
-                        RoomID INT,
-                        Sex NVARCHAR(1),
-                        FOREIGN KEY (RoomID) REFERENCES Rooms(RoomID)
-                    );
-                END;
-            """
-            )
+            if self._is_empty("RoomStats") and not self._is_empty("Rooms"):
+                self._rebuild_room_stats()
 
             self.connection.commit()
             logging.info("The tables have been successfully created.")
@@ -95,157 +193,977 @@ class DataLoader:
                 f"An error occurred while creating tables: {e}", exc_info=True
             )
 
-    def load_data(self, students: str, rooms: str) -> None:
+    @timed_operation
+    def load_data(
+        self,
+        students: Union[str, Iterable[Dict[str, Any]]],
+        rooms: Union[str, Iterable[Dict[str, Any]]],
+        batch_size: int = 1000,
+        workers: int = 1,
+        watermark: Optional[str] = None,
+        upsert: bool = False,
+        validate: bool = True,
+        reject_file: Optional[str] = None,
+        snapshot_dir: Optional[str] = None,
+        drop_indexes: Optional[bool] = None,
+        parse_processes: int = 1,
+        chunk_size: Optional[int] = None,
+        checkpoint: Optional[str] = None,
+        retries: int = 3,
+        retry_delay: float = 0.5,
+    ) -> Dict[str, int]:
         """
         Loads data from JSON files into the 'Students' and 'Rooms' tables in the database.
 
+        Both files are streamed record by record, so only one batch is held in memory.
+        Instead of a file path, an iterable of the same records can be given.
+        Records are inserted in batches of `batch_size` rows: each batch is sent to a
+        staging table with `fast_executemany` and then moved into the target table with
+        one set-based `INSERT ... WHERE NOT EXISTS`, so IDs that are already present in
+        the database (or repeated within the file) are skipped.
+
+        With `workers` > 1 the rooms are loaded and committed first, so that the foreign
+        key holds, and then the student stream is split into partitions of `batch_size`
+        consecutive records (ID ranges for ID-ordered exports) that are inserted through
+        `workers` connections of their own. Every partition is committed on success and
+        rolled back on failure; after a failure no new partitions are started.
+
+        With a `watermark` file the load is incremental: after a successful load the
+        size, modification time, highest ID and per-batch content hashes of both files
+        are recorded there, and the next load skips unchanged files without parsing them
+        and skips the unchanged leading batches of changed files (see LoadWatermark).
+        With `upsert` the existing rows whose name, room or sex changed are updated
+        instead of being skipped.
+
+        With `validate` every record is checked before it is inserted (see
+        RecordValidator): records with missing or mistyped fields, names too long for
+        their column, a sex other than 'M'/'F', an invalid birthday, an unknown room or
+        an ID repeated in the file are rejected and, with a `reject_file`, written to it
+        as JSON lines. A load that fails anyway is rolled back.
+
+        With a `snapshot_dir` the parsed files are cached there in a columnar binary
+        format (see SnapshotCache), and unchanged files are read back from their
+        memory-mapped snapshot instead of being parsed again.
+
+        The RoomStats rows of the rooms touched by every batch are recomputed in the
+        same transaction. Loads without the indexes of the 'Students' table or with
+        `workers` > 1 rebuild the whole table once at the end instead.
+
+        With `drop_indexes` the indexes of the 'Students' table (see IndexAdvisor) are
+        dropped before the load and rebuilt once afterwards, even if it fails, instead of
+        being maintained row by row. By default this is only done for the initial bulk
+        load into an empty table.
+
+        With `parse_processes` > 1 the files are split into byte ranges that a pool of
+        processes parses, a bounded number of ranges ahead of the inserts (see
+        iter_json_array_parallel), so JSON decoding is not bound to one core.
+
+        With a `chunk_size` every table is committed in chunks of at least that many
+        rows (whole batches) instead of in one transaction, so a failure only rolls back
+        the current chunk, and locks and log space are released as the load goes. A
+        chunk failing with a transient error, such as a deadlock or a lost connection,
+        is sent again up to `retries` times, with a backoff from `retry_delay` seconds
+        that doubles with every attempt. With a `checkpoint` file the rows committed so
+        far are recorded there after every chunk (see LoadCheckpoint): a load that
+        failed or was killed resumes from it, skipping the committed rows without
+        sending them to the database, and the file is deleted once the load succeeds.
+        Until then RoomStats may lag behind the committed chunks of a load that
+        rebuilds it at the end; the resumed load rebuilds it.
+
         Args:
-            students (str): The file path to the JSON file containing student data.
-            rooms (str): The file path to the JSON file containing room data.
+            students (Union[str, Iterable[Dict[str, Any]]]): The file path to the JSON
+            file containing student data, or the student records.
+            rooms (Union[str, Iterable[Dict[str, Any]]]): The file path to the JSON file
+            containing room data, or the room records.
+            batch_size (int, optional): The number of rows sent per round trip. Defaults to 1000.
+            workers (int, optional): The number of connections inserting students in parallel.
+            Defaults to 1.
+            watermark (Optional[str], optional): The file path of the delta-load watermark,
+            which only applies to file inputs. Defaults to None, which loads both files
+            in full.
+            upsert (bool, optional): Whether to update changed existing rows. Defaults to False.
+            validate (bool, optional): Whether to reject invalid records before inserting
+            them. Defaults to True.
+            reject_file (Optional[str], optional): The file path receiving the rejected
+            records. Defaults to None.
+            snapshot_dir (Optional[str], optional): The directory of the parsed file
+            snapshots. Defaults to None, which parses the files on every load.
+            drop_indexes (Optional[bool], optional): Whether to drop the indexes during
+            the load. Defaults to None, which drops them when 'Students' is empty.
+            parse_processes (int, optional): The number of processes parsing the files.
+            Defaults to 1, which parses them in this process.
+            chunk_size (Optional[int], optional): The number of rows per committed chunk.
+            Defaults to None, which commits the whole load at the end.
+            checkpoint (Optional[str], optional): The file path of the checkpoint that
+            a chunked load resumes from. Defaults to None.
+            retries (int, optional): The number of times a chunk is sent again after a
+            transient error. Defaults to 3.
+            retry_delay (float, optional): The seconds before the first retry of a
+            chunk. Defaults to 0.5.
 
         Raises:
             Exception: If an error occurs during the data loading process.
 
         Returns:
-            None: This method does not return any value.
+            Dict[str, int]: The number of inserted, updated, skipped and rejected rows
+            per table ('RoomsInserted', 'RoomsUpdated', 'RoomsSkipped', 'RoomsRejected',
+            'StudentsInserted', 'StudentsUpdated', 'StudentsSkipped', 'StudentsRejected')
+            and 'Failed', 1 if the load failed and was rolled back. The inserted and
+            updated rows of a table whose changes were rolled back are reported as 0.
         """
 
+        load_report = dict(
+            RoomsInserted=0,
+            RoomsUpdated=0,
+            RoomsSkipped=0,
+            RoomsRejected=0,
+            StudentsInserted=0,
+            StudentsUpdated=0,
+            StudentsSkipped=0,
+            StudentsRejected=0,
+            Failed=0,
+        )
+        # The tables whose reported changes are committed
+        committed_tables: List[str] = []
+        delta = LoadWatermark(watermark) if watermark else None
+        validator = (
+            RecordValidator(reject_file, batch_size) if validate else None
+        )
+        snapshots = SnapshotCache(snapshot_dir) if snapshot_dir else None
+        progress = LoadCheckpoint(checkpoint) if checkpoint else None
+        # The leading rows of every input committed by an earlier attempt
+        resumed: Dict[str, int] = {}
+        index_advisor = IndexAdvisor(self)
+        dropped_indexes: List[str] = []
+        analytics_savepoint = (
+            self.analytics.savepoint() if self.analytics is not None else None
+        )
+
+        def changed_rows(
+            name: str,
+            file_path: Union[str, Iterable[Dict[str, Any]]],
+            rows: Iterable[Tuple[Any, ...]],
+            key_position: int,
+        ) -> Iterable[Tuple[Any, ...]]:
+            if delta is None or not isinstance(file_path, str):
+                return rows
+            # The analytics engine needs every record, unchanged files are parsed for it
+            if self.analytics is None and delta.unchanged(name, file_path):
+                return ()
+            return delta.changed_rows(
+                name, file_path, rows, batch_size, key_position
+            )
+
+        def uncommitted_rows(
+            name: str,
+            file_path: Union[str, Iterable[Dict[str, Any]]],
+            rows: Iterable[Tuple[Any, ...]],
+        ) -> Iterable[Tuple[Any, ...]]:
+            if progress is None:
+                return rows
+
+            resumed[name] = progress.committed_rows(name, file_path)
+            return islice(rows, resumed[name], None)
+
+        def chunk_options(
+            name: str, file_path: Union[str, Iterable[Dict[str, Any]]]
+        ) -> Dict[str, Any]:
+            if chunk_size is None:
+                return {}
+
+            def on_commit(read_rows: int) -> None:
+                if progress is not None:
+                    progress.record(name, file_path, resumed[name] + read_rows)
+
+            return dict(
+                chunk_size=chunk_size,
+                on_commit=on_commit,
+                retries=retries,
+                retry_delay=retry_delay,
+            )
+
         try:
-            with open(rooms, "r") as file:
-                rooms_data = json.load(file)
-
-            for room in rooms_data:
-                room_exists_query = """
-                    SELECT 1 FROM Rooms WHERE RoomID = ?;
-                """
-                self.cursor.execute(room_exists_query, room["id"])
-                existing_room = self.cursor.fetchone()
-
-                if not existing_room:
-                    self.cursor.execute(
-                        """
-                        INSERT INTO Rooms (RoomID, RoomName)
-                        VALUES (?, ?)
-                    """,
-                        room["id"],
-                        room["name"],
-                    )
+            if chunk_size is not None and chunk_size < 1:
+                raise ValueError("chunk_size must be a positive integer.")
+            if progress is not None and (chunk_size is None or workers > 1):
+                raise ValueError(
+                    "A checkpoint requires a chunk_size and workers=1."
+                )
+
+            if drop_indexes or (
+                drop_indexes is None and self._is_empty("Students")
+            ):
+                dropped_indexes = index_advisor.existing_indexes()
+                index_advisor.drop_indexes(dropped_indexes)
+
+            if progress is not None:
+                # The indexes dropped by a killed attempt are rebuilt by this one
+                dropped_indexes += [
+                    name
+                    for name in progress.dropped_indexes
+                    if name not in dropped_indexes
+                ]
+                progress.dropped_indexes = dropped_indexes
+                progress.save()
+
+            # Per-batch refreshes seek on the RoomID indexes and share the connection
+            incremental_room_stats = (
+                workers == 1
+                and not dropped_indexes
+                and bool(index_advisor.existing_indexes())
+            )
 
-            with open(students, "r") as file:
-                students_data = json.load(file)
-
-            for student in students_data:
-                student_exists_query = """
-                    SELECT 1 FROM Students WHERE StudentID = ?;
-                """
-                self.cursor.execute(student_exists_query, student["id"])
-                existing_student = self.cursor.fetchone()
-
-                if not existing_student:
-                    self.cursor.execute(
-                        """
-                        INSERT INTO Students (Birthday, StudentID, Name, RoomID, Sex)
-                        VALUES (?, ?, ?, ?, ?)
-                    """,
-                        student["birthday"],
-                        student["id"],
-                        student["name"],
-                        student["room"],
-                        student["sex"],
+            rooms_records = self._read_records(
+                rooms, snapshots, "Rooms", parse_processes
+            )
+            students_records = self._read_records(
+                students, snapshots, "Students", parse_processes
+            )
+
+            if validator is not None:
+                rooms_records = validator.rooms(rooms_records)
+                students_records = validator.students(students_records)
+
+            rooms_rows: Iterable[Tuple[Any, ...]] = (
+                (room["id"], room["name"]) for room in rooms_records
+            )
+            students_rows: Iterable[Tuple[Any, ...]] = (
+                (
+                    student["birthday"],
+                    student["id"],
+                    student["name"],
+                    student["room"],
+                    student["sex"],
+                    date_key(student["birthday"]),
+                )
+                for student in students_records
+            )
+
+            if self.analytics is not None:
+                rooms_rows = self.analytics.track_rooms(rooms_rows)
+                students_rows = self.analytics.track_students(
+                    students_rows, upsert
+                )
+
+            (
+                load_report["RoomsInserted"],
+                load_report["RoomsUpdated"],
+                load_report["RoomsSkipped"],
+            ) = self._insert_missing(
+                "Rooms",
+                ("RoomID", "RoomName"),
+                "RoomID",
+                uncommitted_rows(
+                    "Rooms", rooms, changed_rows("Rooms", rooms, rooms_rows, 0)
+                ),
+                batch_size,
+                ("RoomName",) if upsert else (),
+                merged_statements=(
+                    [(self.backend.add_room_stats_query(), ())]
+                    if incremental_room_stats
+                    else ()
+                ),
+                **chunk_options("Rooms", rooms),
+            )
+            if chunk_size is not None:
+                committed_tables.append("Rooms")
+
+            if validator is not None:
+                # Students may also live in rooms loaded before
+                self.cursor.execute(self.backend.room_ids_query)
+                validator.room_ids.update(
+                    row[0] for row in self.cursor.fetchall()
+                )
+
+            if workers > 1:
+                self.connection.commit()
+                committed_tables.append("Rooms")
+                insert_students = partial(
+                    self._insert_missing_parallel, workers=workers
+                )
+            elif incremental_room_stats:
+                refresh_query = self.backend.refresh_room_stats_query()
+                refresh = (
+                    refresh_query.sql,
+                    refresh_query.bind(today=date_key(date.today())),
+                )
+                # The refresh seeks the Students indexes on every load
+                self.query_log[refresh] += 1
+                insert_students = partial(
+                    self._insert_missing,
+                    staged_statements=[
+                        (self.backend.mark_room_stats_query(moved=upsert), ())
+                    ],
+                    merged_statements=[refresh],
+                    **chunk_options("Students", students),
+                )
+            else:
+                insert_students = partial(
+                    self._insert_missing,
+                    **chunk_options("Students", students),
+                )
+
+            (
+                load_report["StudentsInserted"],
+                load_report["StudentsUpdated"],
+                load_report["StudentsSkipped"],
+            ) = insert_students(
+                "Students",
+                (
+                    "Birthday",
+                    "StudentID",
+                    "Name",
+                    "RoomID",
+                    "Sex",
+                    "BirthDateKey",
+                ),
+                "StudentID",
+                uncommitted_rows(
+                    "Students",
+                    students,
+                    changed_rows("Students", students, students_rows, 1),
+                ),
+                batch_size,
+                ("Name", "RoomID", "Sex") if upsert else (),
+            )
+            if chunk_size is not None:
+                committed_tables.append("Students")
+
+            # The rows committed by an earlier attempt may not be summarized yet
+            if not incremental_room_stats and (
+                any(resumed.values())
+                or any(
+                    load_report[counter]
+                    for counter in (
+                        "RoomsInserted",
+                        "StudentsInserted",
+                        "StudentsUpdated",
                     )
+                )
+            ):
+                self._rebuild_room_stats()
 
             self.connection.commit()
-            logging.info("Data has been successfully loaded.")
+            committed_tables += ["Rooms", "Students"]
+
+            if validator is not None:
+                load_report["RoomsRejected"] = validator.rejected["Rooms"]
+                load_report["StudentsRejected"] = validator.rejected[
+                    "Students"
+                ]
+
+            if delta is not None:
+                delta.save()
+                load_report["RoomsSkipped"] += delta.skipped.get("Rooms", 0)
+                load_report["StudentsSkipped"] += delta.skipped.get(
+                    "Students", 0
+                )
+
+            if progress is not None:
+                progress.clear()
+                load_report["RoomsSkipped"] += resumed.get("Rooms", 0)
+                load_report["StudentsSkipped"] += resumed.get("Students", 0)
+
+            if any(resumed.values()) or any(
+                load_report[counter]
+                for counter in (
+                    "RoomsInserted",
+                    "RoomsUpdated",
+                    "StudentsInserted",
+                    "StudentsUpdated",
+                )
+            ):
+                self.query_cache.invalidate()
+
+            logging.info(
+                "Data has been successfully loaded: "
+                f"{load_report['RoomsInserted']} rooms inserted, "
+                f"{load_report['RoomsUpdated']} rooms updated, "
+                f"{load_report['RoomsSkipped']} rooms skipped, "
+                f"{load_report['RoomsRejected']} rooms rejected, "
+                f"{load_report['StudentsInserted']} students inserted, "
+                f"{load_report['StudentsUpdated']} students updated, "
+                f"{load_report['StudentsSkipped']} students skipped, "
+                f"{load_report['StudentsRejected']} students rejected."
+            )
 
         except Exception as e:
+            # Partitions or chunks committed before the failure may have changed the
+            # data
+            self.query_cache.invalidate()
+            self.metrics.increment(
+                "loaddata_operation_errors_total", operation="load_data"
+            )
+
             logging.error(
                 f"An error occurred while loading data: {e}", exc_info=True
             )
 
-    def query_rooms_and_students_count(self) -> List[Dict[str, int]]:
+            try:
+                self.connection.rollback()
+            except Exception:
+                logging.error("The failed load could not be rolled back.")
+
+            load_report["Failed"] = 1
+            self._discard_tracked_rows(
+                analytics_savepoint, chunk_size is not None or workers > 1
+            )
+            for table in ("Rooms", "Students"):
+                if table not in committed_tables:
+                    load_report[f"{table}Inserted"] = 0
+                    load_report[f"{table}Updated"] = 0
+
+        finally:
+            if validator is not None:
+                validator.close()
+
+            if dropped_indexes:
+                try:
+                    with self.metrics.operation("rebuild_indexes"):
+                        index_advisor.create_indexes(dropped_indexes)
+                except Exception as e:
+                    logging.error(
+                        f"The indexes could not be rebuilt: {e}", exc_info=True
+                    )
+
+        for table in ("Rooms", "Students"):
+            for outcome in ("Inserted", "Updated", "Skipped", "Rejected"):
+                self.metrics.increment(
+                    "loaddata_rows_total",
+                    load_report[f"{table}{outcome}"],
+                    operation="load_data",
+                    table=table,
+                    outcome=outcome.lower(),
+                )
+
+        return load_report
+
+    def _discard_tracked_rows(
+        self,
+        savepoint: Optional[Tuple[int, int]],
+        partially_committed: bool,
+    ) -> None:
+        if self.analytics is None or savepoint is None:
+            return
+
+        if not partially_committed:
+            self.analytics.roll_back(savepoint)
+            return
+
+        # Which of the tracked rows were committed is unknown, the reports read the
+        # database from now on
+        logging.warning(
+            "The analytics engine is disabled, the failed load committed part of "
+            "its rows."
+        )
+        self.analytics = None
+
+    def _is_empty(self, table: str) -> bool:
+        self.cursor.execute(self.backend.any_row_query(table))
+
+        return self.cursor.fetchone() is None
+
+    def _read_records(
+        self,
+        source: Union[str, Iterable[Dict[str, Any]]],
+        snapshots: Optional[SnapshotCache],
+        table: str,
+        parse_processes: int = 1,
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Queries the database to retrieve a list of rooms and the count of students in each room.
+        Streams the records of an input, counting the bytes of a file read in full.
+
+        Args:
+            source (Union[str, Iterable[Dict[str, Any]]]): A JSON file path or the records.
+            snapshots (Optional[SnapshotCache]): The cache of parsed files.
+            table (str): The table the records are loaded into.
+            parse_processes (int, optional): The number of processes parsing a file.
+            Defaults to 1.
+
+        Yields:
+            Dict[str, Any]: The records.
+        """
+
+        yield from _records(source, snapshots, parse_processes)
+
+        if isinstance(source, str) and os.path.isfile(source):
+            self.metrics.increment(
+                "loaddata_bytes_read_total",
+                os.path.getsize(source),
+                table=table,
+            )
+
+    def _insert_missing(
+        self,
+        table: str,
+        columns: Sequence[str],
+        key: str,
+        rows: Iterable[Tuple[Any, ...]],
+        batch_size: int,
+        update_columns: Sequence[str] = (),
+        staged_statements: Sequence[Tuple[str, Sequence[Any]]] = (),
+        merged_statements: Sequence[Tuple[str, Sequence[Any]]] = (),
+        chunk_size: int = 0,
+        on_commit: Optional[Callable[[int], None]] = None,
+        retries: int = 0,
+        retry_delay: float = 0.5,
+    ) -> Tuple[int, int, int]:
+        """
+        Inserts the rows whose key is not yet present in the table, one batch at a time.
+
+        With a `chunk_size` the batches are committed whenever at least that many rows
+        were sent since the last commit, and once more after the last batch. The rows
+        of the current chunk are kept, so that a chunk failing with a transient error
+        (see Backend.is_transient) is rolled back and sent again, after a delay that
+        doubles with every attempt. A connection that cannot even roll back is replaced.
+
+        Args:
+            table (str): The target table name.
+            columns (Sequence[str]): The target columns, in the order of the row tuples.
+            key (str): The primary key column used to skip existing rows.
+            rows (Iterable[Tuple[Any, ...]]): The rows to insert.
+            batch_size (int): The number of rows sent per round trip.
+            update_columns (Sequence[str], optional): The columns updated in existing rows
+            whose values differ. Defaults to (), which skips existing rows.
+            staged_statements (Sequence[Tuple[str, Sequence[Any]]], optional): The
+            statements, with their parameters, run on every batch once it is staged,
+            before the table changes. Defaults to ().
+            merged_statements (Sequence[Tuple[str, Sequence[Any]]], optional): The
+            statements, with their parameters, run on every batch once it is inserted.
+            Defaults to ().
+            chunk_size (int, optional): The number of rows per committed chunk. Defaults
+            to 0, which leaves the commit to the caller.
+            on_commit (Optional[Callable[[int], None]], optional): Called after every
+            commit with the number of rows read so far. Defaults to None.
+            retries (int, optional): The number of times a chunk is sent again after a
+            transient error. Defaults to 0.
+            retry_delay (float, optional): The seconds before the first retry. Defaults
+            to 0.5.
 
         Returns:
-            List[Dict[str, int]]: A list of dictionaries, where each dictionary represents a room
-            with its corresponding 'RoomID' and 'StudentsCount'.
+            Tuple[int, int, int]: The number of inserted, updated and skipped rows.
+        """
+
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer.")
+
+        staging = self.backend.staging_table(table)
+        column_list = ", ".join(columns)
+        key_position = columns.index(key)
+
+        truncate_query = self.backend.truncate_staging_query(table)
+        staging_insert_query = f"""
+            INSERT INTO {staging} ({column_list})
+            VALUES ({", ".join("?" for _ in columns)})
+        """
+        merge_query = f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {staging} st
+            WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{key} = st.{key})
+        """
+
+        update_query = (
+            self.backend.update_from_staging_query(table, key, update_columns)
+            if update_columns
+            else None
+        )
+
+        def create_staging() -> None:
+            for query in self.backend.create_staging_queries(table, columns):
+                self.cursor.execute(query)
+
+        def insert_batch(
+            unique_rows: List[Tuple[Any, ...]]
+        ) -> Tuple[int, int]:
+            # Every statement runs on a cursor of its own, so it is prepared once and
+            # not again on every batch
+            statement = self._pooled.statement
+
+            statement(truncate_query).execute(truncate_query)
+            staging_insert_cursor = statement(staging_insert_query)
+            self.backend.prepare_bulk_cursor(staging_insert_cursor)
+            staging_insert_cursor.executemany(
+                staging_insert_query, unique_rows
+            )
+
+            for query, parameters in staged_statements:
+                statement(query).execute(query, parameters)
+
+            batch_updated = 0
+            if update_query:
+                update_cursor = statement(update_query)
+                update_cursor.execute(update_query)
+                batch_updated = max(update_cursor.rowcount, 0)
+
+            merge_cursor = statement(merge_query)
+            merge_cursor.execute(merge_query)
+            batch_inserted = max(merge_cursor.rowcount, 0)
+
+            for query, parameters in merged_statements:
+                statement(query).execute(query, parameters)
+
+            self.metrics.observe(
+                "loaddata_batch_rows", len(unique_rows), table=table
+            )
+            self.metrics.increment(
+                "loaddata_round_trips_total",
+                (4 if update_query else 3)
+                + len(staged_statements)
+                + len(merged_statements),
+                operation="load_data",
+            )
+
+            return batch_inserted, batch_updated
+
+        create_staging()
+
+        inserted = updated = skipped = 0
+        read_rows = chunk_rows = 0
+        # The batches sent since the last commit
+        chunk: List[Tuple[List[Tuple[Any, ...]], int]] = []
+
+        def send_chunk() -> None:
+            nonlocal inserted, updated, skipped
+            attempt = 0
+
+            while True:
+                try:
+                    counts = [0, 0, 0]
+                    for unique_rows, batch_rows in chunk:
+                        batch_inserted, batch_updated = insert_batch(
+                            unique_rows
+                        )
+                        counts[0] += batch_inserted
+                        counts[1] += batch_updated
+                        counts[2] += (
+                            batch_rows - batch_inserted - batch_updated
+                        )
+
+                    if chunk_size:
+                        self.connection.commit()
+                    break
+
+                except Exception as e:
+                    if (
+                        not chunk_size
+                        or attempt == retries
+                        or not self.backend.is_transient(e)
+                    ):
+                        raise
+
+                    delay = retry_delay * 2**attempt
+                    attempt += 1
+                    logging.warning(
+                        f"A chunk of {table} failed and is sent again in {delay} "
+                        f"seconds (attempt {attempt} of {retries}): {e}"
+                    )
+                    self.metrics.increment(
+                        "loaddata_retries_total", operation="load_data"
+                    )
+                    self._roll_back_or_reconnect()
+                    time.sleep(delay)
+                    # The rollback may have dropped the staging table
+                    create_staging()
+
+            inserted += counts[0]
+            updated += counts[1]
+            skipped += counts[2]
+            chunk.clear()
+
+            if chunk_size and on_commit is not None:
+                on_commit(read_rows)
+
+        for batch in _batches(rows, batch_size):
+            # Repeated IDs inside one batch would violate the primary key, the first one wins
+            unique_rows: Dict[Any, Tuple[Any, ...]] = {}
+            for row in batch:
+                unique_rows.setdefault(row[key_position], row)
+
+            read_rows += len(batch)
+            chunk_rows += len(batch)
+            chunk.append((list(unique_rows.values()), len(batch)))
+
+            # Without chunks every batch is sent on its own
+            if chunk_rows >= chunk_size:
+                send_chunk()
+                chunk_rows = 0
+
+        if chunk:
+            send_chunk()
+
+        self.cursor.execute(self.backend.drop_staging_query(table))
+
+        return inserted, updated, skipped
+
+    def _roll_back_or_reconnect(self) -> None:
+        try:
+            self.connection.rollback()
+        except Exception as e:
+            logging.warning(f"The connection is replaced: {e}")
+
+            self.pool.release(self._pooled, discard=True)
+            self._pooled = self.pool.acquire()
+            self.connection = self._pooled.connection
+            self.cursor = self._pooled.cursor
+
+    def _insert_missing_parallel(
+        self,
+        table: str,
+        columns: Sequence[str],
+        key: str,
+        rows: Iterable[Tuple[Any, ...]],
+        batch_size: int,
+        update_columns: Sequence[str] = (),
+        workers: int = 2,
+    ) -> Tuple[int, int, int]:
+        """
+        Inserts the rows whose key is not yet present in the table through a pool of
+        worker connections, one committed partition of `batch_size` rows per task.
+
+        Args:
+            table (str): The target table name.
+            columns (Sequence[str]): The target columns, in the order of the row tuples.
+            key (str): The primary key column used to skip existing rows.
+            rows (Iterable[Tuple[Any, ...]]): The rows to insert.
+            batch_size (int): The number of rows per partition.
+            update_columns (Sequence[str], optional): The columns updated in existing rows
+            whose values differ. Defaults to ().
+            workers (int, optional): The number of worker connections. Defaults to 2.
+
+        Raises:
+            Exception: The first error raised by a partition, after the partitions that
+            are already running have finished.
+
+        Returns:
+            Tuple[int, int, int]: The number of inserted, updated and skipped rows.
+        """
+
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer.")
+
+        # The workers borrow one connection per partition from a pool of their own
+        worker_pool = ConnectionPool(
+            self.connection_string, self.backend, max_size=workers
+        )
+
+        def insert_partition(
+            partition: List[Tuple[Any, ...]]
+        ) -> Tuple[int, int, int]:
+            # pyodbc releases the GIL while a statement runs, so the workers overlap
+            with DataLoader(
+                pool=worker_pool, metrics=self.metrics
+            ) as worker_loader:
+                result = worker_loader._insert_missing(
+                    table, columns, key, partition, batch_size, update_columns
+                )
+                worker_loader.connection.commit()
+
+            return result
+
+        inserted = updated = skipped = 0
+        pending: Set[Future] = set()
+        errors: List[BaseException] = []
+
+        def collect(futures: Iterable[Future]) -> None:
+            nonlocal inserted, updated, skipped
+
+            for future in futures:
+                if future.exception():
+                    errors.append(future.exception())
+                else:
+                    inserted += future.result()[0]
+                    updated += future.result()[1]
+                    skipped += future.result()[2]
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for partition in _batches(rows, batch_size):
+                    # Keep a bounded number of parsed partitions in memory
+                    if len(pending) >= 2 * workers:
+                        done, pending = wait(
+                            pending, return_when=FIRST_COMPLETED
+                        )
+                        collect(done)
+                        if errors:
+                            break
+
+                    pending.add(executor.submit(insert_partition, partition))
+
+                collect(wait(pending).done)
+        finally:
+            worker_pool.close()
+
+        if errors:
+            raise errors[0]
+
+        return inserted, updated, skipped
+
+    @timed_operation
+    @cached_query
+    def query_room_statistics(self) -> List[Dict[str, Any]]:
+        """
+        Returns the statistics of every room: the number of students, their average,
+        minimum and maximum age, the age difference and whether students of both sexes
+        live there.
+
+        They are derived from the per-room aggregates of the 'RoomStats' table, which
+        load_data keeps up to date, so a report reads one row per room instead of
+        scanning the 'Students' table. Ages are the completed years at today's date;
+        the table is rebuilt once a day, by the first query that finds age sums computed
+        at another date.
+        The other `query_*` methods are projections of it.
+        With the in-process analytics engine enabled it is computed from the loaded
+        data instead.
+
+        Returns:
+            List[Dict[str, Any]]: A list of dictionaries, one per room, with 'RoomID',
+            'StudentsCount', 'AvgAge', 'MinAge', 'MaxAge', 'AgeDifference' and 'MixedSex'.
+            The age fields are None for rooms without students.
 
         Raises:
             Exception: If an error occurs during the database query.
         """
 
+        if self.analytics is not None and self.analytics.loaded:
+            return self.analytics.query_room_statistics()
+
         try:
-            query = """
-                SELECT r.RoomID, COUNT(s.StudentID) as StudentsCount
-                FROM Rooms r
-                LEFT JOIN Students s ON r.RoomID = s.RoomID
-                GROUP BY r.RoomID
-            """
+            today = date.today()
+            today_key = date_key(today)
+            query = self.backend.room_stats_query
+            cursor = self._pooled.statement(query)
+            cursor.execute(query)
+            query_result = cursor.fetchall()
+            self.query_log[(query, ())] += 1
+            self.metrics.increment(
+                "loaddata_round_trips_total", operation="query_room_statistics"
+            )
 
-            self.cursor.execute(query)
-            query_result = self.cursor.fetchall()
+            if any(row[1] and row[-1] != today_key for row in query_result):
+                self._rebuild_room_stats()
+                self.connection.commit()
+                cursor.execute(query)
+                query_result = cursor.fetchall()
+                self.metrics.increment(
+                    "loaddata_round_trips_total",
+                    3,
+                    operation="query_room_statistics",
+                )
 
-            rooms_and_students_count_list = [
-                dict(RoomID=room_id, StudentsCount=students_count)
-                for room_id, students_count in query_result
+            room_statistics_list: List[Dict[str, Any]] = [
+                _room_statistics(row, today_key)._asdict()
+                for row in query_result
             ]
 
             logging.info(
-                """The request to get a list of rooms and the number of students in each room was completed 
-            successfully."""
+                "The request to get the statistics of every room was completed successfully."
             )
 
-            return rooms_and_students_count_list
+            return room_statistics_list
 
         except Exception as e:
+            self.metrics.increment(
+                "loaddata_operation_errors_total",
+                operation="query_room_statistics",
+            )
             logging.error(f"Error executing the request: {e}", exc_info=True)
             return []
 
-    def query_min_avg_age_rooms(self, limit: int = 5) -> List[Dict[str, int]]:
+    def run_room_query(
+        self, query: RoomQuery, limit: int = 0
+    ) -> List[Dict[str, Any]]:
         """
-        Retrieves a list of rooms with the smallest average age of students.
+        Runs a declarative report on the rooms (see RoomQuery) as one parameterized
+        statement on the 'RoomStats' table, whose text is the same for every limit, so
+        the server reuses its plan. Age sums computed at another date are refreshed
+        first. With the in-process analytics engine enabled the report is evaluated on
+        its room statistics instead. Results are not cached.
 
         Args:
-            limit (int, optional): The number of rooms to retrieve. Defaults to 5.
-
-        Returns:
-            List[Dict[str, int]]: A list of dictionaries, where each dictionary represents a room
-            with its corresponding 'RoomID' and 'AvgAge' (average age of students).
+            query (RoomQuery): The report.
+            limit (int, optional): The number of rooms, if the report has a limit.
+            Defaults to 0.
 
         Raises:
             Exception: If an error occurs during the database query.
+
+        Returns:
+            List[Dict[str, Any]]: One dictionary of the selected measures per room, or
+            an empty list if an error occurred.
         """
 
-        try:
-            query = """
-                SELECT TOP({}) r.RoomID, AVG(DATEDIFF(YEAR, s.Birthday, GETDATE())) as AvgAge
-                FROM Rooms r
-                JOIN Students s ON r.RoomID = s.RoomID
-                GROUP BY r.RoomID
-                ORDER BY AvgAge
-            """.format(
-                limit
+        if self.analytics is not None and self.analytics.loaded:
+            return query.evaluate(
+                self.analytics.query_room_statistics(), limit
             )
 
-            self.cursor.execute(query)
-            query_result = self.cursor.fetchall()
-
-            query_min_avg_age_rooms_list: List[Dict[str, int]] = [
-                dict(RoomID=room_id, AvgAge=avg_age)
-                for room_id, avg_age in query_result
-            ]
+        try:
+            today_key = date_key(date.today())
+            self._refresh_room_ages(today_key)
+
+            compiled = self.backend.compile_room_query(query)
+            parameters = compiled.bind(**query.values(today_key, limit))
+            cursor = self._pooled.statement(compiled.sql)
+            cursor.execute(compiled.sql, parameters)
+            query_result = cursor.fetchall()
+            self.query_log[(compiled.sql, parameters)] += 1
+            self.metrics.increment(
+                "loaddata_round_trips_total", operation="run_room_query"
+            )
 
-            logging.info(
-                """The request to get a list of 5 rooms with the smallest average age of students was completed 
-            successfully."""
+            mixed_sex = (
+                query.columns.index("MixedSex")
+                if "MixedSex" in query.columns
+                else None
             )
+            rooms: List[Dict[str, Any]] = []
+            for row in query_result:
+                room = dict(zip(query.columns, row))
+                if mixed_sex is not None:
+                    # SQL has no boolean type, the flag is computed as 1 or 0
+                    room["MixedSex"] = bool(row[mixed_sex])
+                rooms.append(room)
 
-            return query_min_avg_age_rooms_list
+            return rooms
 
         except Exception as e:
+            self.metrics.increment(
+                "loaddata_operation_errors_total", operation="run_room_query"
+            )
             logging.error(f"Error executing the request: {e}", exc_info=True)
             return []
 
+    @timed_operation
+    @cached_query
+    def query_rooms_and_students_count(self) -> List[Dict[str, int]]:
+        """
+        Retrieves a list of rooms and the count of students in each room.
+
+        Returns:
+            List[Dict[str, int]]: A list of dictionaries, where each dictionary represents a room
+            with its corresponding 'RoomID' and 'StudentsCount'.
+        """
+
+        return self.run_room_query(ROOMS_AND_STUDENTS_COUNT)
+
+    @timed_operation
+    @cached_query
+    def query_min_avg_age_rooms(self, limit: int = 5) -> List[Dict[str, int]]:
+        """
+        Retrieves a list of rooms with the smallest average age of students.
+
+        Args:
+            limit (int, optional): The number of rooms to retrieve. Defaults to 5.
+
+        Returns:
+            List[Dict[str, int]]: A list of dictionaries, where each dictionary represents a room
+            with its corresponding 'RoomID' and 'AvgAge' (average age of students).
+        """
+
+        return self.run_room_query(MIN_AVG_AGE_ROOMS, limit)
+
+    @timed_operation
+    @cached_query
     def query_max_age_difference_rooms(
         self, limit: int = 5
     ) -> List[Dict[str, int]]:
@@ -258,271 +1176,852 @@ class DataLoader:
         Returns:
             List[Dict[str, int]]: A list of dictionaries, where each dictionary represents a room
             with its corresponding 'RoomID' and 'AgeDifference' (largest age difference among students).
+        """
+
+        return self.run_room_query(MAX_AGE_DIFFERENCE_ROOMS, limit)
+
+    @timed_operation
+    @cached_query
+    def query_gender_mismatch_rooms(self) -> List[Dict[str, int]]:
+        """
+        Retrieves a list of rooms where mixed-sex students live.
+
+        Returns:
+            List[Dict[str, int]]: A list of dictionaries, where each dictionary represents a room
+            with its corresponding 'RoomID'.
+        """
+
+        return self.run_room_query(GENDER_MISMATCH_ROOMS)
+
+    def iter_room_statistics(
+        self, chunk_size: int = 1000, keyset: bool = True
+    ) -> Iterator[RoomStatistics]:
+        """
+        Streams the statistics of every room in RoomID order, as query_room_statistics
+        computes them, without building the whole result or caching it.
+
+        With `keyset` every chunk is a query of its own for the `chunk_size` rooms after
+        the last RoomID read (keyset pagination), so no result set stays open while the
+        consumer handles a chunk and it may run other statements meanwhile. Otherwise a
+        single query is read with `fetchmany` in chunks of `chunk_size` rows, and the
+        connection must not run other statements until the stream ends. Age sums
+        computed at another date are refreshed first.
+
+        Args:
+            chunk_size (int, optional): The number of rooms read per round trip.
+            Defaults to 1000.
+            keyset (bool, optional): Whether to paginate on RoomID. Defaults to True.
 
         Raises:
-            Exception: If an error occurs during the database query.
+            Exception: If an error occurs during the database query. The error is
+            logged and raised again, so that a partial result is not taken for a whole.
+
+        Yields:
+            RoomStatistics: The statistics of the next room.
         """
 
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer.")
+
+        if self.analytics is not None and self.analytics.loaded:
+            for room in self.analytics.query_room_statistics():
+                yield RoomStatistics(**room)
+            return
+
         try:
-            query = """
-                SELECT TOP({}) r.RoomID, 
-                MAX(DATEDIFF(YEAR, s.Birthday, GETDATE())) - MIN(DATEDIFF(YEAR, s.Birthday, GETDATE())) as AgeDifference
-                FROM Rooms r
-                JOIN Students s ON r.RoomID = s.RoomID
-                GROUP BY r.RoomID
-                ORDER BY AgeDifference DESC
-            """.format(
-                limit
+            today_key = date_key(date.today())
+            self._refresh_room_ages(today_key)
+
+            chunks = (
+                self._room_stats_pages(chunk_size)
+                if keyset
+                else self._room_stats_chunks(chunk_size)
             )
+            for rows in chunks:
+                for row in rows:
+                    yield _room_statistics(row, today_key)
 
-            self.cursor.execute(query)
-            query_result = self.cursor.fetchall()
+        except Exception as e:
+            self.metrics.increment(
+                "loaddata_operation_errors_total",
+                operation="iter_room_statistics",
+            )
+            logging.error(
+                f"An error occurred while streaming the room statistics: {e}",
+                exc_info=True,
+            )
+            raise
 
-            query_max_age_difference_rooms_list: List[Dict[str, int]] = [
-                dict(RoomID=room_id, AgeDifference=age_difference)
-                for room_id, age_difference in query_result
-            ]
+    def iter_rooms_and_students_count(
+        self, chunk_size: int = 1000, keyset: bool = True
+    ) -> Iterator[RoomStudentsCount]:
+        """
+        Streams the result of query_rooms_and_students_count (see iter_room_statistics).
 
-            logging.info(
-                """The request to get a list of 5 rooms with the largest age difference among the students was 
-            completed successfully."""
-            )
+        Args:
+            chunk_size (int, optional): The number of rooms read per round trip.
+            Defaults to 1000.
+            keyset (bool, optional): Whether to paginate on RoomID. Defaults to True.
 
-            return query_max_age_difference_rooms_list
+        Yields:
+            RoomStudentsCount: The next room and its number of students.
+        """
 
-        except Exception as e:
-            logging.error(f"Error executing the request: {e}", exc_info=True)
-            return []
+        for room in self.iter_room_statistics(chunk_size, keyset):
+            yield RoomStudentsCount(room.RoomID, room.StudentsCount)
 
-    def query_gender_mismatch_rooms(self) -> List[Dict[str, int]]:
+    def iter_gender_mismatch_rooms(
+        self, chunk_size: int = 1000, keyset: bool = True
+    ) -> Iterator[MixedSexRoom]:
         """
-        Retrieves a list of rooms where mixed-sex students live.
+        Streams the result of query_gender_mismatch_rooms (see iter_room_statistics).
 
-        Returns:
-            List[Dict[str, int]]: A list of dictionaries, where each dictionary represents a room
-            with its corresponding 'RoomID'.
+        Args:
+            chunk_size (int, optional): The number of rooms read per round trip.
+            Defaults to 1000.
+            keyset (bool, optional): Whether to paginate on RoomID. Defaults to True.
 
-        Raises:
-            Exception: If an error occurs during the database query.
+        Yields:
+            MixedSexRoom: The next room where students of both sexes live.
         """
 
-        try:
-            query = """
-                SELECT r.RoomID
-                FROM Rooms r
-                JOIN Students s ON r.RoomID = s.RoomID
-                GROUP BY r.RoomID
-                HAVING COUNT(DISTINCT s.Sex) > 1
-            """
+        for room in self.iter_room_statistics(chunk_size, keyset):
+            if room.MixedSex:
+                yield MixedSexRoom(room.RoomID)
 
-            self.cursor.execute(query)
-            query_result = self.cursor.fetchall()
+    def _refresh_room_ages(self, today_key: int) -> None:
+        # Loads and rebuilds store today's ages, so one check a day is enough
+        if self._room_ages_key == today_key:
+            return
 
-            query_gender_mismatch_rooms_list: List[Dict[str, int]] = [
-                dict(RoomID=row[0]) for row in query_result
-            ]
+        self.cursor.execute(
+            self.backend.any_row_query(
+                "RoomStats", "StudentsCount > 0 AND AgeDateKey <> ?"
+            ),
+            (today_key,),
+        )
+        self.metrics.increment(
+            "loaddata_round_trips_total", operation="iter_room_statistics"
+        )
 
-            logging.info(
-                """The request to get a list of 5 rooms where mixed-sex students live was completed 
-            successfully."""
+        if self.cursor.fetchone() is not None:
+            self._rebuild_room_stats()
+            self.connection.commit()
+
+        self._room_ages_key = today_key
+
+    def _room_stats_pages(
+        self, chunk_size: int
+    ) -> Iterator[List[Tuple[Any, ...]]]:
+        query = self.backend.room_stats_page_query(chunk_size, first=True)
+        next_query = self.backend.room_stats_page_query(chunk_size)
+        parameters: Tuple[Any, ...] = ()
+
+        while True:
+            cursor = self._pooled.statement(query)
+            cursor.execute(query, parameters)
+            rows = cursor.fetchall()
+            self.metrics.increment(
+                "loaddata_round_trips_total", operation="iter_room_statistics"
             )
 
-            return query_gender_mismatch_rooms_list
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
 
-        except Exception as e:
-            logging.error(f"Error executing the request: {e}", exc_info=True)
-            return []
+            query, parameters = next_query, (rows[-1][0],)
+
+    def _room_stats_chunks(
+        self, chunk_size: int
+    ) -> Iterator[List[Tuple[Any, ...]]]:
+        # A cursor of its own: the statement cursors may be reused while it is read
+        cursor = self.connection.cursor()
+
+        try:
+            cursor.execute(self.backend.room_stats_query)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                self.metrics.increment(
+                    "loaddata_round_trips_total",
+                    operation="iter_room_statistics",
+                )
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
 
-    def optimize_queries(self) -> None:
+    def optimize_queries(self, advise: bool = False) -> List[str]:
         """
-        Optimizes queries by creating indexes on specific fields in the Students table.
+        Optimizes the queries with a minimal set of indexes on the Students table.
 
-        Indexes:
-        - 'idx_Students_RoomID' on the RoomID field in the Students table.
-        - 'idx_Students_RoomID_Birthday' on the RoomID and Birthday fields in the Students table.
-        - 'idx_Students_RoomID_Birthday_Sex' on the RoomID, Birthday, and Sex fields in the Students table.
+        By default the backend's `default_indexes` are created: one index on RoomID,
+        BirthDateKey and Sex, which covers the room statistics query. With `advise`
+        the indexes are instead chosen by IndexAdvisor from the plans and timings of
+        the queries the loader ran. Other candidate indexes, such as the redundant
+        'idx_Students_RoomID' and the Birthday indexes created by earlier versions, are
+        dropped.
+
+        Args:
+            advise (bool, optional): Whether to evaluate the candidate indexes on the
+            recorded workload. Defaults to False.
 
         Raises:
             Exception: If an error occurs during the index creation process.
 
         Returns:
-            None: This method does not return any value.
+            List[str]: The names of the indexes in place, empty if an error occurred.
         """
 
         try:
-            # Index on the RoomID field in the Students table
-            index_students_room_id_query = """
-                IF NOT EXISTS (
-                    SELECT * FROM sys.indexes WHERE name = 'idx_Students_RoomID' AND object_id = OBJECT_ID('Students')
-                )
-                BEGIN
-                    CREATE INDEX idx_Students_RoomID ON Students(RoomID);
-                END;
-            """
-            self.cursor.execute(index_students_room_id_query)
-
-            # Index on the RoomID and Birthday fields in the Students table
-            index_students_room_id_birthday_query = """
-                IF NOT EXISTS (
-                    SELECT * FROM sys.indexes WHERE name = 'idx_Students_RoomID_Birthday' 
-                    AND object_id = OBJECT_ID('Students')
-                )
-                BEGIN
-                    CREATE INDEX idx_Students_RoomID_Birthday ON Students(RoomID, Birthday);
-                END;
-            """
-            self.cursor.execute(index_students_room_id_birthday_query)
-
-            # Index on the RoomID, Birthday, and Sex fields in the Students table
-            index_students_room_id_birthday_sex_query = """
-                IF NOT EXISTS (
-                    SELECT * FROM sys.indexes 
-                    WHERE name = 'idx_Students_RoomID_Birthday_Sex' AND object_id = OBJECT_ID('Students')
-                )
-                BEGIN
-                    CREATE INDEX idx_Students_RoomID_Birthday_Sex ON Students(RoomID, Birthday, Sex);
-                END;
-            """
-            self.cursor.execute(index_students_room_id_birthday_sex_query)
+            index_advisor = IndexAdvisor(self)
+
+            if advise:
+                report = index_advisor.evaluate()
+                for row in report:
+                    logging.info(
+                        f"Index {row['Index'] or 'none'}: "
+                        f"{row['Seconds']:.4f}s, plan {row['Plan']}"
+                    )
+                indexes = index_advisor.recommend(report)
+            else:
+                indexes = list(self.backend.default_indexes)
 
-            self.connection.commit()
+            index_advisor.apply(indexes)
 
             logging.info("Index creation completed successfully.")
 
+            return indexes
+
         except Exception as e:
             logging.error(
                 f"An error occurred while creating indexes: {e}", exc_info=True
             )
+            return []
 
-    def close_connection(self) -> None:
+    def rebuild_room_stats(self) -> int:
         """
-        Closes the database connection if it is open.
+        Recomputes the 'RoomStats' table from the 'Students' table, e.g. after the data
+        was changed by another program or check_room_stats found a difference.
+
+        Raises:
+            Exception: If an error occurs during the rebuild.
 
         Returns:
-            None: This method does not return any value.
+            int: The number of rooms, 0 if an error occurred.
         """
 
-        if self.connection:
-            self.connection.close()
+        try:
+            rooms_count = self._rebuild_room_stats()
+            self.connection.commit()
+            self.query_cache.invalidate()
 
-        logging.info("The database connection was closed.")
+            logging.info(
+                f"The statistics of {rooms_count} rooms were rebuilt."
+            )
 
+            return rooms_count
+
+        except Exception as e:
+            logging.error(
+                f"An error occurred while rebuilding the room statistics: {e}",
+                exc_info=True,
+            )
+            try:
+                self.connection.rollback()
+            except Exception:
+                logging.error("The failed rebuild could not be rolled back.")
+            return 0
 
-class DocumentWriter:
-    @staticmethod
-    def export_result(export_result: List[Dict[str, Any]]) -> None:
+    def check_room_stats(self) -> Optional[List[Dict[str, Any]]]:
         """
-        Exports the query result to a file in either JSON or XML format.
+        Compares the 'RoomStats' table with the aggregates computed from the 'Students'
+        table. Age sums computed at another date than today are not compared.
 
-        Args:
-            export_result (List[Dict[str, Any]]): The result to be exported.
+        Raises:
+            Exception: If an error occurs during the check.
 
         Returns:
-            None: This method does not return any value.
-
-        Raises:
-            Exception: If an error occurs during the export process.
+            Optional[List[Dict[str, Any]]]: One dictionary per differing value with the
+            'RoomID', the 'Column' and the 'Stored' and 'Actual' values, where a missing
+            or extra room has the 'RoomID' column; None if the check failed.
         """
 
         try:
-            format_type = input(
-                "Enter the file format to save (xml or json): "
+            today_key = date_key(date.today())
+            columns = self.backend.room_stats_columns
+
+            self.cursor.execute(
+                self.backend.room_statistics_query(date.today())
+            )
+            actual = {row[0]: tuple(row) for row in self.cursor.fetchall()}
+            self.cursor.execute(
+                f"SELECT {', '.join(columns)}, AgeDateKey, Stale FROM RoomStats;"
+            )
+            stored = {row[0]: tuple(row) for row in self.cursor.fetchall()}
+
+            differences = []
+
+            for room_id in sorted(actual.keys() | stored.keys()):
+                if room_id not in stored or room_id not in actual:
+                    differences.append(
+                        dict(
+                            RoomID=room_id,
+                            Column="RoomID",
+                            Stored=room_id if room_id in stored else None,
+                            Actual=room_id if room_id in actual else None,
+                        )
+                    )
+                    continue
+
+                *stored_values, age_date_key, stale = stored[room_id]
+                for column, stored_value, actual_value in zip(
+                    columns, stored_values, actual[room_id]
+                ):
+                    if column == "AgeSum" and age_date_key not in (
+                        today_key,
+                        None,
+                    ):
+                        continue
+                    if stored_value != actual_value:
+                        differences.append(
+                            dict(
+                                RoomID=room_id,
+                                Column=column,
+                                Stored=stored_value,
+                                Actual=actual_value,
+                            )
+                        )
+                if stale:
+                    differences.append(
+                        dict(
+                            RoomID=room_id, Column="Stale", Stored=1, Actual=0
+                        )
+                    )
+
+            logging.info(
+                f"The room statistics check found {len(differences)} differences."
             )
 
-            if format_type.lower() != "xml" and format_type.lower() != "json":
-                print("Unsupported format. Only XML and JSON are supported.")
+            return differences
 
-            if format_type.lower() == "json":
-                json_result = json.dumps(export_result, indent=2)
+        except Exception as e:
+            logging.error(
+                f"An error occurred while checking the room statistics: {e}",
+                exc_info=True,
+            )
+            return None
 
-                with open("result.json", "w") as json_file:
-                    json_file.write(json_result)
+    def _rebuild_room_stats(self) -> int:
+        today = date.today()
 
-            if format_type.lower() == "xml":
-                # Converting the result to XML format
-                root_element_name = "Records"
-                item_element_name = "Data"
+        for query in self.backend.rebuild_room_stats_queries(today):
+            self.cursor.execute(query)
 
-                root = ET.Element(root_element_name)
+        # The aggregate the rebuild inserts scans the Students indexes
+        self.query_log[(self.backend.room_statistics_query(today), ())] += 1
 
-                for item in export_result:
-                    item_element = ET.SubElement(root, item_element_name)
-                    for key, value in item.items():
-                        element = ET.SubElement(item_element, key)
-                        element.text = str(value)
+        return max(self.cursor.rowcount, 0)
 
-                filename = input(
-                    "Enter the file name in filename.xml format: "
-                )
+    def close_connection(self) -> None:
+        """
+        Returns the database connection to the pool, or closes it if the loader owns
+        its pool. Prefer using the loader as a context manager.
 
-                if not filename.endswith(".xml"):
-                    print(
-                        "Invalid file format. Please provide a filename with .xml extension."
-                    )
-                else:
-                    # Convert to indented line
-                    xml_string = minidom.parseString(
-                        ET.tostring(root)
-                    ).toprettyxml(indent="  ")
+        Returns:
+            None: This method does not return any value.
+        """
 
-                    with open(filename, "w", encoding="utf-8") as xml_file:
-                        xml_file.write(xml_string)
+        if self._pooled is None:
+            return
 
-            logging.info("Writing data to the file was successful.")
+        self.pool.release(self._pooled)
+        self._pooled = self.connection = self.cursor = None
 
-        except Exception as e:
-            logging.error(
-                f"An error occurred while writing data to the file: {e}",
-                exc_info=True,
-            )
+        if self._owns_pool:
+            self.pool.close()
 
+        logging.info("The database connection was closed.")
 
-if __name__ == "__main__":
-    try:
-        logging.basicConfig(
-            level=logging.INFO,
-            filename="py_log.log",
-            filemode="w",
-            format="%(%(levelname)s %(message)s",
-        )
 
-        connection_string = (
-            f"DRIVER={{SQL Server}};SERVER={server};DATABASE={database}"
+def _records(
+    source: Union[str, Iterable[Dict[str, Any]]],
+    snapshots: Optional[SnapshotCache] = None,
+    parse_processes: int = 1,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the records of a JSON file path, or iterates records given directly.
+
+    Args:
+        source (Union[str, Iterable[Dict[str, Any]]]): A JSON file path or the records.
+        snapshots (Optional[SnapshotCache], optional): The cache of parsed files.
+        Defaults to None.
+        parse_processes (int, optional): The number of processes parsing the file.
+        Defaults to 1.
+
+    Returns:
+        Iterator[Dict[str, Any]]: The records.
+    """
+
+    if not isinstance(source, str):
+        return iter(source)
+
+    parse = (
+        partial(iter_json_array_parallel, processes=parse_processes)
+        if parse_processes > 1
+        else iter_json_array
+    )
+
+    return snapshots.records(source, parse) if snapshots else parse(source)
+
+
+def _room_statistics(row: Sequence[Any], today_key: int) -> RoomStatistics:
+    """
+    Derives the statistics of a room from a row of `Backend.room_stats_query`.
+    """
+
+    (
+        room_id,
+        students_count,
+        age_sum,
+        min_birth_date_key,
+        max_birth_date_key,
+        male_count,
+        female_count,
+        _,
+    ) = row
+
+    if not students_count:
+        return RoomStatistics(
+            room_id, students_count, None, None, None, None, False
         )
 
-        data_loader = DataLoader(connection_string)
+    # The youngest student was born last
+    min_age = _age(max_birth_date_key, today_key)
+    max_age = _age(min_birth_date_key, today_key)
+
+    return RoomStatistics(
+        room_id,
+        students_count,
+        _truncated_division(age_sum, students_count),
+        min_age,
+        max_age,
+        max_age - min_age,
+        bool(male_count and female_count),
+    )
+
+
+def _age(birth_date_key: int, today_key: int) -> int:
+    # Completed years, truncated towards zero like the integer division in SQL
+    return _truncated_division(today_key - birth_date_key, 10000)
+
+
+def _truncated_division(dividend: int, divisor: int) -> int:
+    quotient = abs(dividend) // divisor
+
+    return -quotient if dividend < 0 else quotient
+
+
+def _batches(
+    rows: Iterable[Tuple[Any, ...]], batch_size: int
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Splits rows into lists of at most `batch_size` consecutive rows.
+
+    Args:
+        rows (Iterable[Tuple[Any, ...]]): The rows to split.
+        batch_size (int): The maximum number of rows per list.
+
+    Yields:
+        List[Tuple[Any, ...]]: The next batch of rows.
+    """
+
+    rows_iterator = iter(rows)
+
+    while True:
+        batch = list(islice(rows_iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# Command line query name: DataLoader method and whether it takes a limit
+QUERIES = {
+    "rooms_students_count": ("query_rooms_and_students_count", False),
+    "min_avg_age_rooms": ("query_min_avg_age_rooms", True),
+    "max_age_difference_rooms": ("query_max_age_difference_rooms", True),
+    "gender_mismatch_rooms": ("query_gender_mismatch_rooms", False),
+}
+# The DataLoader methods streaming the queries whose result has a row per room
+STREAMING_QUERIES = {
+    "rooms_students_count": "iter_rooms_and_students_count",
+    "gender_mismatch_rooms": "iter_gender_mismatch_rooms",
+}
+
+
+def run_query(
+    data_loader: DataLoader, query: str, limit: int, stream: bool = False
+) -> Iterable[ExportRecord]:
+    """
+    Runs a query by its command line name.
+
+    Args:
+        data_loader (DataLoader): The loader to run the query on.
+        query (str): A key of QUERIES.
+        limit (int): The number of rooms for the top-N queries.
+        stream (bool, optional): Whether to return a lazy iterator for the queries of
+        STREAMING_QUERIES, which runs when it is read. Defaults to False.
+
+    Returns:
+        Iterable[ExportRecord]: The query result.
+    """
+
+    if stream and query in STREAMING_QUERIES:
+        return getattr(data_loader, STREAMING_QUERIES[query])()
+
+    method_name, takes_limit = QUERIES[query]
+    method = getattr(data_loader, method_name)
+
+    return method(limit) if takes_limit else method()
+
+
+def run_queries(
+    data_loader: DataLoader,
+    queries: Sequence[str],
+    limit: int,
+    jobs: int = 1,
+    stream: bool = False,
+) -> Dict[str, Iterable[ExportRecord]]:
+    """
+    Runs several queries, concurrently on `jobs` connections of their own if `jobs` > 1.
+
+    Args:
+        data_loader (DataLoader): The loader whose connection settings are used; it runs
+        the queries itself when `jobs` is 1.
+        queries (Sequence[str]): Keys of QUERIES.
+        limit (int): The number of rooms for the top-N queries.
+        jobs (int, optional): The number of concurrent connections. Defaults to 1.
+        stream (bool, optional): Whether to stream the results of STREAMING_QUERIES on
+        `data_loader`, which only applies with one job. Defaults to False.
+
+    Returns:
+        Dict[str, Iterable[ExportRecord]]: The result of every query by its name.
+    """
+
+    if jobs <= 1 or len(queries) <= 1:
+        return {
+            query: run_query(data_loader, query, limit, stream)
+            for query in queries
+        }
+
+    with ConnectionPool(
+        data_loader.connection_string, data_loader.backend, max_size=jobs
+    ) as job_pool:
+
+        def run_job(query: str) -> Iterable[ExportRecord]:
+            with DataLoader(pool=job_pool) as job_loader:
+                return run_query(job_loader, query, limit)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            return dict(zip(queries, executor.map(run_job, queries)))
+
+
+def parse_arguments(
+    argv: Optional[Sequence[str]] = None,
+) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): The arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Loads students and rooms into the database, runs the room "
+        "queries and exports their results."
+    )
+    parser.add_argument(
+        "--query",
+        choices=[*QUERIES, "all"],
+        default="all",
+        help="the query to run (default: all)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=5,
+        help="the number of rooms of the top-N queries (default: 5)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(EXPORT_WRITERS),
+        default="json",
+        help="the export format (default: json)",
+    )
+    parser.add_argument(
+        "--output",
+        help="the output file of a single query, or the output directory of all "
+        "queries, where '<query>.<format>' files are written (default: "
+        "output.<format> / the working directory)",
+    )
+    parser.add_argument(
+        "--students",
+        default=os.path.join("data_files", "students.json"),
+        help="the students JSON file (default: data_files/students.json)",
+    )
+    parser.add_argument(
+        "--rooms",
+        default=os.path.join("data_files", "rooms.json"),
+        help="the rooms JSON file (default: data_files/rooms.json)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="export the queries with a row per room as their rows are read, in "
+        "pages of 1000 rooms, instead of building their results in memory",
+    )
+    parser.add_argument(
+        "--no-load",
+        action="store_true",
+        help="query the database without loading the files first",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=list(BACKENDS),
+        default=SqlServerBackend.name,
+        help="the storage backend (default: sqlserver)",
+    )
+    parser.add_argument(
+        "--connection-string",
+        help="the connection string, or the database file for sqlite "
+        "(default: the server and database of config.py)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="the number of rows inserted per round trip (default: 1000)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="the number of connections loading students (default: 1)",
+    )
+    parser.add_argument(
+        "--parse-processes",
+        type=int,
+        default=1,
+        help="the number of processes parsing the input files (default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="commit the load in chunks of this many rows instead of at the end",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="the checkpoint file a chunked load records its progress in and "
+        "resumes from after an interruption",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="the number of times a chunk is sent again after a transient error "
+        "(default: 3)",
+    )
+    parser.add_argument(
+        "--watermark",
+        help="the watermark file of incremental loads (default: full loads)",
+    )
+    parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="update the existing rooms and students whose name, room or sex "
+        "changed instead of skipping them",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        help="the directory caching the parsed input files between runs",
+    )
+    parser.add_argument(
+        "--reject-file",
+        help="the JSON lines file receiving the rejected records",
+    )
+    parser.add_argument(
+        "--no-validate",
+        action="store_true",
+        help="insert the records without validating them first",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="the number of queries run concurrently on separate connections "
+        "(default: 1, where the queries run one after another on one connection, "
+        "each as a single statement on the RoomStats table)",
+    )
+    parser.add_argument(
+        "--advise-indexes",
+        action="store_true",
+        help="choose the indexes by timing the queries with every candidate index "
+        "instead of creating the default covering index",
+    )
+    parser.add_argument(
+        "--rebuild-room-stats",
+        action="store_true",
+        help="recompute the RoomStats summary table from the Students table",
+    )
+    parser.add_argument(
+        "--check-room-stats",
+        action="store_true",
+        help="compare the RoomStats summary table with the Students table and exit "
+        "with status 1 on a difference",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="the file receiving the run metrics in the Prometheus text format",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        help="profile the load, queries and exports with cProfile and save the "
+        "statistics to this directory",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="record the peak traced memory of every operation (slow)",
+    )
+
+    return parser.parse_args(argv)
+
+
+def run_reports(data_loader: DataLoader, arguments: argparse.Namespace) -> int:
+    """
+    Optimizes the queries, runs the requested RoomStats maintenance and exports the
+    requested queries.
+
+    Args:
+        data_loader (DataLoader): The loader connected to the database.
+        arguments (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The process exit status, 1 if an export or the RoomStats check failed.
+    """
+
+    # The queries below run on the indexes
+    data_loader.optimize_queries(advise=arguments.advise_indexes)
+
+    exit_status = 0
+
+    if arguments.rebuild_room_stats:
+        data_loader.rebuild_room_stats()
+
+    if arguments.check_room_stats:
+        differences = data_loader.check_room_stats()
+        if differences is None:
+            exit_status = 1
+        for difference in differences or []:
+            logging.error(f"RoomStats differs from Students: {difference}")
+            exit_status = 1
+
+    queries = list(QUERIES) if arguments.query == "all" else [arguments.query]
+    results = run_queries(
+        data_loader,
+        queries,
+        arguments.limit,
+        arguments.jobs,
+        arguments.stream,
+    )
+
+    if arguments.query == "all" and arguments.output:
+        os.makedirs(arguments.output, exist_ok=True)
+
+    for query, result in results.items():
+        if arguments.query == "all":
+            file_path = os.path.join(
+                arguments.output or "", f"{query}.{arguments.format}"
+            )
+        else:
+            file_path = arguments.output or f"output.{arguments.format}"
 
-        data_loader.create_database()
+        if not DocumentWriter.export_result(
+            result, arguments.format, file_path
+        ):
+            exit_status = 1
 
-        data_loader.create_tables()
+    return exit_status
 
-        students_file_route = input(
-            "Enter the full path to the students.json file: "
-        )
-        rooms_file_route = input(
-            "Enter the full path to the rooms.json file: "
-        )
 
-        data_loader.load_data(students_file_route, rooms_file_route)
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Runs the command line entry point without any interactive prompt.
 
-        document_writer = DocumentWriter()
+    Args:
+        argv (Optional[Sequence[str]], optional): The arguments. Defaults to sys.argv[1:].
 
-        query_rooms_and_students_count = (
-            data_loader.query_rooms_and_students_count()
-        )
-        document_writer.export_result(query_rooms_and_students_count)
+    Returns:
+        int: The process exit status, 1 if the load, an export or the RoomStats check
+        failed. Nothing is exported after a failed load.
+    """
 
-        query_min_avg_age_rooms = data_loader.query_min_avg_age_rooms()
-        document_writer.export_result(query_min_avg_age_rooms)
+    arguments = parse_arguments(argv)
 
-        query_max_age_difference_rooms = (
-            data_loader.query_max_age_difference_rooms()
-        )
-        document_writer.export_result(query_max_age_difference_rooms)
+    REGISTRY.profile_dir = arguments.profile_dir
+    REGISTRY.trace_memory = arguments.trace_memory
+
+    connection_string = arguments.connection_string or (
+        f"DRIVER={{SQL Server}};SERVER={server};DATABASE={database}"
+    )
+
+    exit_status = 0
 
-        query_gender_mismatch_rooms = data_loader.query_gender_mismatch_rooms()
-        document_writer.export_result(query_gender_mismatch_rooms)
+    with DataLoader(connection_string, arguments.backend) as data_loader:
+        data_loader.create_database()
+
+        data_loader.create_tables()
+
+        if not arguments.no_load:
+            load_report = data_loader.load_data(
+                arguments.students,
+                arguments.rooms,
+                batch_size=arguments.batch_size,
+                workers=arguments.workers,
+                watermark=arguments.watermark,
+                upsert=arguments.upsert,
+                validate=not arguments.no_validate,
+                reject_file=arguments.reject_file,
+                snapshot_dir=arguments.snapshot_dir,
+                parse_processes=arguments.parse_processes,
+                chunk_size=arguments.chunk_size,
+                checkpoint=arguments.checkpoint,
+                retries=arguments.retries,
+            )
+            if load_report["Failed"]:
+                logging.error("The load failed, no query is exported.")
+                exit_status = 1
 
-        data_loader.optimize_queries()
-    finally:
-        data_loader.close_connection()
+        if not exit_status:
+            exit_status = run_reports(data_loader, arguments)
+
+    if arguments.metrics:
+        with open(arguments.metrics, "w", encoding="utf-8") as file:
+            file.write(REGISTRY.prometheus_text())
+
+    return exit_status
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        filename="py_log.log",
+        filemode="w",
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    sys.exit(main())
@@ -0,0 +1,306 @@
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# The metrics recorded by DataLoader and DocumentWriter
+DESCRIPTIONS = {
+    "loaddata_operation_seconds": (
+        "summary",
+        "Duration of load_data, query and export operations.",
+    ),
+    "loaddata_operation_errors_total": (
+        "counter",
+        "Operations that failed.",
+    ),
+    "loaddata_operation_peak_memory_bytes": (
+        "gauge",
+        "Highest traced memory of an operation, with memory tracing enabled.",
+    ),
+    "loaddata_rows_total": (
+        "counter",
+        "Rows loaded (by outcome), returned by queries or exported.",
+    ),
+    "loaddata_round_trips_total": (
+        "counter",
+        "Statements sent to the database.",
+    ),
+    "loaddata_batch_rows": (
+        "summary",
+        "Rows per batch sent to the database.",
+    ),
+    "loaddata_bytes_read_total": (
+        "counter",
+        "Bytes of the input files read by load_data.",
+    ),
+    "loaddata_bytes_written_total": (
+        "counter",
+        "Bytes of the files written by exports.",
+    ),
+}
+
+
+class MetricsRegistry:
+    """
+    A thread-safe registry of counters, gauges and summaries (count and sum) with
+    labels, dumped in the Prometheus text exposition format.
+
+    `operation` times a block; with a `profile_dir` the outermost operation of a thread
+    also runs under cProfile and its statistics are saved there as
+    '<operation>-<n>.prof', and with `trace_memory` its peak traced memory is recorded.
+    Both slow the operations down and are meant for diagnostic runs.
+    """
+
+    def __init__(
+        self, profile_dir: Optional[str] = None, trace_memory: bool = False
+    ):
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._summaries: Dict[Tuple[str, Labels], List[float]] = {}
+        self._profiles = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        Adds a value to a counter.
+
+        Args:
+            name (str): The metric name.
+            value (float, optional): The increment. Defaults to 1.
+            **labels (Any): The label values.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        key = (name, _labels(labels))
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_max(self, name: str, value: float, **labels: Any) -> None:
+        """
+        Raises a gauge to a value if it is higher.
+
+        Args:
+            name (str): The metric name.
+            value (float): The observed value.
+            **labels (Any): The label values.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        key = (name, _labels(labels))
+
+        with self._lock:
+            self._gauges[key] = max(self._gauges.get(key, value), value)
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """
+        Adds an observation to a summary.
+
+        Args:
+            name (str): The metric name.
+            value (float): The observed value.
+            **labels (Any): The label values.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        key = (name, _labels(labels))
+
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    @contextmanager
+    def operation(self, name: str, **labels: Any) -> Iterator[None]:
+        """
+        Times a block as an operation, counting it as failed if it raises.
+
+        Args:
+            name (str): The operation name, e.g. 'load_data'.
+            **labels (Any): Additional label values.
+
+        Yields:
+            None: Control to the timed block.
+        """
+
+        labels = dict(operation=name, **labels)
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+
+        # Only the outermost operation is profiled, nested ones are part of it
+        profiler = (
+            cProfile.Profile() if self.profile_dir and not depth else None
+        )
+        trace = self.trace_memory and not depth
+        started_tracing = trace and not tracemalloc.is_tracing()
+
+        if started_tracing:
+            tracemalloc.start()
+        elif trace:
+            tracemalloc.reset_peak()
+        if profiler is not None:
+            profiler.enable()
+
+        started = time.perf_counter()
+
+        try:
+            yield
+        except BaseException:
+            self.increment("loaddata_operation_errors_total", **labels)
+            raise
+        finally:
+            self.observe(
+                "loaddata_operation_seconds",
+                time.perf_counter() - started,
+                **labels,
+            )
+            self._local.depth = depth
+
+            if profiler is not None:
+                profiler.disable()
+                self._save_profile(profiler, name)
+            if trace:
+                self.set_max(
+                    "loaddata_operation_peak_memory_bytes",
+                    tracemalloc.get_traced_memory()[1],
+                    **labels,
+                )
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def snapshot(self) -> Dict[str, Dict[Labels, Any]]:
+        """
+        Returns the current values.
+
+        Returns:
+            Dict[str, Dict[Labels, Any]]: The values of every metric by its labels; a
+            summary value is a (count, sum) pair.
+        """
+
+        values: Dict[str, Dict[Labels, Any]] = {}
+
+        with self._lock:
+            for metrics in (self._counters, self._gauges):
+                for (name, labels), value in metrics.items():
+                    values.setdefault(name, {})[labels] = value
+            for (name, labels), (count, total) in self._summaries.items():
+                values.setdefault(name, {})[labels] = (count, total)
+
+        return values
+
+    def prometheus_text(self) -> str:
+        """
+        Dumps the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+
+        lines = []
+
+        for name, values in sorted(self.snapshot().items()):
+            metric_type, description = DESCRIPTIONS.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {description}".rstrip())
+            lines.append(f"# TYPE {name} {metric_type}")
+
+            for labels, value in sorted(values.items()):
+                if metric_type == "summary":
+                    count, total = value
+                    lines.append(f"{name}_count{_format(labels)} {count}")
+                    lines.append(f"{name}_sum{_format(labels)} {total!r}")
+                else:
+                    lines.append(f"{name}{_format(labels)} {value!r}")
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def reset(self) -> None:
+        """
+        Drops every recorded value.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+    def _save_profile(self, profiler: cProfile.Profile, name: str) -> None:
+        with self._lock:
+            self._profiles += 1
+            number = self._profiles
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(
+            os.path.join(self.profile_dir, f"{name}-{number}.prof")
+        )
+
+
+# The registry used unless another one is given
+REGISTRY = MetricsRegistry()
+
+
+def timed_operation(method: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Records a method as an operation in the `metrics` registry of its instance, with
+    the number of rows of a list result.
+
+    Args:
+        method (Callable[..., Any]): The method to instrument.
+
+    Returns:
+        Callable[..., Any]: The instrumented method.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        with self.metrics.operation(method.__name__):
+            result = method(self, *args, **kwargs)
+
+        if isinstance(result, list):
+            self.metrics.increment(
+                "loaddata_rows_total", len(result), operation=method.__name__
+            )
+
+        return result
+
+    return wrapper
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ""
+
+    escaped = (
+        (
+            key,
+            value.replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for key, value in labels
+    )
+
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
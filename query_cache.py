@@ -0,0 +1,182 @@
+import inspect
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+_MISSING = object()
+
+# The caches shared by the loaders of every connection pool
+_shared_caches: "weakref.WeakKeyDictionary[Any, QueryCache]" = (
+    weakref.WeakKeyDictionary()
+)
+_shared_caches_lock = threading.Lock()
+
+
+class QueryCache:
+    """
+    A thread-safe LRU cache of query results with an optional time to live.
+
+    Entries are evicted in least-recently-used order once `max_entries` is reached,
+    and are treated as missing once they are older than `ttl` seconds. A `max_entries`
+    of 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value of a key and marks it as recently used.
+
+        Args:
+            key (Hashable): The cache key.
+            default (Any, optional): The value returned on a miss. Defaults to None.
+
+        Returns:
+            Any: The cached value, or `default` if it is missing or expired.
+        """
+
+        with self._lock:
+            expires, value = self._entries.get(key, (None, _MISSING))
+
+            if value is not _MISSING and expires is not None:
+                if self.clock() >= expires:
+                    del self._entries[key]
+                    value = _MISSING
+
+            if value is _MISSING:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Stores a value, evicting the least recently used entries when the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        if self.max_entries <= 0:
+            return
+
+        expires = None if self.ttl is None else self.clock() + self.ttl
+
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """
+        Drops every cached entry; the hit and miss counters are kept.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache counters.
+
+        Returns:
+            Dict[str, int]: The 'Hits', 'Misses' and current 'Entries' counts.
+        """
+
+        with self._lock:
+            return dict(
+                Hits=self.hits, Misses=self.misses, Entries=len(self._entries)
+            )
+
+
+def shared_query_cache(
+    owner: Any, max_entries: int = 128, ttl: Optional[float] = None
+) -> "QueryCache":
+    """
+    Returns the query cache shared by everything reading through `owner`, e.g. the
+    loaders of one connection pool, so that a load through any of them invalidates
+    the results cached by all of them. The cache is created by the first call, with
+    its `max_entries` and `ttl`, and lives as long as its owner.
+
+    Args:
+        owner (Any): The object the cache belongs to, e.g. a ConnectionPool.
+        max_entries (int, optional): The size of a new cache. Defaults to 128.
+        ttl (Optional[float], optional): The time to live of a new cache. Defaults to
+        None.
+
+    Returns:
+        QueryCache: The shared cache.
+    """
+
+    with _shared_caches_lock:
+        cache = _shared_caches.get(owner)
+        if cache is None:
+            cache = _shared_caches[owner] = QueryCache(max_entries, ttl)
+
+        return cache
+
+
+def cached_query(method: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Memoizes a query method in the `query_cache` of its instance.
+
+    The key is the method name with its bound arguments, defaults included, so
+    `query(5)`, `query(limit=5)` and `query()` with `limit=5` share an entry. Empty
+    results, which is also what a failed query returns, are not cached.
+
+    Args:
+        method (Callable[..., Any]): The query method to memoize.
+
+    Returns:
+        Callable[..., Any]: The memoized method.
+    """
+
+    signature = inspect.signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        bound_arguments = signature.bind(self, *args, **kwargs)
+        bound_arguments.apply_defaults()
+        key = (method.__name__,) + tuple(bound_arguments.arguments.items())[1:]
+
+        result = self.query_cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = method(self, *args, **kwargs)
+            if result:
+                self.query_cache.put(key, result)
+
+        return result
+
+    return wrapper
@@ -0,0 +1,180 @@
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+
+# The per-room measures a RoomQuery may select, filter and order by: the fields of
+# DataLoader.query_room_statistics, which Backend.room_measures computes from the
+# RoomStats table
+ROOM_MEASURES = (
+    "RoomID",
+    "StudentsCount",
+    "AvgAge",
+    "MinAge",
+    "MaxAge",
+    "AgeDifference",
+    "MixedSex",
+)
+
+# The comparison operators of the filters, in SQL and in Python
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq,
+    "<>": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+ASC, DESC = "ASC", "DESC"
+
+
+@dataclass(frozen=True)
+class RoomQuery:
+    """
+    A declarative report on the rooms: the measures to select, the filters they must
+    pass, the order and whether a limit applies.
+
+    The rows are grouped by room, so the measures are aggregates of the students of
+    every room (see ROOM_MEASURES). A backend compiles a query into one SQL text with
+    `?` parameters for the filter values, the date the ages are computed at and the
+    limit (see `values`), so the text does not change between calls and the server
+    reuses its plan; `evaluate` runs it on room statistics held in memory instead.
+
+    Attributes:
+        columns (Tuple[str, ...]): The selected measures.
+        filters (Tuple[Tuple[str, str, Any], ...]): The (measure, operator, value)
+        conditions a room must meet, with an operator of OPERATORS.
+        order_by (Tuple[Tuple[str, str], ...]): The (measure, ASC or DESC) sort keys.
+        limit (bool): Whether the number of rooms is capped by a limit parameter.
+    """
+
+    columns: Tuple[str, ...]
+    filters: Tuple[Tuple[str, str, Any], ...] = ()
+    order_by: Tuple[Tuple[str, str], ...] = (("RoomID", ASC),)
+    limit: bool = False
+
+    def __post_init__(self) -> None:
+        measures = [
+            *self.columns,
+            *(measure for measure, _, _ in self.filters),
+            *(measure for measure, _ in self.order_by),
+        ]
+        unknown = [
+            measure for measure in measures if measure not in ROOM_MEASURES
+        ]
+        if unknown:
+            raise ValueError(f"Unknown room measures: {', '.join(unknown)}.")
+
+        for _, comparison, _ in self.filters:
+            if comparison not in OPERATORS:
+                raise ValueError(f"Unknown operator '{comparison}'.")
+        for _, direction in self.order_by:
+            if direction not in (ASC, DESC):
+                raise ValueError(f"Unknown sort direction '{direction}'.")
+
+    def values(self, today_key: int, limit: int = 0) -> Dict[str, Any]:
+        """
+        Returns the value of every parameter a compiled query may have: 'today', the
+        date key the ages are computed at, 'limit', and 'filter0', 'filter1'... the
+        values of the filters.
+
+        Args:
+            today_key (int): Today's date as a yyyymmdd integer.
+            limit (int, optional): The number of rooms, if the query has a limit.
+            Defaults to 0.
+
+        Returns:
+            Dict[str, Any]: The values by parameter name.
+        """
+
+        values: Dict[str, Any] = dict(
+            today=today_key, limit=max(int(limit), 0)
+        )
+        for index, (_, _, value) in enumerate(self.filters):
+            values[f"filter{index}"] = value
+
+        return values
+
+    def evaluate(
+        self, rooms: Iterable[Dict[str, Any]], limit: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs the query on room statistics in the format of
+        DataLoader.query_room_statistics.
+
+        Args:
+            rooms (Iterable[Dict[str, Any]]): The statistics of every room.
+            limit (int, optional): The number of rooms, if the query has a limit.
+            Defaults to 0.
+
+        Returns:
+            List[Dict[str, Any]]: One dictionary of the selected measures per room.
+        """
+
+        result = [
+            room
+            for room in rooms
+            if all(
+                room[measure] is not None
+                and OPERATORS[comparison](room[measure], value)
+                for measure, comparison, value in self.filters
+            )
+        ]
+
+        # Stable sorts from the last key to the first; like SQL, NULLs sort low
+        for measure, direction in reversed(self.order_by):
+            result.sort(
+                key=lambda room: (
+                    room[measure] is not None,
+                    room[measure] or 0,
+                ),
+                reverse=direction == DESC,
+            )
+
+        if self.limit:
+            result = result[: max(int(limit), 0)]
+
+        return [
+            {column: room[column] for column in self.columns}
+            for room in result
+        ]
+
+
+class CompiledQuery(NamedTuple):
+    """The SQL text of a RoomQuery and the names of its parameters, in order."""
+
+    sql: str
+    parameters: Tuple[str, ...]
+
+    def bind(self, **values: Any) -> Tuple[Any, ...]:
+        """
+        Returns the parameter values in the order of the SQL text.
+
+        Args:
+            **values (Any): The value of every parameter name.
+
+        Returns:
+            Tuple[Any, ...]: The values to execute the SQL text with.
+        """
+
+        return tuple(values[name] for name in self.parameters)
+
+
+# The reports of the DataLoader query_* methods
+ROOMS_AND_STUDENTS_COUNT = RoomQuery(columns=("RoomID", "StudentsCount"))
+MIN_AVG_AGE_ROOMS = RoomQuery(
+    columns=("RoomID", "AvgAge"),
+    filters=(("StudentsCount", ">", 0),),
+    order_by=(("AvgAge", ASC), ("RoomID", ASC)),
+    limit=True,
+)
+MAX_AGE_DIFFERENCE_ROOMS = RoomQuery(
+    columns=("RoomID", "AgeDifference"),
+    filters=(("StudentsCount", ">", 0),),
+    order_by=(("AgeDifference", DESC), ("RoomID", ASC)),
+    limit=True,
+)
+GENDER_MISMATCH_ROOMS = RoomQuery(
+    columns=("RoomID",), filters=(("MixedSex", "=", True),)
+)
@@ -0,0 +1,354 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from json_stream import iter_json_array
+
+
+_MAGIC = b"LDSNAP02"
+_PREFIX = struct.Struct("<8sQ")
+
+# Array typecodes of the column types: 64-bit integers, and 32-bit indexes into the
+# string table for strings
+_INT, _STRING = "q", "I"
+_COLUMN_TYPES = {int: _INT, str: _STRING}
+_PYTHON_TYPES = {_INT: int, _STRING: str}
+
+
+class SnapshotCache:
+    """
+    A cache of parsed JSON array files in a compact columnar binary format, so that an
+    unchanged input is read back without being parsed again.
+
+    A snapshot is a sequence of blocks of up to 8192 records, written while the file is
+    parsed, so that neither writing nor reading holds more than one block in memory.
+    A block holds one column per record field, as an array of 64-bit integers or of
+    indexes into the string table of the block, which stores every distinct string
+    (names, birthdays, sexes) of the block once; an index of the blocks follows them.
+    It is memory-mapped when read. A snapshot is valid for a file with the recorded
+    size and either the recorded modification time or, when only the time changed, the
+    recorded SHA-256 hash.
+
+    Only arrays of flat objects with the same fields, whose values are all integers or
+    all strings per field, are snapshotted; other files are always parsed.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def snapshot_path(self, path: str) -> str:
+        """
+        Returns the snapshot file path of an input file.
+
+        Args:
+            path (str): The input file path.
+
+        Returns:
+            str: The snapshot file path in the cache directory.
+        """
+
+        digest = hashlib.sha1(
+            os.path.abspath(path).encode("utf-8")
+        ).hexdigest()
+
+        return os.path.join(self.directory, f"{digest}.snapshot")
+
+    def records(
+        self,
+        path: str,
+        parse: Optional[Callable[[str], Iterator[Any]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the records of a JSON array file, from its snapshot when it is valid and
+        otherwise by parsing the file, which also writes a new snapshot once every record
+        has been read.
+
+        Args:
+            path (str): The JSON file path.
+            parse (Optional[Callable[[str], Iterator[Any]]], optional): The parser of the
+            file. Defaults to None, which uses iter_json_array.
+
+        Yields:
+            Dict[str, Any]: The records, in file order.
+        """
+
+        header = self._valid_header(path)
+
+        if header is not None:
+            yield from _read_snapshot(self.snapshot_path(path), header)
+            return
+
+        stat = os.stat(path)
+        os.makedirs(self.directory, exist_ok=True)
+        writer = _SnapshotWriter(self.snapshot_path(path))
+
+        try:
+            for record in (parse or iter_json_array)(path):
+                writer.add(record)
+                yield record
+
+            writer.close(
+                dict(
+                    Path=os.path.abspath(path),
+                    Size=stat.st_size,
+                    MTime=stat.st_mtime_ns,
+                    Hash=_file_hash(path),
+                )
+            )
+        finally:
+            # A file that is not read to the end or does not fit is not snapshotted
+            writer.discard()
+
+    def _valid_header(self, path: str) -> Optional[Dict[str, Any]]:
+        snapshot_path = self.snapshot_path(path)
+
+        try:
+            header = _read_header(snapshot_path)
+        except (OSError, ValueError):
+            return None
+
+        stat = os.stat(path)
+
+        if header["Size"] != stat.st_size:
+            return None
+        if header["MTime"] != stat.st_mtime_ns:
+            # Copied or touched files keep their snapshot if the content is the same
+            if header["Hash"] != _file_hash(path):
+                return None
+
+        return header
+
+
+class _SnapshotWriter:
+    """
+    Writes the columns of streamed records to a temporary snapshot file a block at a
+    time; `valid` is False once they do not fit, and the file is then discarded.
+    """
+
+    block_size = 8192
+
+    def __init__(self, snapshot_path: str) -> None:
+        self.snapshot_path = snapshot_path
+        self.fields: Optional[Tuple[str, ...]] = None
+        self.types: List[str] = []
+        self.valid = True
+
+        self._pending: List[Tuple[Any, ...]] = []
+        # The sections of every written block
+        self._blocks: List[List[List[int]]] = []
+        self._file: Optional[BinaryIO] = None
+
+    @property
+    def _temporary_path(self) -> str:
+        return f"{self.snapshot_path}.tmp"
+
+    def add(self, record: Any) -> None:
+        if not self.valid:
+            return
+
+        if self.fields is None:
+            self._start(record)
+            if not self.valid:
+                return
+
+        if not isinstance(record, dict) or tuple(record) != self.fields:
+            self.discard()
+            return
+
+        self._pending.append(tuple(record.values()))
+        if len(self._pending) >= self.block_size:
+            self._write_block()
+
+    def _start(self, record: Any) -> None:
+        if not isinstance(record, dict) or not record:
+            self.discard()
+            return
+
+        self.fields = tuple(record)
+        self.types = [_column_type(value) for value in record.values()]
+
+        if None in self.types:
+            self.discard()
+
+    def _write_block(self) -> None:
+        """Converts the pending records to columns, a field at a time, and writes them."""
+
+        pending, self._pending = self._pending, []
+        strings: Dict[str, int] = {}
+        columns = []
+
+        try:
+            for typecode, values in zip(self.types, zip(*pending)):
+                if set(map(type, values)) != {_PYTHON_TYPES[typecode]}:
+                    raise TypeError
+                if typecode == _STRING:
+                    values = [
+                        strings.setdefault(value, len(strings))
+                        for value in values
+                    ]
+                columns.append(array(typecode, values))
+        except (TypeError, OverflowError):
+            self.discard()
+            return
+
+        encoded = [string.encode("utf-8") for string in strings]
+        string_offsets = array(_INT, [0])
+        for string in encoded:
+            string_offsets.append(string_offsets[-1] + len(string))
+
+        self._blocks.append(
+            self._write_sections([*columns, string_offsets, b"".join(encoded)])
+        )
+
+    def _write_sections(self, sections: List[Any]) -> List[List[int]]:
+        if self._file is None:
+            self._file = open(self._temporary_path, "wb")
+            self._file.write(_PREFIX.pack(_MAGIC, 0))
+
+        file = self._file
+        section_offsets = []
+
+        # Sections start at multiples of 8 bytes so that they can be cast in place
+        for section in sections:
+            file.write(b"\0" * (_align(file.tell()) - file.tell()))
+            section_offsets.append(
+                [file.tell(), file.write(memoryview(section).cast("B"))]
+            )
+
+        return section_offsets
+
+    def close(self, key: Dict[str, Any]) -> None:
+        """Writes the last block and the header, and moves the file in place."""
+
+        if self._pending:
+            self._write_block()
+        if not self.valid:
+            return
+
+        # An empty file still gets a snapshot
+        self._write_sections([])
+        file = self._file
+        assert file is not None
+
+        # The header follows the blocks, the prefix points at it
+        header_offset = file.tell()
+        file.write(
+            json.dumps(
+                dict(
+                    key,
+                    ByteOrder=sys.byteorder,
+                    Fields=self.fields,
+                    Types=self.types,
+                    Blocks=self._blocks,
+                )
+            ).encode("utf-8")
+        )
+        file.seek(0)
+        file.write(_PREFIX.pack(_MAGIC, header_offset))
+        file.close()
+        self._file = None
+
+        os.replace(self._temporary_path, self.snapshot_path)
+
+    def discard(self) -> None:
+        """Stops writing and deletes the temporary file, if the snapshot is not complete."""
+
+        self.valid = False
+        self._pending = []
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._temporary_path)
+
+
+def _column_type(value: Any) -> Optional[str]:
+    return _COLUMN_TYPES.get(type(value))
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _read_header(snapshot_path: str) -> Dict[str, Any]:
+    with open(snapshot_path, "rb") as file:
+        magic, header_offset = _PREFIX.unpack(file.read(_PREFIX.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{snapshot_path} is not a snapshot.")
+
+        file.seek(header_offset)
+        header = json.loads(file.read())
+
+    if header["ByteOrder"] != sys.byteorder:
+        raise ValueError(f"{snapshot_path} has another byte order.")
+
+    return header
+
+
+def _read_snapshot(
+    snapshot_path: str, header: Dict[str, Any]
+) -> Iterator[Dict[str, Any]]:
+    with open(snapshot_path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        fields = header["Fields"]
+        types = header["Types"]
+
+        for sections in header["Blocks"]:
+            # The mapping can only be closed once every view of it is released
+            views: List[memoryview] = [memoryview(mapped)]
+
+            def section(index: int, typecode: str) -> memoryview:
+                start, length = sections[index]
+                end = start + length
+                views.append(views[0][start:end].cast(typecode))
+                return views[-1]
+
+            try:
+                columns = [
+                    section(index, typecode)
+                    for index, typecode in enumerate(types)
+                ]
+                offsets = section(len(types), _INT).tolist()
+                data = bytes(section(len(types) + 1, "B"))
+                strings = [
+                    data[start:end].decode("utf-8")
+                    for start, end in zip(offsets, offsets[1:])
+                ]
+
+                values = [
+                    map(strings.__getitem__, column)
+                    if typecode == _STRING
+                    else column
+                    for column, typecode in zip(columns, types)
+                ]
+
+                for record_values in zip(*values):
+                    yield dict(zip(fields, record_values))
+            finally:
+                for view in reversed(views):
+                    view.release()
@@ -0,0 +1,269 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from analytics import RoomAnalytics, np
+from backends import date_key
+from main import DataLoader
+
+
+STUDENTS_FILE = os.path.join("data_files", "students.json")
+ROOMS_FILE = os.path.join("data_files", "rooms.json")
+
+
+def student(birthday, student_id, name, room_id, sex):
+    return (
+        f"{birthday.isoformat()}T00:00:00",
+        student_id,
+        name,
+        room_id,
+        sex,
+        date_key(birthday),
+    )
+
+
+def birthday_in_years(years, days=0):
+    """The date `years` before today, `days` later; a 29 February is moved to March."""
+
+    today = date.today()
+    try:
+        birthday = today.replace(year=today.year - years)
+    except ValueError:
+        birthday = date(today.year - years, 3, 1)
+
+    return birthday + timedelta(days=days)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestRoomAnalytics(unittest.TestCase):
+    def setUp(self):
+        year = date.today().year
+        self.analytics = RoomAnalytics(flush_size=2)
+
+        list(self.analytics.track_rooms([(1, "Room #1"), (2, "Room #2")]))
+        list(self.analytics.track_rooms([(3, "Room #3")]))
+        list(
+            self.analytics.track_students(
+                [
+                    student(date(year - 20, 1, 1), 0, "A", 1, "M"),
+                    # Exact ages: turns 31 tomorrow
+                    student(birthday_in_years(31, days=1), 1, "B", 1, "F"),
+                    student(date(year - 40, 1, 1), 2, "C", 2, "M"),
+                    # Repeated ID and unknown room are not counted
+                    student(date(year - 99, 1, 1), 2, "D", 2, "F"),
+                    student(date(year - 50, 1, 1), 3, "E", 9, "F"),
+                ]
+            )
+        )
+
+    def test_loaded(self):
+        self.assertTrue(self.analytics.loaded)
+        self.assertFalse(RoomAnalytics().loaded)
+
+    def test_query_room_statistics(self):
+        self.assertEqual(
+            self.analytics.query_room_statistics(),
+            [
+                {
+                    "RoomID": 1,
+                    "StudentsCount": 2,
+                    "AvgAge": 25,
+                    "MinAge": 20,
+                    "MaxAge": 30,
+                    "AgeDifference": 10,
+                    "MixedSex": True,
+                },
+                {
+                    "RoomID": 2,
+                    "StudentsCount": 1,
+                    "AvgAge": 40,
+                    "MinAge": 40,
+                    "MaxAge": 40,
+                    "AgeDifference": 0,
+                    "MixedSex": False,
+                },
+                {
+                    "RoomID": 3,
+                    "StudentsCount": 0,
+                    "AvgAge": None,
+                    "MinAge": None,
+                    "MaxAge": None,
+                    "AgeDifference": None,
+                    "MixedSex": False,
+                },
+            ],
+        )
+
+    def test_tracking_more_rows_refreshes_the_statistics(self):
+        self.analytics.query_room_statistics()
+
+        list(
+            self.analytics.track_students(
+                [student(date(date.today().year, 1, 1), 4, "F", 2, "F")]
+            )
+        )
+
+        self.assertEqual(
+            [
+                room["RoomID"]
+                for room in self.analytics.query_room_statistics()
+                if room["MixedSex"]
+            ],
+            [1, 2],
+        )
+
+    def test_last_upserted_row_wins(self):
+        year = date.today().year
+
+        list(
+            self.analytics.track_students(
+                [
+                    student(date(year - 60, 1, 1), 0, "A", 2, "M"),
+                    student(date(year - 70, 1, 1), 0, "A", 3, "F"),
+                ],
+                upsert=True,
+            )
+        )
+        # A later load without upsert does not replace the upserted row
+        list(
+            self.analytics.track_students(
+                [student(date(year - 80, 1, 1), 0, "A", 1, "M")]
+            )
+        )
+
+        self.assertEqual(
+            [
+                (room["RoomID"], room["StudentsCount"], room["MinAge"])
+                for room in self.analytics.query_room_statistics()
+            ],
+            [(1, 1, 30), (2, 1, 40), (3, 1, 70)],
+        )
+
+    def test_roll_back_discards_the_rows_tracked_since_the_savepoint(self):
+        expected = self.analytics.query_room_statistics()
+        savepoint = self.analytics.savepoint()
+
+        list(self.analytics.track_rooms([(4, "Room #4")]))
+        list(
+            self.analytics.track_students(
+                [student(date(date.today().year, 1, 1), 4, "F", 2, "F")]
+            )
+        )
+        self.analytics.roll_back(savepoint)
+
+        self.assertEqual(self.analytics.query_room_statistics(), expected)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestDataLoaderAnalytics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.data_loader = DataLoader(
+            os.path.join(cls.directory.name, "dormitory.db"),
+            backend="sqlite",
+            analytics=True,
+        )
+        cls.data_loader.create_tables()
+        cls.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+
+        # The same loader without the engine answers from the database
+        cls.sql_loader = DataLoader(
+            os.path.join(cls.directory.name, "dormitory.db"), backend="sqlite"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.data_loader.close_connection()
+        cls.sql_loader.close_connection()
+        cls.directory.cleanup()
+
+    def test_failed_load_is_not_reported(self):
+        with DataLoader(
+            os.path.join(self.directory.name, "failed.db"),
+            backend="sqlite",
+            analytics=True,
+        ) as data_loader:
+            data_loader.create_tables()
+
+            # The rooms are tracked before the missing students file fails the load
+            report = data_loader.load_data("missing.json", ROOMS_FILE)
+
+            self.assertEqual(report["Failed"], 1)
+            self.assertFalse(data_loader.analytics.loaded)
+            self.assertEqual(data_loader.query_rooms_and_students_count(), [])
+
+    def test_upsert_moving_students_matches_sql(self):
+        with open(STUDENTS_FILE) as file:
+            students = json.load(file)[:300]
+        for record in students:
+            record["room"] = 1
+            record["sex"] = "F" if record["sex"] == "M" else "M"
+        moved_students_file = os.path.join(self.directory.name, "moved.json")
+        with open(moved_students_file, "w") as file:
+            json.dump(students, file)
+
+        database = os.path.join(self.directory.name, "upsert.db")
+        with DataLoader(
+            database, backend="sqlite", analytics=True
+        ) as data_loader, DataLoader(database, backend="sqlite") as sql_loader:
+            data_loader.create_tables()
+            data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+
+            report = data_loader.load_data(
+                moved_students_file, ROOMS_FILE, upsert=True
+            )
+
+            self.assertEqual(report["Failed"], 0)
+            self.assertCountEqual(
+                data_loader.query_room_statistics(),
+                sql_loader.query_room_statistics(),
+            )
+            self.assertCountEqual(
+                data_loader.query_gender_mismatch_rooms(),
+                sql_loader.query_gender_mismatch_rooms(),
+            )
+
+    def test_queries_do_not_touch_the_database(self):
+        self.data_loader.cursor = None
+
+        try:
+            self.assertEqual(
+                len(self.data_loader.query_rooms_and_students_count()), 1000
+            )
+        finally:
+            self.data_loader.cursor = self.data_loader.connection.cursor()
+
+    def test_query_room_statistics_matches_sql(self):
+        self.assertCountEqual(
+            self.data_loader.query_room_statistics(),
+            self.sql_loader.query_room_statistics(),
+        )
+
+    def test_query_rooms_and_students_count_matches_sql(self):
+        self.assertCountEqual(
+            self.data_loader.query_rooms_and_students_count(),
+            self.sql_loader.query_rooms_and_students_count(),
+        )
+
+    def test_top_n_queries_match_sql(self):
+        for method in (
+            "query_min_avg_age_rooms",
+            "query_max_age_difference_rooms",
+        ):
+            self.assertEqual(
+                getattr(self.data_loader, method)(limit=10),
+                getattr(self.sql_loader, method)(limit=10),
+            )
+
+    def test_query_gender_mismatch_rooms_matches_sql(self):
+        self.assertCountEqual(
+            self.data_loader.query_gender_mismatch_rooms(),
+            self.sql_loader.query_gender_mismatch_rooms(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from async_loader import AsyncDataLoader
+from main import DataLoader
+
+
+STUDENTS_FILE = os.path.join("data_files", "students.json")
+ROOMS_FILE = os.path.join("data_files", "rooms.json")
+
+
+async def async_records(records, produced=None):
+    for record in records:
+        if produced is not None:
+            produced.append(record["id"])
+        yield record
+        await asyncio.sleep(0)
+
+
+class TestAsyncDataLoader(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = os.path.join(directory.name, "dormitory.db")
+
+        self.data_loader = AsyncDataLoader(
+            self.database, backend="sqlite", workers=4
+        )
+        await self.data_loader.create_tables()
+
+    async def asyncTearDown(self):
+        await self.data_loader.close()
+
+    async def test_gathered_queries_match_the_sync_loader(self):
+        await self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+
+        results = await asyncio.gather(
+            self.data_loader.query_rooms_and_students_count(),
+            self.data_loader.query_min_avg_age_rooms(),
+            self.data_loader.query_max_age_difference_rooms(limit=3),
+            self.data_loader.query_gender_mismatch_rooms(),
+        )
+
+        with DataLoader(self.database, backend="sqlite") as data_loader:
+            self.assertEqual(
+                results,
+                [
+                    data_loader.query_rooms_and_students_count(),
+                    data_loader.query_min_avg_age_rooms(),
+                    data_loader.query_max_age_difference_rooms(limit=3),
+                    data_loader.query_gender_mismatch_rooms(),
+                ],
+            )
+
+    async def test_load_data_from_async_iterables(self):
+        rooms = [
+            {"id": room_id, "name": f"Room #{room_id}"}
+            for room_id in range(10)
+        ]
+        students = [
+            {
+                "birthday": "2004-01-07T00:00:00.000000",
+                "id": student_id,
+                "name": "Peggy Ryan",
+                "room": student_id % 10,
+                "sex": "MF"[student_id % 2],
+            }
+            for student_id in range(1000)
+        ]
+        produced = []
+
+        result = await self.data_loader.load_data(
+            async_records(students, produced),
+            async_records(rooms),
+            batch_size=10,
+            max_pending_batches=1,
+        )
+
+        self.assertEqual(result["RoomsInserted"], 10)
+        self.assertEqual(result["StudentsInserted"], 1000)
+        self.assertEqual(len(produced), 1000)
+        rooms_count = await self.data_loader.query_rooms_and_students_count()
+        self.assertEqual(
+            sum(room["StudentsCount"] for room in rooms_count), 1000
+        )
+
+    async def test_producer_waits_for_the_inserts(self):
+        produced = []
+        students = [
+            {
+                "birthday": "2004-01-07T00:00:00.000000",
+                "id": student_id,
+                "name": "Peggy Ryan",
+                "room": 0,
+                "sex": "M",
+            }
+            for student_id in range(1000)
+        ]
+
+        # Rooms are loaded first: while they are blocked, the students producer may
+        # only fill its queue and the batch it is assembling
+        async def slow_rooms():
+            await asyncio.sleep(0.2)
+            yield {"id": 0, "name": "Room #0"}
+
+        load = asyncio.create_task(
+            self.data_loader.load_data(
+                async_records(students, produced),
+                slow_rooms(),
+                batch_size=10,
+                max_pending_batches=2,
+            )
+        )
+        await asyncio.sleep(0.1)
+
+        self.assertLessEqual(len(produced), 31)
+
+        result = await load
+        self.assertEqual(result["StudentsInserted"], 1000)
+
+    async def test_failing_producer_fails_the_load(self):
+        async def broken_rooms():
+            yield {"id": 0, "name": "Room #0"}
+            raise OSError("connection reset")
+
+        with self.assertLogs(level="ERROR"):
+            result = await self.data_loader.load_data(
+                async_records([]), broken_rooms()
+            )
+
+        self.assertEqual(result["RoomsInserted"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
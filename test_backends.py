@@ -0,0 +1,537 @@
+import json
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from collections import defaultdict
+from datetime import date
+
+from backends import SqliteBackend, SqlServerBackend, date_key, get_backend
+from index_advisor import IndexAdvisor
+from json_stream import iter_json_array
+from main import DataLoader, main
+
+
+STUDENTS_FILE = os.path.join("data_files", "students.json")
+ROOMS_FILE = os.path.join("data_files", "rooms.json")
+
+
+def expected_room_ages():
+    """Exact ages per room, computed in Python."""
+
+    with open(STUDENTS_FILE, "r") as file:
+        students = json.load(file)
+
+    ages = defaultdict(list)
+    sexes = defaultdict(set)
+    for student in students:
+        birthday = date.fromisoformat(student["birthday"][:10])
+        today = date.today()
+        ages[student["room"]].append(
+            today.year
+            - birthday.year
+            - ((today.month, today.day) < (birthday.month, birthday.day))
+        )
+        sexes[student["room"]].add(student["sex"])
+
+    return ages, sexes
+
+
+class TestGetBackend(unittest.TestCase):
+    def test_resolves_names_and_instances(self):
+        backend = SqliteBackend()
+
+        self.assertIsInstance(get_backend("sqlite"), SqliteBackend)
+        self.assertIsInstance(get_backend("sqlserver"), SqlServerBackend)
+        self.assertIs(get_backend(backend), backend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_backend("oracle")
+
+
+class TestSqliteBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.data_loader = DataLoader(
+            os.path.join(cls.directory.name, "dormitory.db"), backend="sqlite"
+        )
+        cls.data_loader.create_database()
+        cls.data_loader.create_tables()
+        cls.load_report = cls.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        cls.ages, cls.sexes = expected_room_ages()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.data_loader.close_connection()
+        cls.directory.cleanup()
+
+    def test_load_data(self):
+        self.assertEqual(
+            self.load_report,
+            {
+                "RoomsInserted": 1000,
+                "RoomsUpdated": 0,
+                "RoomsSkipped": 0,
+                "RoomsRejected": 0,
+                "StudentsInserted": 10000,
+                "StudentsUpdated": 0,
+                "StudentsSkipped": 0,
+                "StudentsRejected": 0,
+                "Failed": 0,
+            },
+        )
+
+    def test_load_data_skips_existing_ids(self):
+        result = self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+
+        self.assertEqual(result["StudentsInserted"], 0)
+        self.assertEqual(result["StudentsSkipped"], 10000)
+        self.assertEqual(result["RoomsSkipped"], 1000)
+
+    def test_query_rooms_and_students_count(self):
+        result = self.data_loader.query_rooms_and_students_count()
+
+        self.assertEqual(len(result), 1000)
+        self.assertEqual(
+            {row["RoomID"]: row["StudentsCount"] for row in result},
+            {
+                room_id: len(self.ages.get(room_id, []))
+                for room_id in range(1000)
+            },
+        )
+
+    def test_query_min_avg_age_rooms(self):
+        result = self.data_loader.query_min_avg_age_rooms(limit=3)
+
+        averages = sorted(
+            int(sum(ages) / len(ages)) for ages in self.ages.values()
+        )
+        self.assertEqual([row["AvgAge"] for row in result], averages[:3])
+        for row in result:
+            ages = self.ages[row["RoomID"]]
+            self.assertEqual(row["AvgAge"], int(sum(ages) / len(ages)))
+
+    def test_query_max_age_difference_rooms(self):
+        result = self.data_loader.query_max_age_difference_rooms()
+
+        differences = sorted(
+            (max(ages) - min(ages) for ages in self.ages.values()),
+            reverse=True,
+        )
+        self.assertEqual(
+            [row["AgeDifference"] for row in result], differences[:5]
+        )
+
+    def test_query_gender_mismatch_rooms(self):
+        result = self.data_loader.query_gender_mismatch_rooms()
+
+        self.assertCountEqual(
+            [row["RoomID"] for row in result],
+            [
+                room_id
+                for room_id, sexes in self.sexes.items()
+                if len(sexes) > 1
+            ],
+        )
+
+    def test_iter_room_statistics(self):
+        expected = self.data_loader.query_room_statistics()
+
+        for chunk_size in (1, 7, 1000, 5000):
+            for keyset in (True, False):
+                self.assertEqual(
+                    [
+                        room._asdict()
+                        for room in self.data_loader.iter_room_statistics(
+                            chunk_size, keyset
+                        )
+                    ],
+                    expected,
+                    msg=(chunk_size, keyset),
+                )
+
+    def test_iter_projections(self):
+        self.assertEqual(
+            [
+                room._asdict()
+                for room in self.data_loader.iter_rooms_and_students_count(
+                    chunk_size=300
+                )
+            ],
+            self.data_loader.query_rooms_and_students_count(),
+        )
+        self.assertEqual(
+            [
+                room._asdict()
+                for room in self.data_loader.iter_gender_mismatch_rooms(
+                    chunk_size=300
+                )
+            ],
+            self.data_loader.query_gender_mismatch_rooms(),
+        )
+
+    def test_optimize_queries(self):
+        self.assertEqual(
+            self.data_loader.optimize_queries(),
+            ["idx_Students_RoomID_BirthDateKey_Sex"],
+        )
+        self.data_loader.optimize_queries()
+
+        self.data_loader.cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Students'"
+        )
+        self.assertEqual(
+            {row[0] for row in self.data_loader.cursor.fetchall()},
+            {"idx_Students_RoomID_BirthDateKey_Sex"},
+        )
+
+
+class TestSqliteUpgrade(unittest.TestCase):
+    def test_birth_date_key_is_added_to_existing_tables(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dormitory.db")
+            connection = sqlite3.connect(path)
+            connection.executescript(
+                """
+                CREATE TABLE Rooms (RoomID INTEGER PRIMARY KEY, RoomName TEXT);
+                CREATE TABLE Students (
+                    Birthday TEXT, StudentID INTEGER PRIMARY KEY, Name TEXT,
+                    RoomID INT, Sex TEXT
+                );
+                INSERT INTO Rooms VALUES (1, 'Room #1');
+                INSERT INTO Students
+                VALUES ('2004-01-07T00:00:00.000000', 1, 'A', 1, 'M');
+                """
+            )
+            connection.close()
+
+            with DataLoader(path, backend="sqlite") as data_loader:
+                data_loader.create_tables()
+                data_loader.create_tables()
+
+                data_loader.cursor.execute("SELECT BirthDateKey FROM Students")
+                self.assertEqual(data_loader.cursor.fetchall(), [(20040107,)])
+
+    def test_date_key(self):
+        self.assertEqual(date_key("2004-01-07T00:00:00.000000"), 20040107)
+        self.assertEqual(date_key(date(1999, 12, 31)), 19991231)
+        with self.assertRaises(ValueError):
+            date_key("2004-13-07")
+
+
+class TestSqliteRoomStats(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.data_loader = DataLoader(
+            os.path.join(self.directory, "dormitory.db"), backend="sqlite"
+        )
+        self.addCleanup(self.data_loader.close_connection)
+        self.data_loader.create_tables()
+
+    def _room_stats(self):
+        self.data_loader.cursor.execute(
+            "SELECT * FROM RoomStats ORDER BY RoomID"
+        )
+        return self.data_loader.cursor.fetchall()
+
+    def test_incremental_load_matches_rebuild(self):
+        with open(STUDENTS_FILE, "r") as file:
+            students = json.load(file)
+        self.data_loader.load_data(students[:5000], ROOMS_FILE)
+        self.data_loader.optimize_queries()
+
+        # Batches of an indexed table refresh the rooms they touch, moved students
+        # their old rooms too
+        for student in students[:100]:
+            student["room"] = (student["room"] + 1) % 1000
+        self.data_loader.load_data(
+            students, ROOMS_FILE, batch_size=700, upsert=True
+        )
+
+        self.assertEqual(self.data_loader.check_room_stats(), [])
+        incremental = self._room_stats()
+        self.assertEqual(self.data_loader.rebuild_room_stats(), 1000)
+        self.assertEqual(self._room_stats(), incremental)
+
+    def test_check_finds_differences_and_rebuild_repairs_them(self):
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        self.data_loader.cursor.execute(
+            "UPDATE RoomStats SET MaleCount = MaleCount + 1 WHERE RoomID = 1"
+        )
+        self.data_loader.cursor.execute(
+            "DELETE FROM RoomStats WHERE RoomID = 2"
+        )
+
+        differences = self.data_loader.check_room_stats()
+
+        self.assertEqual(
+            [(row["RoomID"], row["Column"]) for row in differences],
+            [(1, "MaleCount"), (2, "RoomID")],
+        )
+        self.assertEqual(
+            differences[0]["Stored"], differences[0]["Actual"] + 1
+        )
+
+        self.data_loader.rebuild_room_stats()
+
+        self.assertEqual(self.data_loader.check_room_stats(), [])
+
+    def test_ages_computed_at_another_date_are_refreshed(self):
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        self.data_loader.cursor.execute(
+            "UPDATE RoomStats SET AgeSum = 0, AgeDateKey = AgeDateKey - 1"
+        )
+        self.data_loader.connection.commit()
+
+        # Age sums computed at another date are not compared
+        self.assertEqual(self.data_loader.check_room_stats(), [])
+
+        ages, _ = expected_room_ages()
+        self.assertEqual(
+            {
+                row["RoomID"]: row["AvgAge"]
+                for row in self.data_loader.query_min_avg_age_rooms(limit=1000)
+            },
+            {
+                room_id: sum(room_ages) // len(room_ages)
+                for room_id, room_ages in ages.items()
+            },
+        )
+        self.assertEqual(
+            {row[-2] for row in self._room_stats()},
+            {date_key(date.today())},
+        )
+
+    def test_streamed_ages_are_refreshed(self):
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        expected = self.data_loader.query_room_statistics()
+        self.data_loader.cursor.execute(
+            "UPDATE RoomStats SET AgeSum = 0, AgeDateKey = AgeDateKey - 1"
+        )
+        self.data_loader.connection.commit()
+
+        self.assertEqual(
+            [
+                room._asdict()
+                for room in self.data_loader.iter_room_statistics()
+            ],
+            expected,
+        )
+
+    def test_command_line_check_and_rebuild(self):
+        path = os.path.join(self.directory, "dormitory.db")
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        self.data_loader.cursor.execute("UPDATE RoomStats SET Stale = 1")
+        self.data_loader.connection.commit()
+
+        def run(*arguments):
+            return main(
+                [
+                    "--backend",
+                    "sqlite",
+                    "--connection-string",
+                    path,
+                    "--no-load",
+                    "--query",
+                    "gender_mismatch_rooms",
+                    "--output",
+                    os.path.join(self.directory, "result.json"),
+                    *arguments,
+                ]
+            )
+
+        self.assertEqual(run("--check-room-stats"), 1)
+        self.assertEqual(run("--rebuild-room-stats", "--check-room-stats"), 0)
+        self.assertEqual(self.data_loader.check_room_stats(), [])
+
+
+class TestSqliteParallelLoad(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.data_loader = DataLoader(
+            os.path.join(self.directory, "dormitory.db"), backend="sqlite"
+        )
+        self.addCleanup(self.data_loader.close_connection)
+        self.data_loader.create_tables()
+
+    def _student_ids(self):
+        self.data_loader.cursor.execute("SELECT StudentID FROM Students")
+        return {row[0] for row in self.data_loader.cursor.fetchall()}
+
+    def test_parallel_load_matches_serial_load(self):
+        result = self.data_loader.load_data(
+            STUDENTS_FILE, ROOMS_FILE, batch_size=700, workers=4
+        )
+
+        self.assertEqual(result["RoomsInserted"], 1000)
+        self.assertEqual(result["StudentsInserted"], 10000)
+        self.assertEqual(self._student_ids(), set(range(10000)))
+
+        ages, _ = expected_room_ages()
+        self.assertEqual(
+            {
+                row["RoomID"]: row["StudentsCount"]
+                for row in self.data_loader.query_rooms_and_students_count()
+            },
+            {room_id: len(ages.get(room_id, [])) for room_id in range(1000)},
+        )
+
+    def test_parallel_parse_matches_serial_load(self):
+        result = self.data_loader.load_data(
+            STUDENTS_FILE, ROOMS_FILE, parse_processes=2
+        )
+
+        self.assertEqual(result["RoomsInserted"], 1000)
+        self.assertEqual(result["StudentsInserted"], 10000)
+        self.assertEqual(self.data_loader.check_room_stats(), [])
+
+    def test_failed_partition_is_rolled_back(self):
+        students = os.path.join(self.directory, "students.json")
+        with open(students, "w") as file:
+            json.dump(
+                [
+                    {
+                        "birthday": "2004-01-07T00:00:00.000000",
+                        "id": student_id,
+                        "name": "Peggy Ryan",
+                        # Student 3 lives in a room that does not exist
+                        "room": 5000 if student_id == 3 else 1,
+                        "sex": "F",
+                    }
+                    for student_id in range(4)
+                ],
+                file,
+            )
+
+        result = self.data_loader.load_data(
+            students, ROOMS_FILE, batch_size=2, workers=2, validate=False
+        )
+
+        # The partition of students 2 and 3 is rolled back as a whole
+        self.assertEqual(self._student_ids(), {0, 1})
+        self.assertEqual(result["RoomsInserted"], 1000)
+
+
+# Loads the students in chunks of 1000 rows and kills its own process while it reads
+# the 2501st student
+KILLED_LOAD = """
+import os
+import signal
+import sys
+
+from json_stream import iter_json_array
+from main import DataLoader
+
+
+def students():
+    for index, student in enumerate(iter_json_array(sys.argv[3])):
+        if index == 2500:
+            os.kill(os.getpid(), signal.SIGKILL)
+        yield student
+
+
+data_loader = DataLoader(sys.argv[1], backend="sqlite")
+data_loader.create_tables()
+data_loader.optimize_queries()
+data_loader.load_data(
+    students(),
+    sys.argv[4],
+    batch_size=100,
+    drop_indexes=True,
+    chunk_size=1000,
+    checkpoint=sys.argv[2],
+)
+"""
+
+
+class TestSqliteResumableLoad(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = os.path.join(directory.name, "dormitory.db")
+        self.checkpoint = os.path.join(directory.name, "checkpoint.json")
+
+    @unittest.skipUnless(hasattr(signal, "SIGKILL"), "requires SIGKILL")
+    def test_killed_load_resumes_from_checkpoint(self):
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                KILLED_LOAD,
+                self.database,
+                self.checkpoint,
+                STUDENTS_FILE,
+                ROOMS_FILE,
+            ],
+            capture_output=True,
+        )
+        self.assertEqual(process.returncode, -signal.SIGKILL, process.stderr)
+
+        with open(self.checkpoint, "r") as file:
+            state = json.load(file)
+        self.assertEqual(state["Inputs"]["Rooms"]["Rows"], 1000)
+        self.assertEqual(state["Inputs"]["Students"]["Rows"], 2000)
+
+        with DataLoader(self.database, backend="sqlite") as data_loader:
+            # The committed chunks survived the kill, the indexes did not
+            data_loader.cursor.execute("SELECT COUNT(*) FROM Students")
+            self.assertEqual(data_loader.cursor.fetchone()[0], 2000)
+            self.assertEqual(IndexAdvisor(data_loader).existing_indexes(), [])
+
+            result = data_loader.load_data(
+                iter_json_array(STUDENTS_FILE),
+                ROOMS_FILE,
+                batch_size=100,
+                chunk_size=1000,
+                checkpoint=self.checkpoint,
+            )
+
+            self.assertEqual(result["RoomsInserted"], 0)
+            self.assertEqual(result["RoomsSkipped"], 1000)
+            self.assertEqual(result["StudentsInserted"], 8000)
+            self.assertEqual(result["StudentsSkipped"], 2000)
+
+            data_loader.cursor.execute("SELECT StudentID FROM Students")
+            self.assertEqual(
+                {row[0] for row in data_loader.cursor.fetchall()},
+                set(range(10000)),
+            )
+            self.assertEqual(data_loader.check_room_stats(), [])
+            self.assertEqual(
+                IndexAdvisor(data_loader).existing_indexes(),
+                list(data_loader.backend.default_indexes),
+            )
+            self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_chunked_load_matches_single_transaction(self):
+        with DataLoader(self.database, backend="sqlite") as data_loader:
+            data_loader.create_tables()
+
+            result = data_loader.load_data(
+                STUDENTS_FILE,
+                ROOMS_FILE,
+                batch_size=300,
+                chunk_size=1000,
+                checkpoint=self.checkpoint,
+            )
+
+            self.assertEqual(result["RoomsInserted"], 1000)
+            self.assertEqual(result["StudentsInserted"], 10000)
+            self.assertEqual(result["StudentsSkipped"], 0)
+            self.assertEqual(data_loader.check_room_stats(), [])
+            self.assertFalse(os.path.exists(self.checkpoint))
+
+
+if __name__ == "__main__":
+    unittest.main()
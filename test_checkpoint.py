@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from checkpoint import LoadCheckpoint
+
+
+class TestLoadCheckpoint(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.data_path = os.path.join(self.directory, "data.json")
+        with open(self.data_path, "w") as file:
+            file.write("[]")
+        self.checkpoint_path = os.path.join(self.directory, "checkpoint.json")
+
+    def test_recorded_rows_are_read_back(self):
+        checkpoint = LoadCheckpoint(self.checkpoint_path)
+        checkpoint.dropped_indexes = ["idx_Students_RoomID"]
+        checkpoint.record("Data", self.data_path, 2000)
+        checkpoint.record("Records", [], 300)
+
+        resumed = LoadCheckpoint(self.checkpoint_path)
+
+        self.assertEqual(resumed.committed_rows("Data", self.data_path), 2000)
+        self.assertEqual(resumed.committed_rows("Records", []), 300)
+        self.assertEqual(resumed.committed_rows("Other", []), 0)
+        self.assertEqual(resumed.dropped_indexes, ["idx_Students_RoomID"])
+
+    def test_changed_file_is_loaded_in_full(self):
+        LoadCheckpoint(self.checkpoint_path).record(
+            "Data", self.data_path, 2000
+        )
+        with open(self.data_path, "w") as file:
+            file.write("[{}]")
+
+        checkpoint = LoadCheckpoint(self.checkpoint_path)
+
+        self.assertEqual(checkpoint.committed_rows("Data", self.data_path), 0)
+
+    def test_clear_deletes_the_file(self):
+        checkpoint = LoadCheckpoint(self.checkpoint_path)
+        checkpoint.record("Data", self.data_path, 2000)
+
+        checkpoint.clear()
+
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+        self.assertEqual(checkpoint.committed_rows("Data", self.data_path), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import closing
+
+from benchmarks.import_time import LAZY_MODULES
+from main import QUERIES, main
+
+
+STUDENTS_FILE = os.path.join("data_files", "students.json")
+ROOMS_FILE = os.path.join("data_files", "rooms.json")
+
+
+class TestCommandLine(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.database = os.path.join(self.directory, "dormitory.db")
+
+    def _main(self, *arguments):
+        return main(
+            [
+                "--backend",
+                "sqlite",
+                "--connection-string",
+                self.database,
+                "--students",
+                STUDENTS_FILE,
+                "--rooms",
+                ROOMS_FILE,
+                *arguments,
+            ]
+        )
+
+    def _read_json(self, path):
+        with open(path, "r") as file:
+            return json.load(file)
+
+    def test_single_query(self):
+        path = os.path.join(self.directory, "top.json")
+
+        status = self._main(
+            "--query", "min_avg_age_rooms", "--limit", "3", "--output", path
+        )
+
+        self.assertEqual(status, 0)
+        rooms = self._read_json(path)
+        self.assertEqual(len(rooms), 3)
+        self.assertEqual(
+            [room["AvgAge"] for room in rooms],
+            sorted(room["AvgAge"] for room in rooms),
+        )
+
+    def test_all_queries_are_written_to_the_output_directory(self):
+        output = os.path.join(self.directory, "results")
+
+        status = self._main("--format", "ndjson", "--output", output)
+
+        self.assertEqual(status, 0)
+        for query in QUERIES:
+            self.assertTrue(
+                os.path.exists(os.path.join(output, f"{query}.ndjson"))
+            )
+
+    def test_failed_load_exits_with_status_1(self):
+        status = self._main(
+            "--students",
+            os.path.join(self.directory, "missing.json"),
+            "--output",
+            self.directory,
+        )
+
+        self.assertEqual(status, 1)
+        for query in QUERIES:
+            self.assertFalse(
+                os.path.exists(os.path.join(self.directory, f"{query}.json"))
+            )
+
+    def test_concurrent_jobs_match_sequential_queries(self):
+        sequential = os.path.join(self.directory, "sequential")
+        concurrent = os.path.join(self.directory, "concurrent")
+        os.mkdir(sequential)
+        os.mkdir(concurrent)
+
+        self._main("--output", sequential)
+        self._main("--no-load", "--jobs", "4", "--output", concurrent)
+
+        for query in QUERIES:
+            self.assertEqual(
+                self._read_json(os.path.join(concurrent, f"{query}.json")),
+                self._read_json(os.path.join(sequential, f"{query}.json")),
+            )
+
+    def test_streamed_queries_match_built_results(self):
+        built = os.path.join(self.directory, "built")
+        streamed = os.path.join(self.directory, "streamed")
+        os.mkdir(built)
+        os.mkdir(streamed)
+
+        self._main("--output", built)
+        self._main("--no-load", "--stream", "--output", streamed)
+
+        for query in QUERIES:
+            self.assertEqual(
+                self._read_json(os.path.join(streamed, f"{query}.json")),
+                self._read_json(os.path.join(built, f"{query}.json")),
+            )
+
+    def test_upsert_updates_changed_rows(self):
+        rooms = os.path.join(self.directory, "rooms.json")
+
+        for name, arguments in (("Room #0", ()), ("Room #00", ("--upsert",))):
+            with open(rooms, "w") as file:
+                json.dump([dict(id=0, name=name)], file)
+            self.assertEqual(
+                self._main(
+                    "--rooms", rooms, "--output", self.directory, *arguments
+                ),
+                0,
+            )
+
+        with closing(sqlite3.connect(self.database)) as connection:
+            self.assertEqual(
+                connection.execute("SELECT RoomName FROM Rooms").fetchall(),
+                [("Room #00",)],
+            )
+
+    def test_unknown_query_is_rejected(self):
+        with self.assertRaises(SystemExit):
+            self._main("--query", "everything")
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_does_not_load_lazy_modules(self):
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, main; print(' '.join(sys.modules))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        modules = process.stdout.split()
+
+        for lazy in LAZY_MODULES:
+            self.assertNotIn(lazy, modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from connection_pool import ConnectionPool
+from main import DataLoader
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = os.path.join(directory.name, "dormitory.db")
+
+        self.clock = FakeClock()
+        self.pool = ConnectionPool(
+            self.database,
+            backend="sqlite",
+            max_size=2,
+            idle_timeout=60,
+            clock=self.clock,
+        )
+        self.addCleanup(self.pool.close)
+
+    def test_released_connection_is_reused(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+
+        self.assertIs(self.pool.acquire(), pooled)
+        self.assertEqual(
+            self.pool.stats(),
+            dict(Opened=1, Reused=1, Discarded=0, Idle=0, InUse=1),
+        )
+
+    def test_acquire_waits_for_a_free_connection(self):
+        first = self.pool.acquire()
+        self.pool.acquire()
+
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire(timeout=0.01)
+
+        threading.Timer(0.05, self.pool.release, [first]).start()
+
+        self.assertIs(self.pool.acquire(timeout=5), first)
+
+    def test_idle_connections_expire(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        self.clock.now = 61
+
+        self.assertIsNot(self.pool.acquire(), pooled)
+        self.assertEqual(self.pool.stats()["Discarded"], 1)
+
+    def test_broken_connection_fails_the_health_check(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        pooled.connection.close()
+        self.clock.now = 31
+
+        replacement = self.pool.acquire()
+
+        self.assertIsNot(replacement, pooled)
+        replacement.cursor.execute("SELECT 1")
+
+    def test_recently_returned_connection_is_not_pinged(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        # The ping would fail on the closed connection
+        pooled.connection.close()
+        self.clock.now = 30
+
+        self.assertIs(self.pool.acquire(), pooled)
+
+    def test_uncommitted_changes_are_rolled_back_on_release(self):
+        pooled = self.pool.acquire()
+        pooled.cursor.execute("CREATE TABLE Data (Value INT)")
+        pooled.connection.commit()
+        pooled.cursor.execute("INSERT INTO Data VALUES (1)")
+        self.pool.release(pooled)
+
+        pooled = self.pool.acquire()
+        pooled.cursor.execute("SELECT COUNT(*) FROM Data")
+
+        self.assertEqual(pooled.cursor.fetchone()[0], 0)
+
+    def test_statement_cursors_are_reused_per_text(self):
+        pooled = self.pool.acquire()
+        pooled.max_statements = 2
+
+        first = pooled.statement("SELECT 1")
+        self.assertIs(pooled.statement("SELECT 1"), first)
+        self.assertIsNot(pooled.statement("SELECT 2"), first)
+
+        pooled.statement("SELECT 3")
+
+        self.assertIsNot(pooled.statement("SELECT 1"), first)
+
+    def test_closed_pool_rejects_borrowers(self):
+        pooled = self.pool.acquire()
+        self.pool.close()
+
+        with self.assertRaises(RuntimeError):
+            self.pool.acquire()
+
+        self.pool.release(pooled)
+        self.assertEqual(self.pool.stats()["Idle"], 0)
+
+
+class TestDataLoaderPool(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.pool = ConnectionPool(
+            os.path.join(directory.name, "dormitory.db"), backend="sqlite"
+        )
+        self.addCleanup(self.pool.close)
+
+    def test_loaders_share_the_pooled_connection(self):
+        with DataLoader(pool=self.pool) as data_loader:
+            data_loader.create_tables()
+            connection = data_loader.connection
+
+        self.assertIsNone(data_loader.connection)
+
+        with DataLoader(pool=self.pool) as data_loader:
+            self.assertIs(data_loader.connection, connection)
+            self.assertEqual(data_loader.query_rooms_and_students_count(), [])
+
+        self.assertEqual(self.pool.stats()["Opened"], 1)
+
+    def test_a_load_through_another_loader_invalidates_the_cache(self):
+        with DataLoader(pool=self.pool) as data_loader:
+            data_loader.create_tables()
+            data_loader.load_data([], [dict(id=1, name="Room #1")])
+            counts = data_loader.query_rooms_and_students_count()
+            query_cache = data_loader.query_cache
+
+        with DataLoader(pool=self.pool) as data_loader:
+            self.assertIs(data_loader.query_cache, query_cache)
+            data_loader.load_data(
+                [
+                    dict(
+                        birthday="2004-01-07T00:00:00.000000",
+                        id=1,
+                        name="Christian Bush",
+                        room=1,
+                        sex="M",
+                    )
+                ],
+                [],
+            )
+
+        with DataLoader(pool=self.pool) as data_loader:
+            self.assertEqual(counts, [{"RoomID": 1, "StudentsCount": 0}])
+            self.assertEqual(
+                data_loader.query_rooms_and_students_count(),
+                [{"RoomID": 1, "StudentsCount": 1}],
+            )
+
+    def test_connection_string_or_pool_is_required(self):
+        with self.assertRaises(ValueError):
+            DataLoader()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,53 @@
+import csv
+import json
+import os
+import tempfile
 import unittest
+import xml.etree.ElementTree as ET
+from datetime import date
 from unittest.mock import MagicMock, patch
 
+from backends import date_key
 from config import database, server
-from main import DataLoader
+from main import (
+    EXPORT_WRITERS,
+    DataLoader,
+    DocumentWriter,
+    RoomStatistics,
+    RoomStudentsCount,
+    register_writer,
+)
+from room_queries import (
+    GENDER_MISMATCH_ROOMS,
+    MAX_AGE_DIFFERENCE_ROOMS,
+    MIN_AVG_AGE_ROOMS,
+    ROOMS_AND_STUDENTS_COUNT,
+)
+
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+
+TODAY_KEY = date_key(date.today())
+
+
+def room_stats(room_id, count, avg_age, min_age, max_age, mixed_sex):
+    if not count:
+        return (room_id, 0, 0, None, None, 0, 0, TODAY_KEY)
+
+    return (
+        room_id,
+        count,
+        avg_age * count,
+        TODAY_KEY - max_age * 10000,
+        TODAY_KEY - min_age * 10000,
+        1 if mixed_sex else count,
+        count - 1 if mixed_sex else 0,
+        TODAY_KEY,
+    )
 
 
 class TestDataLoaderClass(unittest.TestCase):
@@ -16,9 +61,11 @@ class TestDataLoaderClass(unittest.TestCase):
         self.mock_db = MagicMock(name="database")
         self.mock_db.connection = self.mock_connection
 
-        # Patch pyodbc.connect so that it returns our connection layout
+        # Patch the SQL Server connect so that it returns our connection
+        # layout, without importing pyodbc and its ODBC driver manager
         self.patcher = patch(
-            "pyodbc.connect", return_value=self.mock_connection
+            "backends.SqlServerBackend.connect",
+            return_value=self.mock_connection,
         )
         self.patcher.start()
 
@@ -30,24 +77,315 @@ class TestDataLoaderClass(unittest.TestCase):
         # Stop the patcher after running the tests
         self.patcher.stop()
 
+    def _write_json(self, data):
+        file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+        with file:
+            json.dump(data, file)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_load_data_batches_and_reports_counts(self):
+        rooms = self._write_json(
+            [{"id": 0, "name": "Room #0"}, {"id": 1, "name": "Room #1"}]
+        )
+        students = self._write_json(
+            [
+                {
+                    "birthday": "2004-01-07T00:00:00.000000",
+                    "id": student_id,
+                    "name": "Peggy Ryan",
+                    "room": student_id % 2,
+                    "sex": "M",
+                }
+                for student_id in (0, 1, 2, 2, 3)
+            ]
+        )
+
+        # Rooms: one batch of 2 rows, 1 new. Students: the repeated ID is rejected,
+        # then batches of 2 and 2 rows
+        rowcounts = iter([1, 2, 1])
+
+        def execute(query, *params):
+            if "NOT EXISTS" in query:
+                self.mock_cursor.rowcount = next(rowcounts)
+
+        self.mock_cursor.execute.side_effect = execute
+
+        result = self.test_class.load_data(students, rooms, batch_size=2)
+
+        self.assertEqual(
+            result,
+            {
+                "RoomsInserted": 1,
+                "RoomsUpdated": 0,
+                "RoomsSkipped": 1,
+                "RoomsRejected": 0,
+                "StudentsInserted": 3,
+                "StudentsUpdated": 0,
+                "StudentsSkipped": 1,
+                "StudentsRejected": 1,
+                "Failed": 0,
+            },
+        )
+
+        # The duplicate ID never reaches the server
+        staged_batches = [
+            call.args[1]
+            for call in self.mock_cursor.executemany.call_args_list
+        ]
+        self.assertEqual([len(batch) for batch in staged_batches], [2, 2, 2])
+        self.mock_connection.commit.assert_called_once()
+
+    def _write_room_and_students(self, count):
+        rooms = self._write_json([{"id": 0, "name": "Room #0"}])
+        students = self._write_json(
+            [
+                {
+                    "birthday": "2004-01-07T00:00:00.000000",
+                    "id": student_id,
+                    "name": "Peggy Ryan",
+                    "room": 0,
+                    "sex": "F",
+                }
+                for student_id in range(count)
+            ]
+        )
+        return students, rooms
+
+    def test_load_data_retries_a_chunk_after_a_transient_error(self):
+        students, rooms = self._write_room_and_students(4)
+        deadlocks = [Exception("40001", "Transaction was deadlocked")]
+
+        def execute(query, *params):
+            if "INSERT INTO Students" in query and deadlocks:
+                raise deadlocks.pop()
+            if "NOT EXISTS" in query:
+                self.mock_cursor.rowcount = 2 if "Students" in query else 1
+
+        self.mock_cursor.execute.side_effect = execute
+
+        with patch("main.time.sleep") as sleep:
+            result = self.test_class.load_data(
+                students, rooms, batch_size=2, chunk_size=2, retry_delay=0.25
+            )
+
+        self.assertEqual(result["StudentsInserted"], 4)
+        self.assertEqual(result["StudentsSkipped"], 0)
+        sleep.assert_called_once_with(0.25)
+        self.mock_connection.rollback.assert_called_once()
+
+        # The first chunk of students is staged again
+        self.assertEqual(self.mock_cursor.executemany.call_count, 4)
+        # A chunk of rooms, two chunks of students and the RoomStats rebuild
+        self.assertEqual(self.mock_connection.commit.call_count, 4)
+
+    def test_load_data_keeps_the_checkpoint_of_a_failed_load(self):
+        students, rooms = self._write_room_and_students(6)
+        checkpoint = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+        self.addCleanup(os.rmdir, os.path.dirname(checkpoint))
+        self.addCleanup(os.remove, checkpoint)
+        merges = iter(range(3))
+
+        def execute(query, *params):
+            # The second chunk of students violates a constraint
+            if "INSERT INTO Students" in query and next(merges) == 1:
+                raise Exception("23000", "Violation of a constraint")
+            if "NOT EXISTS" in query:
+                self.mock_cursor.rowcount = 2 if "Students" in query else 1
+
+        self.mock_cursor.execute.side_effect = execute
+
+        with patch("main.time.sleep") as sleep:
+            result = self.test_class.load_data(
+                students,
+                rooms,
+                batch_size=2,
+                chunk_size=2,
+                checkpoint=checkpoint,
+            )
+
+        sleep.assert_not_called()
+        self.mock_connection.rollback.assert_called_once()
+        # The rooms were committed before the failure
+        self.assertEqual(result["Failed"], 1)
+        self.assertEqual(result["RoomsInserted"], 1)
+
+        with open(checkpoint, "r") as file:
+            inputs = json.load(file)["Inputs"]
+        self.assertEqual(inputs["Rooms"]["Rows"], 1)
+        self.assertEqual(inputs["Students"]["Rows"], 2)
+
+    def test_load_data_exception(self):
+        self.mock_cursor.execute.side_effect = Exception("Test Exception")
+
+        result = self.test_class.load_data("students.json", "rooms.json")
+
+        self.assertEqual(result["StudentsInserted"], 0)
+        self.mock_connection.commit.assert_not_called()
+
+    def test_failed_load_reports_no_rolled_back_rows(self):
+        students, rooms = self._write_room_and_students(4)
+
+        def execute(query, *params):
+            if "INSERT INTO Students" in query:
+                raise Exception("23000", "Violation of a constraint")
+            if "NOT EXISTS" in query:
+                self.mock_cursor.rowcount = 1
+
+        self.mock_cursor.execute.side_effect = execute
+
+        result = self.test_class.load_data(students, rooms, batch_size=2)
+
+        self.mock_connection.rollback.assert_called_once()
+        self.assertEqual(result["Failed"], 1)
+        self.assertEqual(result["RoomsInserted"], 0)
+        self.assertEqual(result["StudentsInserted"], 0)
+
+    # RoomStats rows computed today from RoomID, StudentsCount, AvgAge, MinAge,
+    # MaxAge, MixedSex
+    room_statistics_rows = [
+        room_stats(1, 5, 25, 20, 30, True),
+        room_stats(2, 3, 27, 23, 31, False),
+        room_stats(3, 4, 22, 15, 30, True),
+        room_stats(4, 2, 26, 20, 32, False),
+        room_stats(5, 6, 24, 21, 28, True),
+        room_stats(6, 0, None, None, None, False),
+    ]
+
+    def test_query_room_statistics_success(self):
+        self.mock_cursor.fetchall.return_value = self.room_statistics_rows
+
+        result = self.test_class.query_room_statistics()
+
+        self.mock_cursor.execute.assert_called_once_with(unittest.mock.ANY)
+
+        self.assertEqual(len(result), 6)
+        self.assertEqual(
+            result[0],
+            {
+                "RoomID": 1,
+                "StudentsCount": 5,
+                "AvgAge": 25,
+                "MinAge": 20,
+                "MaxAge": 30,
+                "AgeDifference": 10,
+                "MixedSex": True,
+            },
+        )
+        self.assertIsNone(result[5]["AgeDifference"])
+
+    def test_reports_reuse_one_statement_text(self):
+        self.mock_cursor.fetchone.return_value = None
+        self.mock_cursor.fetchall.return_value = [(3, 15), (4, 12)]
+
+        self.test_class.query_max_age_difference_rooms(limit=2)
+        self.test_class.query_max_age_difference_rooms(limit=7)
+
+        # The ages are checked once a day, the limit is a parameter
+        (check, _), first, second = self.mock_cursor.execute.call_args_list
+        self.assertIn("AgeDateKey <>", check[0])
+        self.assertEqual(first.args[0], second.args[0])
+        self.assertNotIn("7", second.args[0])
+        self.assertEqual((first.args[1][0], second.args[1][0]), (2, 7))
+
+    def test_load_data_invalidates_room_statistics(self):
+        self.mock_cursor.fetchall.return_value = self.room_statistics_rows
+        self.test_class.query_room_statistics()
+
+        self.test_class.load_data("students.json", "rooms.json")
+        self.mock_cursor.execute.reset_mock()
+        self.test_class.query_room_statistics()
+
+        self.mock_cursor.execute.assert_called_once_with(unittest.mock.ANY)
+
+    def test_load_data_without_new_rows_keeps_cached_results(self):
+        self.mock_cursor.fetchone.return_value = None
+        self.mock_cursor.fetchall.return_value = [(3, 22)]
+        self.test_class.query_min_avg_age_rooms()
+
+        with patch("main.iter_json_array", return_value=iter([])):
+            self.test_class.load_data("students.json", "rooms.json")
+        self.test_class.query_min_avg_age_rooms()
+
+        self.assertEqual(
+            self.test_class.query_cache.stats(),
+            {"Hits": 1, "Misses": 1, "Entries": 1},
+        )
+
+    def test_query_room_statistics_exception(self):
+        self.mock_cursor.execute.side_effect = Exception("Test Exception")
+
+        self.assertEqual(self.test_class.query_room_statistics(), [])
+
+        # Failures are not cached
+        self.mock_cursor.execute.side_effect = None
+        self.mock_cursor.fetchall.return_value = self.room_statistics_rows
+
+        self.assertEqual(len(self.test_class.query_room_statistics()), 6)
+
+    def test_iter_room_statistics_pages_on_room_id(self):
+        self.mock_cursor.fetchone.return_value = None
+        self.mock_cursor.fetchall.side_effect = [
+            self.room_statistics_rows[:2],
+            self.room_statistics_rows[2:4],
+            [],
+        ]
+
+        result = list(self.test_class.iter_rooms_and_students_count(2))
+
+        self.assertEqual(
+            result,
+            [
+                RoomStudentsCount(1, 5),
+                RoomStudentsCount(2, 3),
+                RoomStudentsCount(3, 4),
+                RoomStudentsCount(4, 2),
+            ],
+        )
+        backend = self.test_class.backend
+        self.assertEqual(
+            self.mock_cursor.execute.call_args_list[1:],
+            [
+                unittest.mock.call(
+                    backend.room_stats_page_query(2, first=True), ()
+                ),
+                unittest.mock.call(backend.room_stats_page_query(2), (2,)),
+                unittest.mock.call(backend.room_stats_page_query(2), (4,)),
+            ],
+        )
+
+    def test_iter_room_statistics_exception(self):
+        self.mock_cursor.execute.side_effect = Exception("Test Exception")
+
+        with self.assertRaises(Exception):
+            list(self.test_class.iter_room_statistics())
+
     def test_query_rooms_and_students_count_success(self):
-        query_result_data = [(1, 5), (2, 3)]
         expected_result = [
             {"RoomID": 1, "StudentsCount": 5},
             {"RoomID": 2, "StudentsCount": 3},
+            {"RoomID": 3, "StudentsCount": 4},
+            {"RoomID": 4, "StudentsCount": 2},
+            {"RoomID": 5, "StudentsCount": 6},
+            {"RoomID": 6, "StudentsCount": 0},
         ]
 
         # Setting return values for execute and fetchall
+        self.mock_cursor.fetchone.return_value = None
         self.mock_cursor.fetchall.return_value = [
-            (room_id, students_count)
-            for room_id, students_count in query_result_data
+            (room["RoomID"], room["StudentsCount"]) for room in expected_result
         ]
 
         # Calling the method we are testing
         result = self.test_class.query_rooms_and_students_count()
 
-        # Checking that execute was called with the correct SQL query (ignoring indentation formatting)
-        self.mock_cursor.execute.assert_called_once_with(unittest.mock.ANY)
+        # Checking that execute was called with the compiled report
+        self.mock_cursor.execute.assert_called_with(
+            self.test_class.backend.compile_room_query(
+                ROOMS_AND_STUDENTS_COUNT
+            ).sql,
+            (),
+        )
 
         # Checking that the returned result matches the expected result
         self.assertEqual(result, expected_result)
@@ -60,7 +398,6 @@ class TestDataLoaderClass(unittest.TestCase):
         self.assertEqual(result, [])
 
     def test_query_min_avg_age_rooms_success(self):
-        query_result_data = [(1, 25), (2, 27), (3, 22), (4, 26), (5, 24)]
         expected_result = [
             {"RoomID": 3, "AvgAge": 22},
             {"RoomID": 5, "AvgAge": 24},
@@ -69,15 +406,20 @@ class TestDataLoaderClass(unittest.TestCase):
             {"RoomID": 2, "AvgAge": 27},
         ]
 
-        self.mock_cursor.fetchall.return_value = query_result_data
+        self.mock_cursor.fetchone.return_value = None
+        self.mock_cursor.fetchall.return_value = [
+            (room["RoomID"], room["AvgAge"]) for room in expected_result
+        ]
 
         result = self.test_class.query_min_avg_age_rooms()
 
-        self.mock_cursor.execute.assert_called_once_with(unittest.mock.ANY)
+        # SQL Server binds the TOP limit first, then the filter value
+        self.mock_cursor.execute.assert_called_with(
+            self.test_class.backend.compile_room_query(MIN_AVG_AGE_ROOMS).sql,
+            (5, 0),
+        )
 
-        self.assertEqual(len(result), len(expected_result))
-        for elem1 in result:
-            self.assertIn(elem1, expected_result)
+        self.assertEqual(result, expected_result)
 
     def test_query_min_avg_age_rooms_exception(self):
         self.mock_cursor.execute.side_effect = Exception("Test Exception")
@@ -87,22 +429,29 @@ class TestDataLoaderClass(unittest.TestCase):
         self.assertEqual(result, [])
 
     def test_query_max_age_difference_rooms_success(self):
-        query_result_data = [(1, 10), (2, 8), (3, 15), (4, 12), (5, 7)]
         expected_result = [
             {"RoomID": 3, "AgeDifference": 15},
-            {"RoomID": 1, "AgeDifference": 10},
             {"RoomID": 4, "AgeDifference": 12},
+            {"RoomID": 1, "AgeDifference": 10},
             {"RoomID": 2, "AgeDifference": 8},
             {"RoomID": 5, "AgeDifference": 7},
         ]
 
-        self.mock_cursor.fetchall.return_value = query_result_data
+        self.mock_cursor.fetchone.return_value = None
+        self.mock_cursor.fetchall.return_value = [
+            (room["RoomID"], room["AgeDifference"]) for room in expected_result
+        ]
 
         result = self.test_class.query_max_age_difference_rooms()
 
-        self.mock_cursor.execute.assert_called_once_with(unittest.mock.ANY)
+        self.mock_cursor.execute.assert_called_with(
+            self.test_class.backend.compile_room_query(
+                MAX_AGE_DIFFERENCE_ROOMS
+            ).sql,
+            (5, TODAY_KEY, TODAY_KEY, 0, TODAY_KEY, TODAY_KEY),
+        )
 
-        self.assertCountEqual(result, expected_result)
+        self.assertEqual(result, expected_result)
 
     def test_query_max_age_difference_rooms_exception(self):
         self.mock_cursor.execute.side_effect = Exception("Test Exception")
@@ -112,16 +461,21 @@ class TestDataLoaderClass(unittest.TestCase):
         self.assertEqual(result, [])
 
     def test_query_gender_mismatch_rooms_success(self):
-        query_result_data = [(1,), (3,), (5,)]
         expected_result = [{"RoomID": 1}, {"RoomID": 3}, {"RoomID": 5}]
 
-        self.mock_cursor.fetchall.return_value = query_result_data
+        self.mock_cursor.fetchone.return_value = None
+        self.mock_cursor.fetchall.return_value = [(1,), (3,), (5,)]
 
         result = self.test_class.query_gender_mismatch_rooms()
 
-        self.mock_cursor.execute.assert_called_once_with(unittest.mock.ANY)
+        self.mock_cursor.execute.assert_called_with(
+            self.test_class.backend.compile_room_query(
+                GENDER_MISMATCH_ROOMS
+            ).sql,
+            (True,),
+        )
 
-        self.assertCountEqual(result, expected_result)
+        self.assertEqual(result, expected_result)
 
     def test_query_gender_mismatch_rooms_exception(self):
         self.mock_cursor.execute.side_effect = Exception("Test Exception")
@@ -131,5 +485,197 @@ class TestDataLoaderClass(unittest.TestCase):
         self.assertEqual(result, [])
 
 
+class TestDocumentWriterClass(unittest.TestCase):
+    records = [
+        {"RoomID": 1, "AvgAge": 22},
+        {"RoomID": 2, "AvgAge": 24},
+        {"RoomID": 3, "AvgAge": 25},
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _read(self, file_name):
+        with open(os.path.join(self.directory, file_name), "r") as file:
+            return file.read()
+
+    def test_write_json_matches_json_dumps(self):
+        for records in (self.records, [], [{"Name": "a\nb <&>"}]):
+            path = os.path.join(self.directory, "result.json")
+
+            count = DocumentWriter.write_json(iter(records), path)
+
+            self.assertEqual(count, len(records))
+            self.assertEqual(
+                self._read("result.json"), json.dumps(records, indent=2)
+            )
+
+    def test_write_ndjson(self):
+        path = os.path.join(self.directory, "result.ndjson")
+
+        DocumentWriter.write_json(iter(self.records), path, ndjson=True)
+
+        self.assertEqual(
+            [
+                json.loads(line)
+                for line in self._read("result.ndjson").splitlines()
+            ],
+            self.records,
+        )
+
+    def test_write_xml(self):
+        path = os.path.join(self.directory, "result.xml")
+        records = self.records + [{"Name": "<Tom & Jerry>"}]
+
+        count = DocumentWriter.write_xml(iter(records), path)
+
+        self.assertEqual(count, 4)
+        root = ET.parse(path).getroot()
+        self.assertEqual(root.tag, "Records")
+        self.assertEqual(
+            [{child.tag: child.text for child in item} for item in root],
+            [
+                {key: str(value) for key, value in record.items()}
+                for record in records
+            ],
+        )
+        self.assertIn(
+            "  <Data>\n    <RoomID>1</RoomID>\n    <AvgAge>22</AvgAge>\n  </Data>\n",
+            self._read("result.xml"),
+        )
+
+    def test_export_result_json(self):
+        current_directory = os.getcwd()
+        os.chdir(self.directory)
+        self.addCleanup(os.chdir, current_directory)
+
+        with patch("builtins.input") as mock_input:
+            path = DocumentWriter.export_result(iter(self.records), "JSON")
+
+        mock_input.assert_not_called()
+        self.assertEqual(path, "result.json")
+        self.assertEqual(json.loads(self._read("result.json")), self.records)
+
+    def test_named_tuples_are_written_as_objects(self):
+        records = [RoomStudentsCount(1, 5), RoomStudentsCount(2, 0)]
+        path = os.path.join(self.directory, "result.json")
+
+        DocumentWriter.write_json(iter(records), path)
+        self.assertEqual(
+            json.loads(self._read("result.json")),
+            [
+                {"RoomID": 1, "StudentsCount": 5},
+                {"RoomID": 2, "StudentsCount": 0},
+            ],
+        )
+
+        DocumentWriter.write_xml(iter(records), path)
+        self.assertEqual(
+            [
+                {child.tag: child.text for child in item}
+                for item in ET.parse(path).getroot()
+            ],
+            [
+                {"RoomID": "1", "StudentsCount": "5"},
+                {"RoomID": "2", "StudentsCount": "0"},
+            ],
+        )
+
+    def test_export_result_xml(self):
+        path = os.path.join(self.directory, "rooms.xml")
+
+        self.assertEqual(
+            DocumentWriter.export_result(self.records, "xml", path), path
+        )
+
+        self.assertEqual(len(ET.parse(path).getroot()), 3)
+
+    def test_export_result_unsupported_format(self):
+        path = os.path.join(self.directory, "rooms.yaml")
+
+        self.assertIsNone(
+            DocumentWriter.export_result(self.records, "yaml", path)
+        )
+        self.assertFalse(os.path.exists(path))
+
+    def test_write_csv(self):
+        path = os.path.join(self.directory, "result.csv")
+        records = [RoomStatistics(1, 2, 20, 19, 21, 2, True)] + [
+            RoomStatistics(2, 0, None, None, None, None, False)
+        ]
+
+        self.assertEqual(DocumentWriter.write_csv(iter(records), path), 2)
+        with open(path, "r", newline="") as file:
+            self.assertEqual(
+                list(csv.reader(file)),
+                [
+                    list(RoomStatistics._fields),
+                    ["1", "2", "20", "19", "21", "2", "True"],
+                    ["2", "0", "", "", "", "", "False"],
+                ],
+            )
+
+        self.assertEqual(DocumentWriter.write_csv(iter(self.records), path), 3)
+        with open(path, "r", newline="") as file:
+            self.assertEqual(
+                list(csv.DictReader(file)),
+                [
+                    {key: str(value) for key, value in record.items()}
+                    for record in self.records
+                ],
+            )
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_write_arrow_and_parquet(self):
+        import pyarrow.parquet
+
+        # Two record batches, the first of rooms without students
+        records = [
+            RoomStatistics(room_id, 0, None, None, None, None, False)
+            for room_id in range(65536)
+        ] + [RoomStatistics(65536, 2, 20, 19, 21, 2, True)]
+
+        for format_type, read in (
+            ("arrow", lambda path: pyarrow.ipc.open_file(path).read_all()),
+            ("parquet", pyarrow.parquet.read_table),
+        ):
+            path = os.path.join(self.directory, f"result.{format_type}")
+
+            count = EXPORT_WRITERS[format_type](iter(records), path)
+
+            table = read(path)
+            self.assertEqual(count, len(records))
+            self.assertEqual(table.column_names, list(RoomStatistics._fields))
+            self.assertEqual(
+                table.schema.field("AvgAge").type, pyarrow.int64()
+            )
+            self.assertEqual(
+                table.slice(65535).to_pylist(),
+                [records[-2]._asdict(), records[-1]._asdict()],
+            )
+
+            # Dictionaries, with inferred types
+            EXPORT_WRITERS[format_type](iter(self.records), path)
+            self.assertEqual(read(path).to_pylist(), self.records)
+
+    def test_registered_writer_is_used(self):
+        path = os.path.join(self.directory, "rooms.ids")
+
+        def write_ids(records, file_path):
+            with open(file_path, "w") as file:
+                file.writelines(f"{record['RoomID']}\n" for record in records)
+            return len(self.records)
+
+        register_writer("IDS", write_ids)
+        self.addCleanup(EXPORT_WRITERS.pop, "ids")
+
+        self.assertEqual(
+            DocumentWriter.export_result(self.records, "ids", path), path
+        )
+        self.assertEqual(self._read("rooms.ids"), "1\n2\n3\n")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,204 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from backends import date_key
+from index_advisor import IndexAdvisor
+from main import DataLoader
+from metrics import MetricsRegistry
+from room_queries import MIN_AVG_AGE_ROOMS
+
+
+STUDENTS_FILE = os.path.join("data_files", "students.json")
+ROOMS_FILE = os.path.join("data_files", "rooms.json")
+
+COVERING_INDEX = "idx_Students_RoomID_BirthDateKey_Sex"
+TODAY_KEY = date_key(date.today())
+
+
+class TestIndexAdvisor(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.metrics = MetricsRegistry()
+        self.data_loader = DataLoader(
+            os.path.join(directory.name, "dormitory.db"),
+            backend="sqlite",
+            metrics=self.metrics,
+        )
+        self.addCleanup(self.data_loader.close_connection)
+        self.data_loader.create_tables()
+        self.index_advisor = IndexAdvisor(self.data_loader, repeat=1)
+
+    def test_workload_is_recorded(self):
+        backend = self.data_loader.backend
+        room_statistics_query = backend.room_statistics_query(date.today())
+        self.assertEqual(
+            self.index_advisor.workload(), [(room_statistics_query, ())]
+        )
+
+        # The initial load rebuilds RoomStats, the next one refreshes its rooms
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        self.data_loader.optimize_queries()
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        self.data_loader.query_room_statistics()
+        self.data_loader.query_room_statistics()
+        self.data_loader.query_min_avg_age_rooms()
+
+        refresh_query = backend.refresh_room_stats_query()
+        report_query = backend.compile_room_query(MIN_AVG_AGE_ROOMS)
+        self.assertEqual(
+            dict(self.data_loader.query_log),
+            {
+                (room_statistics_query, ()): 1,
+                (refresh_query.sql, (TODAY_KEY, TODAY_KEY)): 1,
+                # The second call is answered by the query cache
+                (backend.room_stats_query, ()): 1,
+                (
+                    report_query.sql,
+                    report_query.bind(
+                        **MIN_AVG_AGE_ROOMS.values(TODAY_KEY, 5)
+                    ),
+                ): 1,
+            },
+        )
+        self.assertEqual(
+            [query for query, _ in self.index_advisor.workload()],
+            [
+                room_statistics_query,
+                refresh_query.sql,
+                backend.room_stats_query,
+                report_query.sql,
+            ],
+        )
+
+    def test_evaluate_rolls_back_the_refresh(self):
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        self.data_loader.optimize_queries()
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        expected = self.data_loader.cursor.execute(
+            "SELECT * FROM RoomStats ORDER BY RoomID"
+        ).fetchall()
+
+        report = self.index_advisor.evaluate()
+
+        refresh_query = self.data_loader.backend.refresh_room_stats_query()
+        covering = [
+            row
+            for row in report
+            if row["Query"] == refresh_query.sql
+            and row["Index"] == COVERING_INDEX
+        ]
+        self.assertEqual(len(covering), 1)
+        self.assertTrue(
+            any(COVERING_INDEX in step for step in covering[0]["Plan"])
+        )
+        self.assertEqual(
+            self.data_loader.cursor.execute(
+                "SELECT * FROM RoomStats ORDER BY RoomID"
+            ).fetchall(),
+            expected,
+        )
+
+    def test_evaluate_restores_existing_indexes(self):
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        self.index_advisor.create_indexes(["idx_Students_RoomID"])
+
+        report = self.index_advisor.evaluate()
+
+        self.assertEqual(
+            [row["Index"] for row in report],
+            [None, *self.data_loader.backend.index_candidates],
+        )
+        covering = report[-1]
+        self.assertTrue(
+            any(
+                f"COVERING INDEX {COVERING_INDEX}" in step
+                for step in covering["Plan"]
+            )
+        )
+        self.assertEqual(
+            self.index_advisor.existing_indexes(), ["idx_Students_RoomID"]
+        )
+
+    def test_recommend_minimal_set(self):
+        query = self.data_loader.backend.room_statistics_query(date.today())
+        report = [
+            dict(Query=query, Index=None, Seconds=1.0, Plan=["SCAN s"]),
+            dict(
+                Query=query,
+                Index="idx_Students_RoomID",
+                Seconds=0.5,
+                Plan=["SEARCH s USING INDEX idx_Students_RoomID (RoomID=?)"],
+            ),
+            dict(
+                Query=query,
+                Index="idx_Students_RoomID_Birthday",
+                Seconds=0.2,
+                Plan=["SCAN s"],
+            ),
+            dict(
+                Query=query,
+                Index=COVERING_INDEX,
+                Seconds=0.3,
+                Plan=[f"SCAN s USING COVERING INDEX {COVERING_INDEX}"],
+            ),
+        ]
+
+        # The unused index does not count however fast, one index covers the query
+        self.assertEqual(
+            self.index_advisor.recommend(report), [COVERING_INDEX]
+        )
+
+        report[-1]["Seconds"] = 0.95
+        self.assertEqual(
+            self.index_advisor.recommend(report), ["idx_Students_RoomID"]
+        )
+
+    def test_apply_drops_other_candidates(self):
+        self.index_advisor.create_indexes(
+            ["idx_Students_RoomID", "idx_Students_RoomID_Birthday"]
+        )
+
+        self.index_advisor.apply([COVERING_INDEX])
+
+        self.assertEqual(
+            self.index_advisor.existing_indexes(), [COVERING_INDEX]
+        )
+
+    def test_initial_load_rebuilds_indexes_once(self):
+        self.data_loader.optimize_queries()
+
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+
+        self.assertEqual(
+            self.index_advisor.existing_indexes(), [COVERING_INDEX]
+        )
+        seconds = self.metrics.snapshot()["loaddata_operation_seconds"]
+        self.assertEqual(seconds[(("operation", "rebuild_indexes"),)][0], 1)
+
+    def test_failed_load_rebuilds_indexes(self):
+        self.data_loader.optimize_queries()
+
+        report = self.data_loader.load_data(
+            STUDENTS_FILE, "missing.json", drop_indexes=True
+        )
+
+        self.assertEqual(report["StudentsInserted"], 0)
+        self.assertEqual(
+            self.index_advisor.existing_indexes(), [COVERING_INDEX]
+        )
+
+    def test_optimize_queries_with_advice(self):
+        self.data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+
+        indexes = self.data_loader.optimize_queries(advise=True)
+
+        self.assertLessEqual(len(indexes), 1)
+        self.assertEqual(self.index_advisor.existing_indexes(), indexes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from json_stream import (
+    iter_json_array,
+    iter_json_array_parallel,
+    json_array_ranges,
+)
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def _write_text(self, text):
+        file = tempfile.NamedTemporaryFile(
+            "w", suffix=".json", delete=False, encoding="utf-8"
+        )
+        with file:
+            file.write(text)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def _write_students(self, count):
+        file = tempfile.NamedTemporaryFile(
+            "w", suffix=".json", delete=False, encoding="utf-8"
+        )
+        with file:
+            file.write("[\n")
+            for student_id in range(count):
+                if student_id:
+                    file.write(",\n")
+                json.dump(
+                    {
+                        "birthday": "2004-01-07T00:00:00.000000",
+                        "id": student_id,
+                        "name": "Christian Bush",
+                        "room": student_id % 1000,
+                        "sex": "M",
+                    },
+                    file,
+                    indent=4,
+                )
+            file.write("\n]\n")
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def _peak_memory(self, path):
+        tracemalloc.start()
+        try:
+            count = sum(1 for _ in iter_json_array(path))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return count, peak
+
+    def test_matches_json_load_on_data_files(self):
+        for name in ("rooms.json", "students.json"):
+            path = os.path.join("data_files", name)
+            with open(path, "r") as file:
+                expected = json.load(file)
+
+            self.assertEqual(list(iter_json_array(path)), expected)
+
+    def test_elements_split_across_chunks(self):
+        data = [1234567, "a, ]string", {"nested": [1, {"b": None}]}, 2.5e3]
+        path = self._write_text(json.dumps(data, indent=3))
+
+        for chunk_size in (1, 2, 3, 7, 64):
+            self.assertEqual(
+                list(iter_json_array(path, chunk_size=chunk_size)), data
+            )
+
+    def test_empty_array(self):
+        path = self._write_text("  [ \n ]  \n")
+
+        self.assertEqual(list(iter_json_array(path, chunk_size=1)), [])
+
+    def test_malformed_input(self):
+        for text in ("{}", "[1, 2", "[1 2]", "[1,]", "[1] 2", ""):
+            path = self._write_text(text)
+
+            with self.assertRaises(ValueError, msg=text):
+                list(iter_json_array(path, chunk_size=2))
+
+    def test_peak_memory_does_not_grow_with_file_size(self):
+        small_count, small_peak = self._peak_memory(self._write_students(2000))
+        large_count, large_peak = self._peak_memory(
+            self._write_students(200000)
+        )
+
+        self.assertEqual((small_count, large_count), (2000, 200000))
+        # The large file is ~30 MB; the parser keeps only about one chunk of it
+        self.assertLess(large_peak, 1024 * 1024)
+        self.assertLess(large_peak, small_peak * 2)
+
+
+class TestIterJsonArrayParallel(unittest.TestCase):
+    def _write_text(self, text):
+        file = tempfile.NamedTemporaryFile(
+            "w", suffix=".json", delete=False, encoding="utf-8"
+        )
+        with file:
+            file.write(text)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_ranges_end_on_record_boundaries(self):
+        path = os.path.join("data_files", "students.json")
+
+        ranges = json_array_ranges(path, range_size=100_000)
+
+        self.assertGreater(len(ranges), 10)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], os.path.getsize(path))
+        with open(path, "rb") as file:
+            data = file.read()
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertRegex(data[:end].decode(), r"\}\s*,$")
+
+    def test_matches_sequential_parse(self):
+        path = os.path.join("data_files", "students.json")
+
+        self.assertEqual(
+            list(iter_json_array_parallel(path, 2, range_size=100_000)),
+            list(iter_json_array(path)),
+        )
+
+    def test_boundaries_inside_strings(self):
+        data = [
+            {"id": student_id, "name": "a}, {b" * (student_id % 5), "x": None}
+            for student_id in range(300)
+        ]
+        data[7] = [1, {"nested": "}, "}]
+        data[8] = "},"
+        path = self._write_text(json.dumps(data, ensure_ascii=False))
+
+        for range_size in (1, 7, 100, 1000):
+            self.assertEqual(
+                list(iter_json_array_parallel(path, 2, range_size)), data
+            )
+
+    def test_malformed_input(self):
+        for text in (
+            "{}",
+            "[1, 2",
+            "[1 2]",
+            "[1,]",
+            "[1] 2",
+            "",
+            '[{"a": 1}, {"a": 2}, {"a": 3]',
+            '[{"a": 1}, {"a": 2} {"a": 3}, {"a": 4}]',
+        ):
+            path = self._write_text(text)
+
+            with self.assertRaises(ValueError, msg=text):
+                list(iter_json_array_parallel(path, 2, range_size=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import os
+import tempfile
+import unittest
+
+from main import DataLoader, DocumentWriter, main
+from metrics import MetricsRegistry
+
+
+STUDENTS_FILE = os.path.join("data_files", "students.json")
+ROOMS_FILE = os.path.join("data_files", "rooms.json")
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+
+    def test_counters_are_kept_per_labels(self):
+        self.metrics.increment("loaddata_rows_total", 3, table="Rooms")
+        self.metrics.increment("loaddata_rows_total", 2, table="Rooms")
+        self.metrics.increment("loaddata_rows_total", table="Students")
+
+        self.assertEqual(
+            self.metrics.snapshot()["loaddata_rows_total"],
+            {(("table", "Rooms"),): 5, (("table", "Students"),): 1},
+        )
+
+    def test_prometheus_text(self):
+        self.metrics.increment("loaddata_round_trips_total", 4)
+        self.metrics.observe("loaddata_batch_rows", 10, table='a"b')
+        self.metrics.observe("loaddata_batch_rows", 5, table='a"b')
+
+        text = self.metrics.prometheus_text()
+
+        self.assertIn("# TYPE loaddata_round_trips_total counter\n", text)
+        self.assertIn("loaddata_round_trips_total 4\n", text)
+        self.assertIn("# TYPE loaddata_batch_rows summary\n", text)
+        self.assertIn('loaddata_batch_rows_count{table="a\\"b"} 2\n', text)
+        self.assertIn('loaddata_batch_rows_sum{table="a\\"b"} 15.0\n', text)
+
+    def test_operation_counts_errors(self):
+        with self.assertRaises(ValueError):
+            with self.metrics.operation("load_data"):
+                raise ValueError
+
+        values = self.metrics.snapshot()
+        labels = (("operation", "load_data"),)
+        self.assertEqual(
+            values["loaddata_operation_errors_total"], {labels: 1}
+        )
+        self.assertEqual(values["loaddata_operation_seconds"][labels][0], 1)
+
+    def test_profile_and_memory_of_outermost_operation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.metrics.profile_dir = directory
+            self.metrics.trace_memory = True
+
+            with self.metrics.operation("load_data"):
+                with self.metrics.operation("query_room_statistics"):
+                    data = [0] * 100_000
+
+            self.assertEqual(os.listdir(directory), ["load_data-1.prof"])
+
+        peaks = self.metrics.snapshot()["loaddata_operation_peak_memory_bytes"]
+        self.assertEqual(list(peaks), [(("operation", "load_data"),)])
+        self.assertGreater(peaks[(("operation", "load_data"),)], 800_000)
+        del data
+
+    def test_reset(self):
+        self.metrics.increment("loaddata_rows_total")
+        self.metrics.reset()
+
+        self.assertEqual(self.metrics.prometheus_text(), "")
+
+
+class TestDataLoaderMetrics(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.metrics = MetricsRegistry()
+
+    def test_load_query_and_export(self):
+        with DataLoader(
+            os.path.join(self.directory, "dormitory.db"),
+            backend="sqlite",
+            metrics=self.metrics,
+        ) as data_loader:
+            data_loader.create_tables()
+            report = data_loader.load_data(STUDENTS_FILE, ROOMS_FILE)
+            result = data_loader.query_rooms_and_students_count()
+
+        DocumentWriter.export_result(
+            result,
+            "json",
+            os.path.join(self.directory, "result.json"),
+            metrics=self.metrics,
+        )
+        values = self.metrics.snapshot()
+
+        rows = values["loaddata_rows_total"]
+        self.assertEqual(
+            rows[
+                (
+                    ("operation", "load_data"),
+                    ("outcome", "inserted"),
+                    ("table", "Students"),
+                )
+            ],
+            report["StudentsInserted"],
+        )
+        self.assertEqual(
+            rows[(("operation", "query_rooms_and_students_count"),)],
+            len(result),
+        )
+        self.assertEqual(
+            rows[(("format", "json"), ("operation", "export_result"))],
+            len(result),
+        )
+        self.assertEqual(
+            values["loaddata_bytes_read_total"][(("table", "Students"),)],
+            os.path.getsize(STUDENTS_FILE),
+        )
+        self.assertEqual(
+            values["loaddata_bytes_written_total"][(("format", "json"),)],
+            os.path.getsize(os.path.join(self.directory, "result.json")),
+        )
+        self.assertGreater(
+            values["loaddata_round_trips_total"][
+                (("operation", "load_data"),)
+            ],
+            0,
+        )
+        self.assertIn(
+            (("operation", "load_data"),),
+            values["loaddata_operation_seconds"],
+        )
+
+    def test_command_line_writes_metrics(self):
+        path = os.path.join(self.directory, "metrics.prom")
+
+        status = main(
+            [
+                "--backend",
+                "sqlite",
+                "--connection-string",
+                os.path.join(self.directory, "dormitory.db"),
+                "--students",
+                STUDENTS_FILE,
+                "--rooms",
+                ROOMS_FILE,
+                "--query",
+                "min_avg_age_rooms",
+                "--output",
+                os.path.join(self.directory, "top.json"),
+                "--metrics",
+                path,
+            ]
+        )
+
+        self.assertEqual(status, 0)
+        with open(path, "r") as file:
+            text = file.read()
+        self.assertIn("# TYPE loaddata_operation_seconds summary", text)
+        self.assertIn(
+            'loaddata_operation_seconds_count{operation="load_data"}', text
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from query_cache import QueryCache, cached_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Queries:
+    def __init__(self, query_cache):
+        self.query_cache = query_cache
+        self.calls = 0
+
+    @cached_query
+    def query_top(self, limit=5):
+        self.calls += 1
+        return list(range(limit))
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = QueryCache()
+
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", [1])
+
+        self.assertEqual(cache.get("a"), [1])
+        self.assertEqual(cache.stats(), {"Hits": 1, "Misses": 1, "Entries": 1})
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QueryCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = QueryCache(ttl=10, clock=clock)
+        cache.put("a", 1)
+
+        clock.now = 9.9
+        self.assertEqual(cache.get("a"), 1)
+
+        clock.now = 10
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["Entries"], 0)
+
+    def test_invalidate(self):
+        cache = QueryCache()
+        cache.put("a", 1)
+
+        cache.invalidate()
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_zero_size_disables_the_cache(self):
+        cache = QueryCache(max_entries=0)
+        cache.put("a", 1)
+
+        self.assertIsNone(cache.get("a"))
+
+
+class TestCachedQuery(unittest.TestCase):
+    def test_key_includes_default_arguments(self):
+        queries = Queries(QueryCache())
+
+        self.assertEqual(queries.query_top(), [0, 1, 2, 3, 4])
+        queries.query_top(5)
+        queries.query_top(limit=5)
+        self.assertEqual(queries.calls, 1)
+
+        self.assertEqual(queries.query_top(2), [0, 1])
+        self.assertEqual(queries.calls, 2)
+
+    def test_empty_results_are_not_cached(self):
+        queries = Queries(QueryCache())
+
+        queries.query_top(0)
+        queries.query_top(0)
+
+        self.assertEqual(queries.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import sqlite3
+import unittest
+
+from backends import SqliteBackend, SqlServerBackend
+from room_queries import (
+    ASC,
+    DESC,
+    MAX_AGE_DIFFERENCE_ROOMS,
+    MIN_AVG_AGE_ROOMS,
+    RoomQuery,
+)
+
+
+TODAY_KEY = 20240601
+
+# RoomID, StudentsCount, AgeSum, MinBirthDateKey, MaxBirthDateKey, MaleCount,
+# FemaleCount
+ROOM_STATS = [
+    (1, 2, 41, 20000101, 20040601, 1, 1),
+    (2, 0, 0, None, None, 0, 0),
+    (3, 3, 60, 20040101, 20040601, 3, 0),
+    (4, 1, 20, 20040602, 20040602, 0, 1),
+]
+
+
+def room_statistics(row):
+    room_id, count, age_sum, min_key, max_key, male, female = row
+    if not count:
+        return dict(
+            RoomID=room_id,
+            StudentsCount=0,
+            AvgAge=None,
+            MinAge=None,
+            MaxAge=None,
+            AgeDifference=None,
+            MixedSex=False,
+        )
+
+    min_age = (TODAY_KEY - max_key) // 10000
+    max_age = (TODAY_KEY - min_key) // 10000
+    return dict(
+        RoomID=room_id,
+        StudentsCount=count,
+        AvgAge=age_sum // count,
+        MinAge=min_age,
+        MaxAge=max_age,
+        AgeDifference=max_age - min_age,
+        MixedSex=bool(male and female),
+    )
+
+
+class TestRoomQuery(unittest.TestCase):
+    queries = [
+        MIN_AVG_AGE_ROOMS,
+        MAX_AGE_DIFFERENCE_ROOMS,
+        RoomQuery(
+            columns=("RoomID", "MinAge", "MaxAge", "MixedSex"),
+            filters=(("MaxAge", ">=", 4), ("MixedSex", "=", False)),
+            order_by=(("MinAge", DESC), ("RoomID", DESC)),
+        ),
+        RoomQuery(
+            columns=("AvgAge", "RoomID"),
+            order_by=(("AvgAge", ASC), ("RoomID", DESC)),
+        ),
+    ]
+
+    def test_unknown_names_are_rejected(self):
+        with self.assertRaises(ValueError):
+            RoomQuery(columns=("Name",))
+        with self.assertRaises(ValueError):
+            RoomQuery(columns=("RoomID",), filters=(("RoomID", "==", 1),))
+        with self.assertRaises(ValueError):
+            RoomQuery(columns=("RoomID",), order_by=(("RoomID", "UP"),))
+
+    def test_evaluate(self):
+        rooms = [room_statistics(row) for row in ROOM_STATS]
+
+        self.assertEqual(
+            MIN_AVG_AGE_ROOMS.evaluate(rooms, limit=2),
+            [{"RoomID": 1, "AvgAge": 20}, {"RoomID": 3, "AvgAge": 20}],
+        )
+        self.assertEqual(
+            self.queries[3].evaluate(rooms),
+            [
+                {"AvgAge": None, "RoomID": 2},
+                {"AvgAge": 20, "RoomID": 4},
+                {"AvgAge": 20, "RoomID": 3},
+                {"AvgAge": 20, "RoomID": 1},
+            ],
+        )
+
+    def test_statement_text_does_not_depend_on_values(self):
+        for backend in (SqliteBackend(), SqlServerBackend()):
+            for query in self.queries:
+                compiled = backend.compile_room_query(query)
+
+                self.assertNotIn(str(TODAY_KEY), compiled.sql)
+                self.assertEqual(
+                    compiled.sql.count("?"), len(compiled.parameters)
+                )
+                self.assertEqual(
+                    len(compiled.bind(**query.values(TODAY_KEY, 3))),
+                    len(compiled.parameters),
+                )
+
+    def test_room_stats_refresh_binds_the_date(self):
+        for backend in (SqliteBackend(), SqlServerBackend()):
+            compiled = backend.refresh_room_stats_query()
+
+            self.assertEqual(compiled.parameters, ("today", "today"))
+            self.assertEqual(compiled.sql.count("?"), 2)
+            self.assertEqual(
+                compiled.bind(today=TODAY_KEY), (TODAY_KEY, TODAY_KEY)
+            )
+
+    def test_sqlite_matches_evaluate(self):
+        backend = SqliteBackend()
+        connection = sqlite3.connect(":memory:")
+        self.addCleanup(connection.close)
+        connection.execute(
+            "CREATE TABLE RoomStats (RoomID, StudentsCount, AgeSum, "
+            "MinBirthDateKey, MaxBirthDateKey, MaleCount, FemaleCount)"
+        )
+        connection.executemany(
+            "INSERT INTO RoomStats VALUES (?, ?, ?, ?, ?, ?, ?)", ROOM_STATS
+        )
+        rooms = [room_statistics(row) for row in ROOM_STATS]
+
+        for query in self.queries:
+            for limit in (0, 1, 3, 10):
+                compiled = backend.compile_room_query(query)
+                rows = connection.execute(
+                    compiled.sql,
+                    compiled.bind(**query.values(TODAY_KEY, limit)),
+                ).fetchall()
+
+                self.assertEqual(
+                    [dict(zip(query.columns, row)) for row in rows],
+                    query.evaluate(rooms, limit),
+                    msg=(query, limit),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from json_stream import iter_json_array
+from main import DataLoader
+from snapshot import SnapshotCache, _SnapshotWriter
+
+
+STUDENTS_FILE = os.path.join("data_files", "students.json")
+ROOMS_FILE = os.path.join("data_files", "rooms.json")
+
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.snapshots = SnapshotCache(
+            os.path.join(self.directory, "snapshots")
+        )
+        self.path = os.path.join(self.directory, "data.json")
+
+    def _write(self, data):
+        with open(self.path, "w") as file:
+            json.dump(data, file, indent=4)
+
+    def test_snapshot_matches_the_parsed_file(self):
+        parsed = list(self.snapshots.records(STUDENTS_FILE))
+
+        with patch("snapshot.iter_json_array") as mock_parse:
+            cached = list(self.snapshots.records(STUDENTS_FILE))
+
+        mock_parse.assert_not_called()
+        self.assertEqual(cached, parsed)
+        self.assertEqual(cached, list(iter_json_array(STUDENTS_FILE)))
+
+    def test_changed_file_is_parsed_again(self):
+        self._write([{"id": 1, "name": "Room #1"}])
+        list(self.snapshots.records(self.path))
+
+        self._write([{"id": 2, "name": "Room #2"}])
+
+        self.assertEqual(
+            list(self.snapshots.records(self.path)),
+            [{"id": 2, "name": "Room #2"}],
+        )
+
+    def test_touched_file_with_the_same_content_keeps_its_snapshot(self):
+        self._write([{"id": 1, "name": "Room #1"}])
+        list(self.snapshots.records(self.path))
+        os.utime(self.path, ns=(0, 0))
+
+        with patch("snapshot.iter_json_array") as mock_parse:
+            records = list(self.snapshots.records(self.path))
+
+        mock_parse.assert_not_called()
+        self.assertEqual(records, [{"id": 1, "name": "Room #1"}])
+
+    def test_irregular_records_are_not_snapshotted(self):
+        for data in (
+            [{"id": 1, "name": "Room #1"}, {"id": "2", "name": "Room #2"}],
+            [{"id": 1, "name": "Room #1"}, {"name": "Room #2", "id": 2}],
+            [{"id": 1, "name": None}],
+            [{"id": 2**63, "name": "Room #1"}],
+            [[1, 2]],
+        ):
+            self._write(data)
+
+            self.assertEqual(list(self.snapshots.records(self.path)), data)
+            self.assertFalse(
+                os.path.exists(self.snapshots.snapshot_path(self.path))
+            )
+
+    def test_partially_read_file_is_not_snapshotted(self):
+        self._write(
+            [{"id": 1, "name": "Room #1"}, {"id": 2, "name": "Room #2"}]
+        )
+
+        next(self.snapshots.records(self.path))
+
+        self.assertFalse(
+            os.path.exists(self.snapshots.snapshot_path(self.path))
+        )
+
+    def test_empty_array(self):
+        self._write([])
+        list(self.snapshots.records(self.path))
+
+        self.assertEqual(list(self.snapshots.records(self.path)), [])
+
+    def _write_students(self, count):
+        with open(self.path, "w") as file:
+            file.write("[\n")
+            for student_id in range(count):
+                if student_id:
+                    file.write(",\n")
+                # Distinct names, so that the string tables grow with the file
+                json.dump(
+                    {
+                        "birthday": "2004-01-07T00:00:00.000000",
+                        "id": student_id,
+                        "name": f"Student #{student_id}",
+                        "room": student_id % 1000,
+                        "sex": "M",
+                    },
+                    file,
+                )
+            file.write("\n]\n")
+
+    def _peak_memory(self, count):
+        self._write_students(count)
+        peaks = []
+
+        # The first read writes the snapshot, the second reads it
+        for _ in range(2):
+            tracemalloc.start()
+            try:
+                self.assertEqual(
+                    sum(1 for _ in self.snapshots.records(self.path)), count
+                )
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+
+        return peaks
+
+    @patch.object(_SnapshotWriter, "block_size", 512)
+    def test_peak_memory_does_not_grow_with_file_size(self):
+        small_peaks = self._peak_memory(4000)
+        large_peaks = self._peak_memory(20000)
+
+        # Writing and reading keep about one block of records in memory
+        for small_peak, large_peak in zip(small_peaks, large_peaks):
+            self.assertLess(large_peak, small_peak * 2)
+
+
+class TestDataLoaderSnapshot(unittest.TestCase):
+    def test_second_load_reads_the_snapshots(self):
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_dir = os.path.join(directory, "snapshots")
+
+            with DataLoader(
+                os.path.join(directory, "first.db"), backend="sqlite"
+            ) as data_loader:
+                data_loader.create_tables()
+                data_loader.load_data(
+                    STUDENTS_FILE, ROOMS_FILE, snapshot_dir=snapshot_dir
+                )
+                expected = data_loader.query_rooms_and_students_count()
+
+            with DataLoader(
+                os.path.join(directory, "second.db"), backend="sqlite"
+            ) as data_loader, patch("snapshot.iter_json_array") as mock_parse:
+                data_loader.create_tables()
+                result = data_loader.load_data(
+                    STUDENTS_FILE, ROOMS_FILE, snapshot_dir=snapshot_dir
+                )
+
+                mock_parse.assert_not_called()
+                self.assertEqual(result["StudentsInserted"], 10000)
+                self.assertEqual(
+                    data_loader.query_rooms_and_students_count(), expected
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import json
+import os
+import tempfile
+import unittest
+
+from main import DataLoader
+from validation import RecordValidator, _valid_dates
+
+
+def student(student_id, **fields):
+    record = {
+        "birthday": "2004-01-07T00:00:00.000000",
+        "id": student_id,
+        "name": "Peggy Ryan",
+        "room": 1,
+        "sex": "F",
+    }
+    record.update(fields)
+    return record
+
+
+class TestRecordValidator(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.reject_file = os.path.join(directory.name, "rejects.jsonl")
+
+        self.validator = RecordValidator(self.reject_file, batch_size=3)
+        self.addCleanup(self.validator.close)
+
+    def _rejects(self):
+        self.validator.close()
+        with open(self.reject_file, "r") as file:
+            return [json.loads(line) for line in file]
+
+    def test_valid_records_pass(self):
+        rooms = [{"id": 1, "name": "Room #1"}, {"id": 2, "name": "Room #2"}]
+        students = [student(0), student(1, room=2, sex="M")]
+
+        self.assertEqual(list(self.validator.rooms(rooms)), rooms)
+        self.assertEqual(list(self.validator.students(students)), students)
+        self.assertEqual(self.validator.rejected, {"Rooms": 0, "Students": 0})
+        self.assertEqual(self._rejects(), [])
+
+    def test_invalid_rooms_are_rejected(self):
+        rooms = [
+            {"id": 1, "name": "Room #1"},
+            {"id": 1, "name": "Room #1"},
+            {"id": "2", "name": "Room #2"},
+            {"id": 3, "name": "Room #1000"},
+            {"id": 4},
+        ]
+
+        self.assertEqual(list(self.validator.rooms(rooms)), rooms[:1])
+        self.assertEqual(
+            [reject["Reasons"] for reject in self._rejects()],
+            [
+                ["id 1 is repeated"],
+                ["id '2' is not an integer"],
+                ["name is longer than 9 characters"],
+                ["'name' is missing"],
+            ],
+        )
+
+    def test_invalid_students_are_rejected(self):
+        list(self.validator.rooms([{"id": 1, "name": "Room #1"}]))
+        students = [
+            student(0),
+            student(0),
+            student(1, room=2),
+            student(2, sex="X"),
+            student(3, name="N" * 51),
+            student(4, birthday="2004-02-30T00:00:00.000000"),
+            student(5, birthday=None),
+            student(True),
+            [5],
+        ]
+
+        self.assertEqual(list(self.validator.students(students)), students[:1])
+        self.assertEqual(self.validator.rejected["Students"], 8)
+
+        rejects = self._rejects()
+        self.assertEqual(rejects[0]["Table"], "Students")
+        self.assertEqual(rejects[0]["Record"], students[1])
+        self.assertEqual(
+            [reject["Reasons"] for reject in rejects[1:]],
+            [
+                ["room 2 does not exist"],
+                ["sex 'X' is not 'M' or 'F'"],
+                ["name is longer than 50 characters"],
+                ["birthday '2004-02-30T00:00:00.000000' is not a date"],
+                ["birthday None is not a date"],
+                ["id True is not an integer"],
+                ["the record is not an object"],
+            ],
+        )
+
+    def test_seeded_room_ids(self):
+        validator = RecordValidator(room_ids=[7])
+
+        self.assertEqual(
+            len(list(validator.students([student(0, room=7)]))), 1
+        )
+
+    def test_valid_dates(self):
+        self.assertEqual(
+            _valid_dates(["2004-01-07T00:00:00", "2004-13-01", "2004", 5]),
+            [True, False, False, False],
+        )
+        self.assertEqual(
+            _valid_dates(["2004-01-07", "2000-02-29"]), [True, True]
+        )
+        self.assertEqual(
+            _valid_dates(["2004-01-07", "0000-01-01", "-001-01-01"]),
+            [True, False, False],
+        )
+
+
+class TestDataLoaderValidation(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.data_loader = DataLoader(
+            os.path.join(self.directory, "dormitory.db"), backend="sqlite"
+        )
+        self.addCleanup(self.data_loader.close_connection)
+        self.data_loader.create_tables()
+
+    def test_invalid_records_do_not_reach_the_database(self):
+        reject_file = os.path.join(self.directory, "rejects.jsonl")
+        rooms = [
+            {"id": room_id, "name": f"Room #{room_id}"} for room_id in range(3)
+        ]
+        students = [
+            student(student_id, room=student_id % 3)
+            for student_id in range(10)
+        ]
+        students[4]["room"] = 9
+        students[7]["sex"] = "female"
+        students[8]["birthday"] = "0000-01-01T00:00:00.000000"
+
+        result = self.data_loader.load_data(
+            students, rooms, batch_size=4, reject_file=reject_file
+        )
+
+        self.assertEqual(result["Failed"], 0)
+        self.assertEqual(result["StudentsInserted"], 7)
+        self.assertEqual(result["StudentsRejected"], 3)
+        with open(reject_file, "r") as file:
+            self.assertEqual(
+                [json.loads(line)["Record"]["id"] for line in file], [4, 7, 8]
+            )
+
+    def test_students_may_live_in_rooms_loaded_before(self):
+        self.data_loader.load_data([], [{"id": 1, "name": "Room #1"}])
+
+        result = self.data_loader.load_data([student(0)], [])
+
+        self.assertEqual(result["StudentsInserted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import json
+import os
+import tempfile
+import unittest
+
+from main import DataLoader
+from watermark import LoadWatermark
+
+
+def students_data(count, name="Peggy Ryan"):
+    return [
+        {
+            "birthday": "2004-01-07T00:00:00.000000",
+            "id": student_id,
+            "name": name,
+            "room": student_id % 10,
+            "sex": "MF"[student_id % 2],
+        }
+        for student_id in range(count)
+    ]
+
+
+class TestLoadWatermark(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.data_path = os.path.join(self.directory, "data.json")
+        with open(self.data_path, "w") as file:
+            file.write("[]")
+        self.watermark_path = os.path.join(self.directory, "watermark.json")
+
+    def _record(self, rows, chunk_size=2):
+        watermark = LoadWatermark(self.watermark_path)
+        changed = list(
+            watermark.changed_rows("Data", self.data_path, rows, chunk_size, 0)
+        )
+        watermark.save()
+        return watermark, changed
+
+    def test_first_load_passes_every_row(self):
+        watermark, changed = self._record([(3,), (1,), (2,)])
+
+        self.assertEqual(changed, [(3,), (1,), (2,)])
+        self.assertEqual(watermark.skipped["Data"], 0)
+
+        entry = LoadWatermark(self.watermark_path).entry("Data")
+        self.assertEqual(entry["Records"], 3)
+        self.assertEqual(entry["HighestID"], 3)
+        self.assertEqual(len(entry["ChunkHashes"]), 2)
+
+    def test_unchanged_prefix_is_skipped(self):
+        self._record([(0,), (1,), (2,), (3,), (4,)])
+
+        watermark, changed = self._record([(0,), (1,), (2,), (9,), (4,), (5,)])
+
+        self.assertEqual(changed, [(2,), (9,), (4,), (5,)])
+        self.assertEqual(watermark.skipped["Data"], 2)
+
+    def test_other_chunk_size_loads_everything(self):
+        self._record([(0,), (1,)])
+
+        _, changed = self._record([(0,), (1,)], chunk_size=1)
+
+        self.assertEqual(changed, [(0,), (1,)])
+
+    def test_unchanged_file(self):
+        self._record([(0,), (1,), (2,)])
+        watermark = LoadWatermark(self.watermark_path)
+
+        self.assertTrue(watermark.unchanged("Data", self.data_path))
+        self.assertEqual(watermark.skipped["Data"], 3)
+
+        with open(self.data_path, "a") as file:
+            file.write(" ")
+
+        self.assertFalse(
+            LoadWatermark(self.watermark_path).unchanged(
+                "Data", self.data_path
+            )
+        )
+        self.assertFalse(watermark.unchanged("Other", self.data_path))
+
+
+class TestDeltaLoad(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        self.rooms = os.path.join(self.directory, "rooms.json")
+        with open(self.rooms, "w") as file:
+            json.dump(
+                [
+                    {"id": room_id, "name": f"Room #{room_id}"}
+                    for room_id in range(10)
+                ],
+                file,
+            )
+        self.students = os.path.join(self.directory, "students.json")
+        self.watermark = os.path.join(self.directory, "watermark.json")
+
+        self.data_loader = DataLoader(
+            os.path.join(self.directory, "dormitory.db"), backend="sqlite"
+        )
+        self.addCleanup(self.data_loader.close_connection)
+        self.data_loader.create_tables()
+
+    def _write_students(self, data):
+        with open(self.students, "w") as file:
+            json.dump(data, file, indent=4)
+
+    def _load(self, **kwargs):
+        return self.data_loader.load_data(
+            self.students,
+            self.rooms,
+            batch_size=100,
+            watermark=self.watermark,
+            **kwargs,
+        )
+
+    def test_unchanged_files_are_skipped(self):
+        self._write_students(students_data(1000))
+        self._load()
+
+        result = self._load()
+
+        self.assertEqual(result["StudentsInserted"], 0)
+        self.assertEqual(result["StudentsSkipped"], 1000)
+        self.assertEqual(result["RoomsSkipped"], 10)
+
+    def test_only_records_after_the_unchanged_prefix_are_loaded(self):
+        self._write_students(students_data(1000))
+        self._load()
+
+        # A row deleted behind the watermark's back stays deleted: its batch is skipped
+        self.data_loader.cursor.execute(
+            "DELETE FROM Students WHERE StudentID = 5"
+        )
+        self.data_loader.connection.commit()
+        self._write_students(students_data(1050))
+
+        result = self._load()
+
+        self.assertEqual(result["StudentsInserted"], 50)
+        self.assertEqual(result["StudentsSkipped"], 1000)
+        self.data_loader.cursor.execute("SELECT COUNT(*) FROM Students")
+        self.assertEqual(self.data_loader.cursor.fetchone()[0], 1049)
+
+    def test_upsert_updates_changed_rows(self):
+        self._write_students(students_data(1000))
+        self._load()
+
+        data = students_data(1000)
+        data[550]["name"] = "Christian Bush"
+        data[550]["room"] = 7
+        self._write_students(data)
+
+        result = self._load(upsert=True)
+
+        self.assertEqual(result["StudentsUpdated"], 1)
+        self.assertEqual(result["StudentsInserted"], 0)
+        self.assertEqual(result["StudentsSkipped"], 999)
+        self.data_loader.cursor.execute(
+            "SELECT Name, RoomID FROM Students WHERE StudentID = 550"
+        )
+        self.assertEqual(
+            tuple(self.data_loader.cursor.fetchone()), ("Christian Bush", 7)
+        )
+
+    def test_changed_rows_are_skipped_without_upsert(self):
+        self._write_students(students_data(1000))
+        self._load()
+        self._write_students(students_data(1000, name="Christian Bush"))
+
+        result = self._load()
+
+        self.assertEqual(result["StudentsUpdated"], 0)
+        self.data_loader.cursor.execute(
+            "SELECT COUNT(*) FROM Students WHERE Name = 'Peggy Ryan'"
+        )
+        self.assertEqual(self.data_loader.cursor.fetchone()[0], 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
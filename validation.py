@@ -0,0 +1,267 @@
+import json
+from datetime import date
+from functools import lru_cache
+from itertools import islice
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+)
+
+
+# Column limits of the Rooms and Students tables
+ROOM_NAME_LENGTH = 9
+STUDENT_NAME_LENGTH = 50
+SEXES = frozenset(("M", "F"))
+
+
+class RecordValidator:
+    """
+    Checks the room and student records of a load in batches, before they are inserted.
+
+    Rejected records are counted in `rejected` and, with a `reject_file`, written to it
+    as JSON lines with the table, the record and the reasons, so that only clean records
+    reach the database:
+
+    - rooms: an integer 'id' not seen before in the input and a 'name' of at most 9
+      characters;
+    - students: an integer 'id' not seen before, a 'name' of at most 50 characters, a
+      'sex' of 'M' or 'F', a 'birthday' starting with a valid YYYY-MM-DD date, and a
+      'room' in `room_ids`, the valid rooms of the input and the IDs it is seeded with.
+
+    Seen IDs are kept in hash sets; birthdays of a batch are parsed at once with NumPy
+    when it is installed.
+    """
+
+    def __init__(
+        self,
+        reject_file: Optional[str] = None,
+        batch_size: int = 1000,
+        room_ids: Iterable[int] = (),
+    ):
+        self.batch_size = batch_size
+        self.room_ids: Set[int] = set(room_ids)
+        self.file_room_ids: Set[int] = set()
+        self.student_ids: Set[int] = set()
+        self.rejected: Dict[str, int] = dict(Rooms=0, Students=0)
+
+        self._reject_file: Optional[IO[str]] = (
+            open(reject_file, "w", encoding="utf-8") if reject_file else None
+        )
+
+    def __enter__(self) -> "RecordValidator":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def rooms(
+        self, records: Iterable[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Passes the valid room records through and adds their IDs to `room_ids`.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): The room records.
+
+        Yields:
+            Dict[str, Any]: The valid room records.
+        """
+
+        yield from self._validate("Rooms", records, self._check_rooms)
+
+    def students(
+        self, records: Iterable[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Passes the valid student records through.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): The student records.
+
+        Yields:
+            Dict[str, Any]: The valid student records.
+        """
+
+        yield from self._validate("Students", records, self._check_students)
+
+    def close(self) -> None:
+        """
+        Closes the reject file.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        if self._reject_file is not None:
+            self._reject_file.close()
+            self._reject_file = None
+
+    def _validate(
+        self,
+        table: str,
+        records: Iterable[Dict[str, Any]],
+        check_batch: Callable[[List[Dict[str, Any]]], List[List[str]]],
+    ) -> Iterator[Dict[str, Any]]:
+        records_iterator = iter(records)
+
+        while True:
+            batch = list(islice(records_iterator, self.batch_size))
+            if not batch:
+                break
+
+            for record, reasons in zip(batch, check_batch(batch)):
+                if not reasons:
+                    yield record
+                    continue
+
+                self.rejected[table] += 1
+                if self._reject_file is not None:
+                    self._reject_file.write(
+                        json.dumps(
+                            dict(Table=table, Record=record, Reasons=reasons),
+                            default=str,
+                        )
+                        + "\n"
+                    )
+
+    def _check_rooms(self, batch: List[Dict[str, Any]]) -> List[List[str]]:
+        batch_reasons = []
+
+        for record in batch:
+            reasons = _check_fields(record, ("id", "name"))
+
+            if not reasons:
+                room_id, name = record["id"], record["name"]
+                reasons += _check_id(room_id, self.file_room_ids)
+                reasons += _check_name(name, ROOM_NAME_LENGTH)
+                if not reasons:
+                    self.file_room_ids.add(room_id)
+                    self.room_ids.add(room_id)
+
+            batch_reasons.append(reasons)
+
+        return batch_reasons
+
+    def _check_students(self, batch: List[Dict[str, Any]]) -> List[List[str]]:
+        birthdays_valid = _valid_dates(
+            [
+                record.get("birthday") if isinstance(record, dict) else None
+                for record in batch
+            ]
+        )
+        batch_reasons = []
+
+        for record, birthday_valid in zip(batch, birthdays_valid):
+            reasons = _check_fields(
+                record, ("birthday", "id", "name", "room", "sex")
+            )
+
+            if not reasons:
+                student_id = record["id"]
+                reasons += _check_id(student_id, self.student_ids)
+                reasons += _check_name(record["name"], STUDENT_NAME_LENGTH)
+                if not isinstance(record["sex"], str) or (
+                    record["sex"] not in SEXES
+                ):
+                    reasons.append(f"sex {record['sex']!r} is not 'M' or 'F'")
+                if not birthday_valid:
+                    reasons.append(
+                        f"birthday {record['birthday']!r} is not a date"
+                    )
+                if not _is_integer(record["room"]) or (
+                    record["room"] not in self.room_ids
+                ):
+                    reasons.append(f"room {record['room']!r} does not exist")
+                if not reasons:
+                    self.student_ids.add(student_id)
+
+            batch_reasons.append(reasons)
+
+        return batch_reasons
+
+
+def _check_fields(record: Any, fields: Iterable[str]) -> List[str]:
+    if not isinstance(record, dict):
+        return ["the record is not an object"]
+
+    return [f"'{field}' is missing" for field in fields if field not in record]
+
+
+def _check_id(record_id: Any, seen_ids: Set[int]) -> List[str]:
+    if not _is_integer(record_id):
+        return [f"id {record_id!r} is not an integer"]
+    if record_id in seen_ids:
+        return [f"id {record_id} is repeated"]
+
+    return []
+
+
+def _is_integer(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_name(name: Any, max_length: int) -> List[str]:
+    if not isinstance(name, str):
+        return [f"name {name!r} is not a string"]
+    if len(name) > max_length:
+        return [f"name is longer than {max_length} characters"]
+
+    return []
+
+
+def _valid_dates(values: List[Any]) -> List[bool]:
+    """
+    Checks which values start with a valid YYYY-MM-DD date, the whole list at once with
+    NumPy and value by value only when the list holds an invalid date.
+    """
+
+    prefixes = [
+        value[:10] if isinstance(value, str) and len(value) >= 10 else None
+        for value in values
+    ]
+
+    np = _numpy()
+    if np is not None and None not in prefixes:
+        try:
+            years = (
+                np.array(prefixes, dtype="datetime64[D]")
+                .astype("datetime64[Y]")
+                .astype(np.int64)
+            )
+            # NumPy also parses the years 0 and below and above 9999, which the
+            # datetime module used by date_key rejects; the years count from 1970
+            if ((years >= 1 - 1970) & (years <= 9999 - 1970)).all():
+                return [True] * len(values)
+        except ValueError:
+            pass
+
+    return [_valid_date(prefix) for prefix in prefixes]
+
+
+@lru_cache(maxsize=None)
+def _numpy() -> Any:
+    # Optional and slow to import, NumPy is only loaded for the first batch of dates
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def _valid_date(prefix: Optional[str]) -> bool:
+    if prefix is None:
+        return False
+
+    try:
+        date.fromisoformat(prefix)
+        return True
+    except ValueError:
+        return False
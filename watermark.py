@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+
+class LoadWatermark:
+    """
+    The state of the last successful load of every input file, persisted as JSON, that
+    lets the next load skip what has not changed since.
+
+    For every input (e.g. 'Students') it records the file size and modification time,
+    the number of records, the highest ID and a SHA-256 hash of every chunk of
+    `chunk_size` consecutive records. A file whose size and modification time did not
+    change is skipped without being parsed; otherwise the chunks that hash as before
+    are skipped up to the first chunk that differs, and everything from there on is
+    loaded again.
+
+    The watermark assumes that the database still holds what was loaded; delete the
+    watermark file to force a full load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.skipped: Dict[str, int] = {}
+
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                self._entries = json.load(file)
+
+    def entry(self, name: str) -> Dict[str, Any]:
+        """
+        Returns the recorded state of an input.
+
+        Args:
+            name (str): The input name, e.g. 'Students'.
+
+        Returns:
+            Dict[str, Any]: The recorded 'Size', 'MTime', 'Records', 'HighestID',
+            'ChunkSize' and 'ChunkHashes', or an empty dictionary.
+        """
+
+        return self._entries.get(name, {})
+
+    def unchanged(self, name: str, file_path: str) -> bool:
+        """
+        Checks whether a file has the size and modification time recorded for an input.
+
+        When it does, the input is counted as skipped and will be recorded unchanged.
+
+        Args:
+            name (str): The input name.
+            file_path (str): The file path of the input.
+
+        Returns:
+            bool: Whether the file is unchanged since the last successful load.
+        """
+
+        entry = self.entry(name)
+        stat = os.stat(file_path)
+
+        if not entry or (entry["Size"], entry["MTime"]) != (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return False
+
+        self.skipped[name] = entry["Records"]
+        self._pending[name] = entry
+
+        return True
+
+    def changed_rows(
+        self,
+        name: str,
+        file_path: str,
+        rows: Iterable[Tuple[Any, ...]],
+        chunk_size: int,
+        key_position: int,
+    ) -> Iterator[Tuple[Any, ...]]:
+        """
+        Passes through the rows that follow the unchanged prefix of an input.
+
+        Every chunk of `chunk_size` rows is hashed; leading chunks with the hash recorded
+        by the last load are counted in `skipped` instead of being yielded.
+
+        Args:
+            name (str): The input name.
+            file_path (str): The file path of the input.
+            rows (Iterable[Tuple[Any, ...]]): The rows parsed from the file.
+            chunk_size (int): The number of rows per hashed chunk.
+            key_position (int): The position of the ID in the row tuples.
+
+        Yields:
+            Tuple[Any, ...]: The rows from the first changed chunk on.
+        """
+
+        stat = os.stat(file_path)
+        entry = self.entry(name)
+        previous_hashes = (
+            entry["ChunkHashes"]
+            if entry.get("ChunkSize") == chunk_size
+            else []
+        )
+
+        chunk_hashes = []
+        records = 0
+        highest_id = None
+        unchanged_prefix = True
+        self.skipped[name] = 0
+
+        rows_iterator = iter(rows)
+
+        while True:
+            chunk = list(islice(rows_iterator, chunk_size))
+            if not chunk:
+                break
+
+            digest = hashlib.sha256()
+            for row in chunk:
+                digest.update(repr(row).encode("utf-8"))
+                if highest_id is None or row[key_position] > highest_id:
+                    highest_id = row[key_position]
+
+            chunk_hashes.append(digest.hexdigest())
+            records += len(chunk)
+
+            unchanged_prefix = (
+                unchanged_prefix
+                and len(chunk_hashes) <= len(previous_hashes)
+                and previous_hashes[len(chunk_hashes) - 1] == chunk_hashes[-1]
+            )
+            if unchanged_prefix:
+                self.skipped[name] += len(chunk)
+                continue
+
+            yield from chunk
+
+        self._pending[name] = dict(
+            Size=stat.st_size,
+            MTime=stat.st_mtime_ns,
+            Records=records,
+            HighestID=highest_id,
+            ChunkSize=chunk_size,
+            ChunkHashes=chunk_hashes,
+        )
+
+    def save(self) -> None:
+        """
+        Persists the state recorded by `unchanged`/`changed_rows`; call it only after
+        the load has been committed.
+
+        Returns:
+            None: This method does not return any value.
+        """
+
+        self._entries.update(self._pending)
+        self._pending = {}
+
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self._entries, file)
+        os.replace(temporary_path, self.path)